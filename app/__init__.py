@@ -1,7 +1,10 @@
-from flask import Flask, redirect, jsonify, send_from_directory
+from flask import Flask, redirect, jsonify
 from flask_cors import CORS
 from flasgger import Swagger
 import os
+import tempfile
+
+from app.utils.static_assets import StaticAssetIndex
 
 # Swagger 설정
 swagger_config = {
@@ -19,11 +22,96 @@ swagger_config = {
     "static_url_path": "/flasgger_static",
 }
 
+# 백그라운드 서비스는 프로세스당 한 번만
+_background_started = False
+# 리더 잠금 파일 (프로세스가 살아 있는 동안 열어 둠)
+_leader_lock_file = None
+
+BACKGROUND_LOCK_FILE = os.getenv(
+    "BACKGROUND_LOCK_FILE",
+    os.path.join(tempfile.gettempdir(), "embedded-project-background.lock")
+)
+
+
+def acquire_background_leadership(path=BACKGROUND_LOCK_FILE):
+    """
+    여러 워커 프로세스 중 하나만 백그라운드 서비스를 실행하도록 파일 잠금으로 리더 선출
+    리더 프로세스가 종료되면 OS가 잠금을 풀어주므로 새로 뜬 워커가 리더가 됨
+
+    Returns:
+        bool: 이 프로세스가 리더이면 True
+    """
+    global _leader_lock_file
+
+    if _leader_lock_file is not None:
+        return True
+
+    try:
+        import fcntl
+    except ImportError:
+        # Windows: 멀티 프로세스 서버를 쓰지 않으므로 항상 리더
+        return True
+
+    lock_file = open(path, "a+")
+    try:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    _leader_lock_file = lock_file
+    return True
+
+
+def start_background_services():
+    """스케줄러, 재실 추적, 조이스틱, 센서 샘플러 등 하드웨어/주기 작업 시작 (프로세스당 한 번)"""
+    global _background_started
+
+    if _background_started:
+        return
+    _background_started = True
+
+    # 백그라운드 스케줄러 시작
+    from app.scheduler import start_scheduler
+    start_scheduler()
+
+    # 재실 추적 시작 (스케줄러가 enter/leave 이벤트 구독)
+    from app.services.occupancy_service import start_occupancy_tracker
+    start_occupancy_tracker()
+
+    # 조이스틱 리스너 시작
+    from app.services.joystick_service import start_joystick_listener
+    start_joystick_listener()
+
+    # 센서 샘플러 시작 (요청 핸들러는 스냅샷만 읽음)
+    from app.services.device_service import start_sensor_sampler, add_sample_listener
+    from app.services.sensor_history_service import record_sample
+    from app.services.sensor_log_service import log_sample, start_sensor_log
+    from app.services.alert_service import start_alert_engine
+    add_sample_listener(record_sample)  # 샘플을 시계열 링 버퍼에 기록
+    add_sample_listener(log_sample)     # 샘플을 디스크 로그에 기록 (재시작 후에도 유지)
+    start_alert_engine()                # 샘플마다 경보 규칙 평가 (LED/TTS/SSE)
+    start_sensor_log()
+    start_sensor_sampler()
+
+    # 자주 쓰는 TTS 문구 미리 합성 (오프라인에서도 재생 가능)
+    from app.services.tts_service import prewarm_tts
+    prewarm_tts()
+
+    print(f"[INFO] 백그라운드 서비스 시작 (pid {os.getpid()})")
+
+
 def create_app():
     # 정적 파일 경로 설정 (빌드된 React 앱)
     static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'dist')
 
-    app = Flask(__name__, static_folder=static_folder, static_url_path='')
+    # Flask 기본 static 라우트(/<path:filename>)는 끄고 아래 serve_static_files에서 직접 서빙
+    # (기본 라우트가 먼저 매칭되면 압축/캐시 헤더와 SPA 라우팅이 적용되지 않음)
+    app = Flask(__name__, static_folder=None)
 
     # CORS 허용
     CORS(app)
@@ -31,20 +119,17 @@ def create_app():
     # Swagger 적용
     Swagger(app, config=swagger_config, template_file=None)
 
+    # 프로세스마다 필요한 구독 (설정이 바뀌면 새 위치의 날씨를 미리 가져옴)
+    from app.services.settings_service import add_settings_listener
+    from app.services.weather_service import on_settings_changed
+    add_settings_listener(on_settings_changed)
+
     # 백그라운드 작업 시작 (중복 실행 방지)
-    # Flask debug 모드에서는 리로더(Reloader)가 프로세스를 2개 띄우므로, 
+    # Flask debug 모드에서는 리로더(Reloader)가 프로세스를 2개 띄우므로,
     # 실제 서버 로직이 도는 자식 프로세스(WERKZEUG_RUN_MAIN='true')에서만 스레드를 시작합니다.
-    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
-        # 백그라운드 스케줄러 시작
-        from app.scheduler import start_scheduler
-        start_scheduler()
-
-        # 조이스틱 리스너 시작
-        from app.services.joystick_service import start_joystick_listener
-        start_joystick_listener()
-    
-    # 만약 debug=False(프로덕션)로 실행하여 리로더가 없는 경우를 대비하려면
-    # 별도의 환경변수나 로직이 필요하지만, 현재는 run.py의 debug=True 환경에 맞춤.
+    # 프로덕션(gunicorn)에서는 gunicorn.conf.py가 리더 워커 1개에서만 시작합니다.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true" or os.environ.get("START_BACKGROUND") == "1":
+        start_background_services()
 
     # -------- Swagger 문서 --------
     @app.route("/docs")
@@ -52,14 +137,17 @@ def create_app():
         return redirect("/apidocs/")
 
     # -------- 정적 파일 서빙 (프로덕션 모드) --------
+    # dist 디렉터리는 시작 시 한 번만 인덱싱 (다시 빌드했다면 서버 재시작)
+    static_index = StaticAssetIndex(static_folder).build()
+
     @app.route("/")
     def serve_react_app():
         """
         프로덕션 모드: 빌드된 React 앱의 index.html 제공
         개발 모드: React Dev Server(포트 3000)를 별도로 실행하세요
         """
-        if os.path.exists(os.path.join(app.static_folder, 'index.html')):
-            return send_from_directory(app.static_folder, 'index.html')
+        if static_index.has_index_html:
+            return static_index.serve('index.html')
         else:
             # 빌드 파일이 없는 경우 (개발 모드)
             return jsonify({
@@ -75,17 +163,17 @@ def create_app():
         SPA 라우팅 지원: 모든 경로를 index.html로 리다이렉트
         단, /api, /docs, /apidocs 등은 제외
         """
+        # 정적 파일이 존재하면 반환
+        if static_index.get(path) is not None:
+            return static_index.serve(path)
+
         if path.startswith(('api/', 'docs', 'apidocs', 'apispec.json', 'flasgger_static')):
             # API 라우트는 그대로 처리
-            return app.send_static_file(path) if os.path.exists(os.path.join(app.static_folder, path)) else ("Not Found", 404)
-
-        # 정적 파일이 존재하면 반환
-        if os.path.exists(os.path.join(app.static_folder, path)):
-            return send_from_directory(app.static_folder, path)
+            return ("Not Found", 404)
 
         # 그 외의 경로는 React Router에게 처리하도록 index.html 반환
-        if os.path.exists(os.path.join(app.static_folder, 'index.html')):
-            return send_from_directory(app.static_folder, 'index.html')
+        if static_index.has_index_html:
+            return static_index.serve('index.html')
         else:
             return jsonify({"error": "Frontend not built"}), 404
 
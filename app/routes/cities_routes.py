@@ -1,14 +1,42 @@
-from flask import Blueprint, jsonify
-import json
-import os
+from flask import Blueprint, Response, jsonify, request
+
+from app.services.city_service import city_catalogue, CITY_SEARCH_LIMIT
 
 cities_bp = Blueprint("cities", __name__)
 
 @cities_bp.route("/", methods=["GET"])
 def get_cities():
-    path = os.path.join(os.path.dirname(__file__), "..", "data", "cities.json")
+    # 미리 만들어 둔 JSON 본문 + ETag (If-None-Match가 같으면 304)
+    body, etag = city_catalogue.json_body()
+
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
 
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
 
-    return jsonify(data)
+@cities_bp.route("/search", methods=["GET"])
+def search_cities():
+    """
+    도시 이름 검색 (영어/한국어 접두어 + 유사 이름)
+    ---
+    tags:
+      - Cities
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: true
+        description: 검색어 (예 "se", "서")
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        description: 최대 결과 수 (기본 10)
+    responses:
+      200:
+        description: 일치하는 도시 목록
+    """
+    query = request.args.get("q", "")
+    limit = request.args.get("limit", CITY_SEARCH_LIMIT, type=int)
+    return jsonify(city_catalogue.search(query, max(1, min(limit, 100))))
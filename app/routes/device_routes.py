@@ -1,16 +1,34 @@
 ## 라즈베리파이에서 api 요청
 
-from flask import Blueprint, request, jsonify
-from app.services.device_service import read_sensor_data, get_latest_sensor_data, read_co2_sensor
-from app.services.person_detection_service import detect_person_from_webcam, get_latest_detection
-from app.scheduler import scheduled_person_detection
+import math
+import time
+import queue
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from app.services.device_service import (
+    read_sensor_data, get_latest_sensor_data, read_co2_sensor, get_co2_sensor_stats, SensorUnavailable,
+)
+from app.services.sensor_history_service import query_sensor_history, sensor_history, SENSOR_HISTORY_MAX_POINTS
+from app.services.sensor_log_service import sensor_log
+from app.services.person_detection_service import get_latest_detection
+from app.services.detection_job_service import detection_jobs, submit_detection_job, JobQueueFull
+from app.services.occupancy_service import get_occupancy_state
+from app.scheduler import scheduled_person_detection, get_scheduler_state
+from app.services.alert_service import alert_engine, ALERT_STREAM_HEARTBEAT
+from app.utils.helper import sse_event
 
 device_bp = Blueprint('device', __name__, url_prefix='/api/device')
 
 @device_bp.get('/sensor')
 def get_sensor():
-    """Sense HAT에서 온도/습도를 읽어서 반환"""
-    data = read_sensor_data()
+    """
+    샘플러 스냅샷의 온도/습도/CO2 반환
+    ?fresh=true 이면 스냅샷 대신 하드웨어에서 직접 읽음 (리더가 아닌 워커는 리더의 스냅샷 반환)
+    """
+    fresh = request.args.get('fresh', 'false').lower() in ('1', 'true', 'yes')
+    try:
+        data = read_sensor_data(fresh=fresh)
+    except SensorUnavailable as e:
+        return jsonify({"error": str(e)}), 503
     return jsonify(data)
 
 @device_bp.get('/sensor/latest')
@@ -19,12 +37,102 @@ def get_latest_sensor():
     data = get_latest_sensor_data()
     return jsonify(data)
 
+# 조회 구간 끝으로 허용하는 미래 시각 여유 (초)
+HISTORY_MAX_FUTURE_SECONDS = 86400
+
+def _query_number(name, cast):
+    """쿼리 파라미터를 숫자로 변환 (없으면 None, 숫자가 아니거나 inf/nan이면 ValueError)"""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        number = cast(value)
+    except ValueError:
+        raise ValueError(f"Invalid query parameter '{name}': {value}") from None
+    if cast is float and not math.isfinite(number):
+        raise ValueError(f"Invalid query parameter '{name}': {value}")
+    return number
+
+@device_bp.get('/sensor/history')
+def get_sensor_history():
+    """
+    센서 시계열 기록 조회
+    - start/end: epoch 초 (또는 minutes: 최근 N분)
+    - buckets: min/max/avg 버킷 개수 (생략 시 원본, 포인트가 많으면 자동 집계)
+    - limit: 최대 포인트 수
+    - source: memory(링 버퍼) / log(디스크 로그), 생략 시 메모리에 없는 구간이면 log
+    """
+    try:
+        start = _query_number('start', float)
+        end = _query_number('end', float)
+        minutes = _query_number('minutes', float)
+        buckets = _query_number('buckets', int)
+        limit = _query_number('limit', int)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    source = request.args.get('source')
+    if source not in (None, 'memory', 'log'):
+        return jsonify({"error": f"Invalid query parameter 'source': {source} (memory or log)"}), 400
+
+    if minutes is not None:
+        end = end if end is not None else time.time()
+        start = end - minutes * 60
+
+    if (buckets is not None and buckets <= 0) or (limit is not None and limit <= 0):
+        return jsonify({"error": "buckets and limit must be positive"}), 400
+
+    # 구간은 1970년 ~ 현재 + HISTORY_MAX_FUTURE_SECONDS (범위 밖 값은 날짜 변환에서 실패함)
+    latest = time.time() + HISTORY_MAX_FUTURE_SECONDS
+    for name, value in (('start', start), ('end', end)):
+        if value is not None and not 0 <= value <= latest:
+            return jsonify({"error": f"'{name}' is out of range: {value}"}), 400
+    if start is not None and end is not None and start > end:
+        return jsonify({"error": "start must not be after end"}), 400
+
+    if source is None:
+        oldest, _ = sensor_history.time_range()
+        source = 'log' if start is not None and (oldest is None or start < oldest) else 'memory'
+
+    if source == 'log':
+        # 디스크 로그는 항상 버킷 집계로 반환 (구간 시작은 필수)
+        if start is None:
+            return jsonify({"error": "start or minutes is required for source=log"}), 400
+        end = end if end is not None else time.time()
+        max_points = min(limit or SENSOR_HISTORY_MAX_POINTS, SENSOR_HISTORY_MAX_POINTS)
+        points = sensor_log.query_buckets(start, end, min(buckets or max_points, max_points))
+        return jsonify({
+            "resolution": "bucket",
+            "count": sum(p["count"] for p in points),
+            "points": points,
+            "start": start,
+            "end": end,
+            "source": "log",
+        })
+
+    data = query_sensor_history(start=start, end=end, buckets=buckets, limit=limit)
+    data["source"] = "memory"
+    data["buffer"] = sensor_history.get_stats()
+    return jsonify(data)
+
+@device_bp.get('/sensor/log/stats')
+def get_sensor_log_stats():
+    """디스크 센서 로그 상태 (세그먼트 수/용량/쓰기 통계)"""
+    return jsonify(sensor_log.get_stats())
+
 @device_bp.get('/co2')
 def get_co2():
     """UART를 통해 CO2 센서에서 데이터를 읽어서 반환"""
-    data = read_co2_sensor()
+    try:
+        data = read_co2_sensor()
+    except SensorUnavailable as e:
+        return jsonify({"error": str(e)}), 503
     return jsonify(data)
 
+@device_bp.get('/co2/stats')
+def get_co2_stats():
+    """CO2 센서 시리얼 연결 통계 반환"""
+    return jsonify(get_co2_sensor_stats())
+
 @device_bp.post('/temperature')
 def receive_temp():
     data = request.json
@@ -36,20 +144,44 @@ def receive_temp():
 def test():
     return {"message": "API OK"}
 
+def _submit_job(submit):
+    """작업 제출 후 202 + 작업 ID, 대기열이 가득 차면 429"""
+    try:
+        job = submit()
+    except JobQueueFull as e:
+        response = jsonify({"error": str(e), "stats": detection_jobs.get_stats()})
+        response.status_code = 429
+        response.headers["Retry-After"] = "5"
+        return response
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/device/person-detect/jobs/{job.id}",
+    }), 202
+
 @device_bp.get('/person-detect')
 def person_detect():
-    """웹캠으로 사람이 있는지 감지"""
-    data = detect_person_from_webcam()
-    return jsonify(data)
+    """웹캠으로 사람이 있는지 감지 (작업 ID를 바로 반환, 결과는 /person-detect/jobs/<id>)"""
+    return _submit_job(submit_detection_job)
 
 @device_bp.get('/person-detect/trigger')
 def trigger_person_detect_action():
-    """사람 감지 및 환경 조언 로직을 수동으로 트리거"""
-    result = scheduled_person_detection()
-    return jsonify({
-        "message": "Scheduled task triggered manually",
-        "detection_result": result
-    })
+    """사람 감지 및 환경 조언 로직을 수동으로 트리거 (백그라운드 작업)"""
+    # 수동 트리거는 쿨다운/방해 금지 시간을 적용하지 않음
+    return _submit_job(lambda: detection_jobs.submit("trigger", lambda: scheduled_person_detection(source="trigger")))
+
+@device_bp.get('/person-detect/jobs/<job_id>')
+def get_person_detect_job(job_id):
+    """감지 작업 상태 / 결과 조회 (queued, running, done, error)"""
+    job = detection_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "작업을 찾을 수 없습니다."}), 404
+    return jsonify(job)
+
+@device_bp.get('/person-detect/jobs')
+def get_person_detect_job_stats():
+    """감지 작업 큐 통계 (대기/실행 중, 거절 수 등)"""
+    return jsonify(detection_jobs.get_stats())
 
 @device_bp.get('/person-detect/latest')
 def get_latest_person_detection():
@@ -57,3 +189,54 @@ def get_latest_person_detection():
     data = get_latest_detection()
     return jsonify(data)
 
+
+@device_bp.get('/occupancy')
+def get_occupancy():
+    """재실 추적 상태 (재실 여부, 마지막 감지 시각, 차분으로 건너뛴 프레임 비율 등)"""
+    return jsonify(get_occupancy_state())
+
+
+@device_bp.get('/schedule')
+def get_schedule():
+    """자동 조언 스케줄 정책 상태 (다음 감지까지 남은 시간, 센서 변화 속도, 쿨다운, 방해 금지 시간 여부)"""
+    return jsonify(get_scheduler_state())
+
+
+@device_bp.get('/alerts')
+def get_alerts():
+    """센서 경보 상태 (현재 경보 중인 규칙, 최근 경보, 규칙별 통계)"""
+    limit = request.args.get('limit', type=int)
+    return jsonify({
+        "active": alert_engine.active(),
+        "recent": alert_engine.recent(limit),
+        "stats": alert_engine.get_stats(),
+    })
+
+
+@device_bp.get('/alerts/stream')
+def stream_alerts():
+    """
+    센서 경보 스트리밍 (Server-Sent Events)
+    - event: active (연결 직후 현재 경보 중인 규칙) / alert (발생·해제)
+    """
+    q = alert_engine.subscribe()
+
+    def generate():
+        try:
+            yield sse_event("active", {"rules": alert_engine.active()})
+            while True:
+                try:
+                    alert = q.get(timeout=ALERT_STREAM_HEARTBEAT)
+                except queue.Empty:
+                    # 프록시/브라우저가 연결을 끊지 않도록 주석 한 줄
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse_event("alert", alert)
+        finally:
+            alert_engine.unsubscribe(q)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,7 +1,9 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from app.services.weather_service import get_weather_data
 from app.services.gpt_environment_service import generate_environment_text
 from app.services.device_service import display_icon_by_keyword
+from app.services.gpt_stream_service import stream_advice_sse
+from app.services.gpt_cache_service import advice_cache
 
 gpt_environment_bp = Blueprint("gpt_environment", __name__)
 
@@ -29,3 +31,25 @@ def environment_recommendation():
         "keyword": keyword
     })
 
+
+@gpt_environment_bp.route("/environment/stream", methods=["GET", "POST"])
+def environment_recommendation_stream():
+    """
+    실내 환경 조언 스트리밍 (Server-Sent Events)
+    - event: keyword / delta / sentence / done / error
+    - ?tts=true 이면 문장이 완성될 때마다 라즈베리파이 스피커로 바로 재생
+    """
+    speak = request.args.get("tts", "false").lower() in ("1", "true", "yes")
+    weather_data = get_weather_data()
+
+    return Response(
+        stream_with_context(stream_advice_sse("environment", weather_data, speak=speak)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@gpt_environment_bp.route("/cache", methods=["GET"])
+def advice_cache_stats():
+    """GPT 조언 캐시 hit/miss/합쳐진 요청 수 (환경/복장 공용)"""
+    return jsonify(advice_cache.get_stats())
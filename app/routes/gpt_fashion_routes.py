@@ -1,7 +1,8 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from app.services.weather_service import get_weather_data
 from app.services.gpt_fashion_service import generate_fashion_text
 from app.services.device_service import display_icon_by_keyword
+from app.services.gpt_stream_service import stream_advice_sse
 
 gpt_fashion_bp = Blueprint("gpt_fashion", __name__)
 
@@ -29,3 +30,19 @@ def fashion_recommendation():
         "keyword": keyword
     })
 
+
+@gpt_fashion_bp.route("/fashion/stream", methods=["GET", "POST"])
+def fashion_recommendation_stream():
+    """
+    외출 복장 조언 스트리밍 (Server-Sent Events)
+    - event: keyword / delta / sentence / done / error
+    - ?tts=true 이면 문장이 완성될 때마다 라즈베리파이 스피커로 바로 재생
+    """
+    speak = request.args.get("tts", "false").lower() in ("1", "true", "yes")
+    weather_data = get_weather_data()
+
+    return Response(
+        stream_with_context(stream_advice_sse("fashion", weather_data, speak=speak)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
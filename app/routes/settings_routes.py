@@ -1,5 +1,5 @@
 from flask import Blueprint, request, jsonify
-from app.services.settings_service import load_settings, save_settings
+from app.services.settings_service import load_settings, save_settings, SettingsValidationError
 
 settings_bp = Blueprint("settings", __name__)
 
@@ -24,5 +24,9 @@ def update_settings():
     if not data:
         return jsonify({"error": "Invalid JSON"}), 400
 
-    save_settings(data)
-    return jsonify({"message": "Settings updated successfully"})
+    try:
+        settings = save_settings(data)
+    except SettingsValidationError as e:
+        return jsonify({"error": "Invalid settings", "details": e.errors}), 400
+
+    return jsonify({"message": "Settings updated successfully", "settings": settings})
@@ -24,6 +24,8 @@ def stop():
     """
     try:
         from app.services.tts_service import stop_tts
+        from app.services.advice_job_service import cancel_all_advice
+        cancel_all_advice()  # 진행 중인 조언 생성(OpenAI 스트림)도 함께 중단
         stop_tts()
         return jsonify({"message": "TTS 재생 중단 완료"}), 200
     except Exception as e:
@@ -80,3 +82,17 @@ def speak():
     except Exception as e:
         logger.error(f"TTS 재생 오류: {str(e)}")
         return jsonify({"error": str(e)}), 500
+
+@tts_bp.route('/cache', methods=['GET'])
+def cache_stats():
+    """
+    TTS 음성 캐시 상태
+    ---
+    tags:
+      - TTS
+    responses:
+      200:
+        description: 적중률, 절약한 바이트 수, 캐시 용량
+    """
+    from app.services.tts_cache_service import tts_cache
+    return jsonify(tts_cache.get_stats()), 200
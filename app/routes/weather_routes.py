@@ -1,6 +1,6 @@
 from flask import Blueprint, jsonify, request
 from flasgger import swag_from
-from app.services.weather_service import get_current_weather, get_weather_data
+from app.services.weather_service import get_current_weather, get_weather_data, get_weather_cache_stats
 from app.services.settings_service import load_settings
 
 weather_bp = Blueprint("weather", __name__)
@@ -34,7 +34,12 @@ weather_bp = Blueprint("weather", __name__)
                     "co2": {"type": "number"},
                     "weather": {"type": "string"},
                     "description": {"type": "string"},
-                    "location": {"type": "string"}
+                    "location": {"type": "string"},
+                    "temperatureUnit": {"type": "string", "enum": ["celsius", "fahrenheit"]},
+                    "meta": {
+                        "type": "object",
+                        "description": "소스별 조회 상태/소요 시간 (weather, sensor, total_ms)"
+                    }
                 }
             }
         }
@@ -63,4 +68,13 @@ def dashboard_weather():
     (get_weather_data()가 이미 프론트에서 기대하는 키 구조를 맞춰줌)
     """
     data = get_weather_data()
-    return jsonify(data)
\ No newline at end of file
+    return jsonify(data)
+
+
+# ============================
+# OpenWeather 캐시 상태 (적중률 / 항목 나이)
+# ============================
+@weather_bp.route("/cache", methods=["GET"])
+def weather_cache_stats():
+    """OpenWeather 캐시 hit/miss 통계와 항목별 나이 반환"""
+    return jsonify(get_weather_cache_stats())
@@ -1,65 +1,314 @@
 """
 백그라운드 스케줄러 설정
-APScheduler를 사용하여 주기적인 작업 수행
+공용 타이머 휠(timer_service)에 작업을 등록 (별도 스케줄러 스레드 풀 없음)
+
+고정 1시간 주기 대신 SchedulePolicy가 다음 감지 시점과 자동 조언 여부를 결정
+- 감지 주기: 최근 재실 여부와 센서 변화 속도에 따라 SCHEDULE_MIN_INTERVAL ~ SCHEDULE_MAX_INTERVAL
+- 자동 조언(정기/재실) 사이 최소 간격 (설정 adviceCooldownMinutes)
+- 방해 금지 시간 (설정 quietHours*): 감지와 음성 조언을 하지 않음
+- 센서 경보(alert_service, CO2 임계값 등)가 발생하면 다음 감지를 SCHEDULE_MIN_INTERVAL 안으로 당김
+조이스틱/수동 트리거로 요청한 조언은 정책과 관계없이 실행
 """
-from apscheduler.schedulers.background import BackgroundScheduler
-from app.services.person_detection_service import detect_person_from_webcam
-from app.services.joystick_service import process_environment_advice, reset_stop_request
-import atexit
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+
+from app.services.detection_job_service import detect_person_offloaded
+from app.services.advice_job_service import submit_advice
+from app.services.occupancy_service import occupancy_tracker, add_occupancy_listener
+from app.services.settings_service import (
+    DEFAULT_SETTINGS, load_settings, add_settings_listener, time_of_day_minutes, in_time_window,
+)
+from app.services.device_service import add_sample_listener
+from app.services.alert_service import add_alert_listener
+from app.services.timer_service import call_later
+
+# 감지 주기 범위 (초)
+SCHEDULE_MIN_INTERVAL = float(os.getenv("SCHEDULE_MIN_INTERVAL", 300))
+SCHEDULE_MAX_INTERVAL = float(os.getenv("SCHEDULE_MAX_INTERVAL", 3600))
+# 마지막 재실 확인 후 이 시간 동안은 자주 감지 (초)
+SCHEDULE_PRESENCE_WINDOW = float(os.getenv("SCHEDULE_PRESENCE_WINDOW", 1800))
+# 이 속도 이상이면 "빠르게 변하는 중"으로 보고 감지 주기를 줄임 (분당)
+SCHEDULE_CO2_RATE = float(os.getenv("SCHEDULE_CO2_RATE", 30))        # ppm/분
+SCHEDULE_TEMP_RATE = float(os.getenv("SCHEDULE_TEMP_RATE", 0.3))     # ℃/분
+
+# 정책(쿨다운/방해 금지)을 적용하는 자동 조언 출처
+AUTOMATIC_SOURCES = ("scheduler", "occupancy")
+
+# 변화 속도 지수 이동 평균 가중치 (새 샘플 비중)
+_RATE_ALPHA = 0.3
+# 이보다 가까운 샘플끼리는 속도를 계산하지 않음 (강제 읽기 등, 초) / 샘플 하나가 올릴 수 있는 최대 속도
+_RATE_MIN_SECONDS = 1.0
+_RATE_CAP = 10.0
+
+
+class SchedulePolicy:
+    def __init__(self, settings=None,
+                 min_interval=SCHEDULE_MIN_INTERVAL,
+                 max_interval=SCHEDULE_MAX_INTERVAL,
+                 presence_window=SCHEDULE_PRESENCE_WINDOW):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.presence_window = presence_window
+        self._lock = threading.Lock()
+        self._last_advice = None        # 마지막 자동 조언 시각 (monotonic)
+        self._last_presence = None      # 마지막 재실 확인 시각 (monotonic)
+        self._prev_sample = None        # (monotonic, temperature, co2)
+        self._rate = 0.0                # 센서 변화 속도 (1.0 = 기준 속도)
+        self.apply_settings(settings or {})
+
+    # --------------------------------------------------------
+    # 설정
+    # --------------------------------------------------------
+    def apply_settings(self, settings):
+        merged = {**DEFAULT_SETTINGS, **settings}
+        with self._lock:
+            self.quiet_enabled = merged["quietHoursEnabled"]
+            self.quiet_start = time_of_day_minutes(merged["quietHoursStart"])
+            self.quiet_end = time_of_day_minutes(merged["quietHoursEnd"])
+            self.cooldown = merged["adviceCooldownMinutes"] * 60
+
+    def is_quiet(self, when=None):
+        """방해 금지 시간인지 (자정을 넘는 범위 지원, 예: 22:00 ~ 07:00)"""
+        return self.quiet_enabled and in_time_window(self.quiet_start, self.quiet_end, when)
+
+    def seconds_until_quiet_end(self, when=None):
+        when = when or datetime.now()
+        end = when.replace(hour=self.quiet_end // 60, minute=self.quiet_end % 60, second=0, microsecond=0)
+        if end <= when:
+            end += timedelta(days=1)
+        return (end - when).total_seconds()
+
+    # --------------------------------------------------------
+    # 관측
+    # --------------------------------------------------------
+    def observe_presence(self, present, now=None):
+        if present:
+            with self._lock:
+                self._last_presence = time.monotonic() if now is None else now
+
+    def observe_sample(self, temperature, co2, now=None):
+        """
+        센서 샘플 반영
+
+        변화 속도는 직전 샘플과의 분당 변화량을 기준 속도로 나눈 값의 지수 이동 평균 (샘플당 O(1))
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            prev = self._prev_sample
+            if prev is None:
+                self._prev_sample = (now, temperature, co2)
+            elif now - prev[0] >= _RATE_MIN_SECONDS:
+                minutes = (now - prev[0]) / 60
+                rates = []
+                if temperature is not None and prev[1] is not None:
+                    rates.append(abs(temperature - prev[1]) / minutes / SCHEDULE_TEMP_RATE)
+                if co2 is not None and prev[2] is not None:
+                    rates.append(abs(co2 - prev[2]) / minutes / SCHEDULE_CO2_RATE)
+                if rates:
+                    self._rate += _RATE_ALPHA * (min(max(rates), _RATE_CAP) - self._rate)
+                self._prev_sample = (now, temperature, co2)
+
+    # --------------------------------------------------------
+    # 결정
+    # --------------------------------------------------------
+    def next_detection_interval(self, now=None, when=None):
+        """다음 정기 감지까지의 시간 (초)"""
+        if self.is_quiet(when):
+            return min(self.max_interval, max(self.min_interval, self.seconds_until_quiet_end(when)))
+
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            present = self._last_presence is not None and now - self._last_presence < self.presence_window
+            rate = min(self._rate, 3.0)
+        interval = self.max_interval / ((4 if present else 1) * (1 + 3 * rate))
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def check_advice(self, source, now=None, when=None):
+        """자동 조언을 해도 되는지 (허용 여부, 사유)"""
+        if source not in AUTOMATIC_SOURCES:
+            return True, None
+        if self.is_quiet(when):
+            return False, "방해 금지 시간"
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._last_advice is not None and now - self._last_advice < self.cooldown:
+                remaining = int(self.cooldown - (now - self._last_advice))
+                return False, f"쿨다운 {remaining}초 남음"
+        return True, None
+
+    def record_advice(self, source, now=None):
+        if source in AUTOMATIC_SOURCES:
+            with self._lock:
+                self._last_advice = time.monotonic() if now is None else now
+
+    def get_state(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "quiet": self.is_quiet(),
+                "change_rate": round(self._rate, 3),
+                "cooldown_seconds": self.cooldown,
+                "since_last_advice": round(now - self._last_advice, 1) if self._last_advice is not None else None,
+                "since_last_presence": round(now - self._last_presence, 1) if self._last_presence is not None else None,
+            }
+
+
+# 앱 전체에서 공유하는 스케줄 정책
+schedule_policy = SchedulePolicy()
+
+# 다음 정기 감지 타이머
+_detection_timer = None
+_timer_lock = threading.Lock()
+_started = False
+
 
-# 스케줄러 인스턴스
-scheduler = None
+def _run_environment_advice(source="scheduler"):
+    allowed, reason = schedule_policy.check_advice(source)
+    if not allowed:
+        print(f"[SCHEDULER] 환경 조언 건너뜀 ({source}): {reason}")
+        return None
 
-def scheduled_person_detection():
-    """1시간마다 실행되는 사람 감지 작업 - 사람이 있으면 환경 조언 제공"""
+    # 조언 실행기에 맡기고 바로 반환 (사용자가 요청한 조언이 대기 중이면 건너뜀)
+    job = submit_advice("environment", source=source, replace=False)
+    if job is None:
+        print("[SCHEDULER] 다른 조언이 대기 중이라 환경 조언을 건너뜁니다.")
+        return None
+    schedule_policy.record_advice(source)
+    return job
+
+
+def scheduled_person_detection(source="scheduler"):
+    """정기 사람 감지 작업 - 사람이 있으면 환경 조언 제공"""
     print("[SCHEDULER] 정기 사람 감지 시작")
-    result = detect_person_from_webcam()
+    if occupancy_tracker.is_running():
+        # 재실 추적 중이면 웹캠을 다시 찍지 않고 추적 상태 사용
+        state = occupancy_tracker.get_state()
+        result = {
+            "person_detected": state["occupied"],
+            "message": "있다" if state["occupied"] else "없다",
+            "timestamp": state["changed_at"],
+            "source": "occupancy",
+        }
+    else:
+        result = detect_person_offloaded()
     print(f"[SCHEDULER] 감지 결과: {result['message']}")
+    schedule_policy.observe_presence(result.get("person_detected"))
 
     # 사람이 감지되면 실내 환경 조언 실행
     if result.get("person_detected"):
         print("[SCHEDULER] 사람 감지됨 → 실내 환경 조언 실행")
-        try:
-            # 중단 요청 플래그 초기화 (이전 중단 명령이 남아있을 수 있음)
-            reset_stop_request()
-            process_environment_advice()
-        except Exception as e:
-            print(f"[SCHEDULER] 환경 조언 실행 중 오류: {e}")
-    
+        _run_environment_advice(source)
+
     return result
 
+
+def _schedule_next_detection(delay=None):
+    """다음 정기 감지 예약 (이미 예약된 것은 취소)"""
+    global _detection_timer
+
+    delay = schedule_policy.next_detection_interval() if delay is None else delay
+    with _timer_lock:
+        if _detection_timer is not None:
+            _detection_timer.cancel()
+        _detection_timer = call_later(delay, _detection_tick, name="사람 감지 정기 작업")
+    print(f"[SCHEDULER] 다음 사람 감지: {delay:.0f}초 후")
+
+
+def _detection_tick():
+    try:
+        if schedule_policy.is_quiet():
+            print("[SCHEDULER] 방해 금지 시간: 정기 사람 감지 건너뜀")
+        else:
+            scheduled_person_detection()
+    finally:
+        if _started:
+            _schedule_next_detection()
+
+
+def _maybe_reschedule_sooner(interval=None):
+    """정책상 다음 감지가 지금 예약보다 빨라야 하면 당겨서 다시 예약"""
+    with _timer_lock:
+        remaining = _detection_timer.remaining() if _detection_timer is not None else None
+    if remaining is None:
+        return
+    interval = schedule_policy.next_detection_interval() if interval is None else interval
+    # 조금 당겨지는 정도로는 다시 예약하지 않음 (샘플마다 타이머를 바꾸지 않도록)
+    if interval < remaining * 0.75:
+        _schedule_next_detection(interval)
+
+
+def on_occupancy_change(event, state):
+    """재실 추적 이벤트 - 사람이 들어오면 바로 환경 조언"""
+    schedule_policy.observe_presence(event == "enter")
+    if event == "enter":
+        print("[SCHEDULER] 재실 감지 → 실내 환경 조언 실행")
+        _run_environment_advice("occupancy")
+        _maybe_reschedule_sooner()
+
+
+def on_sensor_sample(snapshot):
+    """센서 샘플마다 호출 - 변화가 빨라지면 감지 주기 단축"""
+    schedule_policy.observe_sample(snapshot.temperature, snapshot.co2)
+    if _started:
+        _maybe_reschedule_sooner()
+
+
+def on_alert(alert):
+    """센서 경보 발생 - 사람이 있는지 곧바로 다시 확인 (경보 자체는 alert_service가 LED/TTS로 알림)"""
+    if alert["state"] == "raised" and _started and not schedule_policy.is_quiet():
+        _maybe_reschedule_sooner(schedule_policy.min_interval)
+
+
+def on_settings_changed(new, old, changed):
+    """방해 금지 시간/쿨다운이 바뀌면 정책에 반영"""
+    if changed & {"quietHoursEnabled", "quietHoursStart", "quietHoursEnd", "adviceCooldownMinutes"}:
+        schedule_policy.apply_settings(new)
+        print("[SCHEDULER] 자동 조언 정책 설정 갱신")
+        if _started:
+            _schedule_next_detection()
+
+
+def get_scheduler_state():
+    with _timer_lock:
+        remaining = _detection_timer.remaining() if _detection_timer is not None else None
+    state = schedule_policy.get_state()
+    state["running"] = _started
+    state["next_detection_in"] = round(remaining, 1) if remaining is not None else None
+    return state
+
+
 def start_scheduler():
     """스케줄러 시작"""
-    global scheduler
+    global _started
 
-    if scheduler is not None:
+    if _started:
         print("[WARNING] 스케줄러가 이미 실행 중입니다.")
         return
+    _started = True
 
-    scheduler = BackgroundScheduler()
+    schedule_policy.apply_settings(load_settings())
+    add_settings_listener(on_settings_changed)
 
-    # 1시간(3600초)마다 사람 감지 작업 실행
-    scheduler.add_job(
-        func=scheduled_person_detection,
-        trigger="interval",
-        hours=1,  # 1시간 간격
-        id='person_detection_job',
-        name='사람 감지 정기 작업',
-        replace_existing=True
-    )
+    # 재실 상태가 바뀌면 바로 반응 (정기 작업은 계속 재실 중인 경우의 주기 조언)
+    add_occupancy_listener(on_occupancy_change)
+    # 센서 샘플마다 변화 속도 확인, 센서 경보가 나면 감지 주기 단축
+    add_sample_listener(on_sensor_sample)
+    add_alert_listener(on_alert)
 
-    # 스케줄러 시작
-    scheduler.start()
+    _schedule_next_detection()
     print("[INFO] 백그라운드 스케줄러가 시작되었습니다.")
-    print("[INFO] 사람 감지 작업이 1시간 간격으로 실행됩니다.")
+    print(f"[INFO] 사람 감지 주기: {SCHEDULE_MIN_INTERVAL:g} ~ {SCHEDULE_MAX_INTERVAL:g}초 (재실/센서 변화에 따라 조정)")
 
-    # 앱 종료 시 스케줄러도 종료
-    atexit.register(lambda: scheduler.shutdown())
 
 def stop_scheduler():
     """스케줄러 중지"""
-    global scheduler
-    if scheduler is not None:
-        scheduler.shutdown()
-        scheduler = None
+    global _started, _detection_timer
+    if _started:
+        _started = False
+        with _timer_lock:
+            if _detection_timer is not None:
+                _detection_timer.cancel()
+                _detection_timer = None
         print("[INFO] 백그라운드 스케줄러가 중지되었습니다.")
@@ -0,0 +1,225 @@
+"""
+조언(GPT + TTS) 작업 실행기
+
+- 작업 스레드 1개가 조언 작업을 하나씩 실행 (스피커/LED는 하나뿐이므로 동시에 하나만 재생)
+- 작업마다 CancelToken을 가지며, 취소하면 진행 중인 OpenAI 스트림을 닫고 TTS를 즉시 중단
+- 같은 종류의 작업이 이미 대기/실행 중이면 새로 만들지 않음 (중복 제거)
+- 버튼을 연달아 누르면 마지막 요청만 남김 (latest-wins: 실행 중인 작업 취소, 대기 작업 교체)
+"""
+import threading
+from datetime import datetime
+
+from app.services.device_service import display_icon_by_keyword
+from app.services.weather_service import get_weather_data
+from app.services.gpt_stream_service import stream_advice
+from app.services.tts_service import TtsStream
+
+ADVICE_LABELS = {
+    "environment": "환경 조언",
+    "fashion": "복장 조언",
+}
+
+
+class CancelToken:
+    """작업 취소 신호. on_cancel로 등록한 함수는 취소 시(이미 취소됐다면 즉시) 호출"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def on_cancel(self, callback):
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[ADVICE] 취소 처리 중 오류: {e}")
+
+
+class AdviceJob:
+    def __init__(self, kind, source):
+        self.kind = kind
+        self.source = source            # "joystick" / "scheduler" / "occupancy" ...
+        self.token = CancelToken()
+        self.status = "queued"          # queued → running → done / cancelled / error
+        self.submitted_at = datetime.now().isoformat()
+        self._finished = threading.Event()
+
+    def cancel(self):
+        self.token.cancel()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def to_dict(self):
+        return {"kind": self.kind, "source": self.source, "status": self.status,
+                "submitted_at": self.submitted_at}
+
+
+def run_advice(kind, token):
+    """
+    조언을 스트리밍으로 생성하면서 완성된 문장부터 바로 TTS 재생
+    (전체 응답을 기다리지 않으므로 첫 음성까지의 시간이 짧음)
+    """
+    label = ADVICE_LABELS[kind]
+
+    # 1. 데이터 가져오기
+    weather_data = get_weather_data()
+    if token.cancelled:
+        return
+
+    # 2. GPT 조언 스트리밍 → 3. 아이콘 표시 / 4. 문장 단위 TTS
+    tts = TtsStream()
+    token.on_cancel(tts.cancel)
+    try:
+        for event, data in stream_advice(kind, weather_data, token=token):
+            if event == "keyword":
+                display_icon_by_keyword(data)
+            elif event == "sentence":
+                tts.feed(data)
+            elif event == "done":
+                print(f"[ADVICE] {label}: {data.get('advice', '')}")
+    finally:
+        tts.close()
+
+    tts.wait()
+
+
+class AdviceExecutor:
+    """대기 슬롯 1개 + 실행 스레드 1개로 동작하는 조언 작업 실행기"""
+
+    def __init__(self, runner=run_advice):
+        self._runner = runner
+        self._current = None
+        self._pending = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self.stats = {"submitted": 0, "deduplicated": 0, "replaced": 0, "rejected": 0,
+                      "cancelled": 0, "done": 0, "failed": 0}
+
+    def _ensure_thread(self):
+        """락을 잡은 상태에서 호출"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="advice-executor", daemon=True)
+            self._thread.start()
+
+    def _drop_pending_locked(self):
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending.status = "cancelled"
+            self._pending._finished.set()
+            self._pending = None
+            self.stats["cancelled"] += 1
+
+    @staticmethod
+    def _active(job, kind):
+        return job is not None and job.kind == kind and not job.token.cancelled
+
+    def submit(self, kind, source="joystick", replace=True):
+        """
+        조언 작업 제출
+
+        Args:
+            kind: "environment" / "fashion"
+            replace: True면 실행/대기 중인 작업을 취소하고 이 작업으로 교체 (버튼 입력)
+                     False면 다른 작업이 대기 중일 때 제출하지 않음 (스케줄러)
+
+        Returns:
+            AdviceJob (같은 종류가 이미 대기/실행 중이면 그 작업), 제출하지 않으면 None
+        """
+        if kind not in ADVICE_LABELS:
+            raise ValueError(f"알 수 없는 조언 종류: {kind}")
+
+        with self._cond:
+            for job in (self._pending, self._current):
+                if self._active(job, kind):
+                    self.stats["deduplicated"] += 1
+                    return job
+
+            if replace:
+                for job in (self._current, self._pending):
+                    if job is not None and not job.token.cancelled:
+                        self.stats["replaced"] += 1
+                if self._current is not None:
+                    self._current.cancel()
+                self._drop_pending_locked()
+            elif self._pending is not None:
+                self.stats["rejected"] += 1
+                return None
+
+            job = AdviceJob(kind, source)
+            self._pending = job
+            self.stats["submitted"] += 1
+            self._ensure_thread()
+            self._cond.notify()
+            return job
+
+    def cancel_all(self):
+        """실행 중인 작업과 대기 작업 모두 취소 (가운데 버튼)"""
+        with self._cond:
+            count = int(self._pending is not None)
+            self._drop_pending_locked()
+            current = self._current
+        if current is not None:
+            current.cancel()
+            count += 1
+        return count
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                job, self._pending = self._pending, None
+                self._current = job
+                job.status = "running"
+
+            try:
+                if not job.token.cancelled:
+                    self._runner(job.kind, job.token)
+                job.status = "cancelled" if job.token.cancelled else "done"
+            except Exception as e:
+                job.status = "cancelled" if job.token.cancelled else "error"
+                if job.status == "error":
+                    print(f"[ADVICE] {ADVICE_LABELS[job.kind]} 처리 중 오류 발생: {e}")
+            finally:
+                with self._cond:
+                    self._current = None
+                    key = {"done": "done", "cancelled": "cancelled"}.get(job.status, "failed")
+                    self.stats[key] += 1
+                job._finished.set()
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats["current"] = self._current.to_dict() if self._current else None
+            stats["pending"] = self._pending.to_dict() if self._pending else None
+        return stats
+
+
+# 앱 전체에서 공유하는 조언 실행기
+advice_executor = AdviceExecutor()
+
+
+def submit_advice(kind, source="joystick", replace=True):
+    return advice_executor.submit(kind, source, replace)
+
+
+def cancel_all_advice():
+    return advice_executor.cancel_all()
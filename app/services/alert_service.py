@@ -0,0 +1,307 @@
+"""
+센서 경보 엔진 (스트리밍 규칙 평가)
+
+센서 샘플러가 새 스냅샷을 게시할 때마다 규칙을 평가해, 상태가 바뀐 규칙만 경보로 내보냄 (GPT 호출 없음)
+- ThresholdRule: 임계값 + 히스테리시스 (예: CO2 ≥ 1500ppm 경보, 1400ppm 미만이면 해제)
+- SlopeRule: 시간 창 안의 상승/하강 폭 (예: 10분 동안 CO2 200ppm 이상 상승)
+  창 안의 최솟값/최댓값을 단조 덱으로 유지하므로 샘플당 분할 상환 O(1)
+
+경보가 발생하면
+- LED: 규칙의 키워드 아이콘 표시
+- TTS: 미리 정한 문장을 바로 재생 (방해 금지 시간 / ttsEnabled=false면 생략)
+- SSE: /api/device/alerts/stream 구독자에게 전달
+같은 규칙은 ALERT_REPEAT_SECONDS 안에 다시 울리지 않음 (값이 경계에서 오르내릴 때 반복 방지)
+"""
+import os
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+
+from app.services.device_service import add_sample_listener, display_icon_by_keyword
+from app.services.settings_service import load_settings, add_settings_listener, is_quiet_hours
+from app.services.tts_service import TtsStream
+
+# 같은 규칙의 경보를 다시 울리기까지 최소 간격 (초)
+ALERT_REPEAT_SECONDS = float(os.getenv("ALERT_REPEAT_SECONDS", 900))
+# 최근 경보 보관 개수
+ALERT_HISTORY = int(os.getenv("ALERT_HISTORY", 100))
+# SSE 구독자별 대기 경보 최대 개수 (느린 클라이언트는 오래된 것부터 버림)
+ALERT_STREAM_QUEUE = int(os.getenv("ALERT_STREAM_QUEUE", 50))
+# SSE 연결 유지용 빈 메시지 간격 (초)
+ALERT_STREAM_HEARTBEAT = float(os.getenv("ALERT_STREAM_HEARTBEAT", 15))
+
+# 기본 규칙 값
+ALERT_CO2_HYSTERESIS = float(os.getenv("ALERT_CO2_HYSTERESIS", 100))
+ALERT_CO2_RISE_PPM = float(os.getenv("ALERT_CO2_RISE_PPM", 200))
+ALERT_CO2_RISE_WINDOW = float(os.getenv("ALERT_CO2_RISE_WINDOW", 600))
+ALERT_TEMP_HIGH = float(os.getenv("ALERT_TEMP_HIGH", 30))
+ALERT_TEMP_LOW = float(os.getenv("ALERT_TEMP_LOW", 15))
+ALERT_HUMIDITY_HIGH = float(os.getenv("ALERT_HUMIDITY_HIGH", 75))
+
+
+class ThresholdRule:
+    """값이 level을 넘으면 경보, clear_level을 되돌아 넘으면 해제 (above=False면 낮을 때 경보)"""
+
+    def __init__(self, name, field, level, clear_level, keyword, message, above=True):
+        self.name = name
+        self.field = field
+        self.keyword = keyword
+        self.message = message
+        self.above = above
+        self.set_level(level, clear_level)
+
+    def set_level(self, level, clear_level):
+        self.level = level
+        self.clear_level = clear_level
+
+    def update(self, t, value, active):
+        """새 샘플로 경보 상태 계산 (True: 경보 중)"""
+        sign = 1 if self.above else -1
+        if not active:
+            return sign * value >= sign * self.level
+        return sign * value > sign * self.clear_level
+
+    def describe(self, value):
+        return self.message.format(value=value, level=self.level)
+
+
+class SlopeRule:
+    """window초 안에서 delta 이상 상승(rising=True) 또는 하강하면 경보, delta의 절반 미만이면 해제"""
+
+    def __init__(self, name, field, delta, window, keyword, message, rising=True):
+        self.name = name
+        self.field = field
+        self.delta = delta
+        self.window = window
+        self.keyword = keyword
+        self.message = message
+        self.sign = 1 if rising else -1
+        # (시각, sign * 값)을 값이 증가하도록 유지 → 맨 앞이 창 안의 최솟값
+        self._extremes = deque()
+        self.change = 0.0
+
+    def update(self, t, value, active):
+        v = self.sign * value
+        extremes = self._extremes
+        while extremes and extremes[-1][1] >= v:
+            extremes.pop()
+        extremes.append((t, v))
+        while extremes[0][0] < t - self.window:
+            extremes.popleft()
+
+        self.change = v - extremes[0][1]
+        if not active:
+            return self.change >= self.delta
+        return self.change >= self.delta / 2
+
+    def describe(self, value):
+        return self.message.format(value=value, change=self.change, minutes=self.window / 60)
+
+
+def default_rules(settings=None):
+    settings = settings or load_settings()
+    co2_level = settings.get("co2AlertThreshold", 1500)
+    return [
+        ThresholdRule("co2_high", "co2", co2_level, co2_level - ALERT_CO2_HYSTERESIS, "VENTILATION",
+                      "이산화탄소 농도가 {value:.0f}ppm입니다. 창문을 열어 환기해 주세요."),
+        SlopeRule("co2_rising", "co2", ALERT_CO2_RISE_PPM, ALERT_CO2_RISE_WINDOW, "VENTILATION",
+                  "이산화탄소가 {minutes:.0f}분 동안 {change:.0f}ppm 올랐습니다. 환기를 준비해 주세요."),
+        ThresholdRule("temperature_high", "temperature", ALERT_TEMP_HIGH, ALERT_TEMP_HIGH - 1, "HOT",
+                      "실내 온도가 {value:.1f}도로 높습니다. 냉방을 켜 주세요."),
+        ThresholdRule("temperature_low", "temperature", ALERT_TEMP_LOW, ALERT_TEMP_LOW + 1, "COLD",
+                      "실내 온도가 {value:.1f}도로 낮습니다. 난방을 켜 주세요.", above=False),
+        ThresholdRule("humidity_high", "humidity", ALERT_HUMIDITY_HIGH, ALERT_HUMIDITY_HIGH - 5, "VENTILATION",
+                      "습도가 {value:.0f}%로 높습니다. 환기하거나 제습기를 켜 주세요."),
+    ]
+
+
+class AlertEngine:
+    def __init__(self, rules=None, repeat_interval=ALERT_REPEAT_SECONDS, history=ALERT_HISTORY):
+        self.rules = list(rules) if rules is not None else []
+        self.repeat_interval = repeat_interval
+        self._active = {}               # 규칙 이름 → 발생을 알렸는지 (반복 억제된 경보는 해제도 알리지 않음)
+        self._last_raised = {}          # 규칙 이름 → 마지막으로 알린 시각 (monotonic)
+        self._history = deque(maxlen=history)
+        self._listeners = []
+        self._subscribers = set()
+        self._seq = 0
+        self._lock = threading.Lock()
+        self.stats = {"samples": 0, "raised": 0, "cleared": 0, "suppressed": 0}
+
+    # --------------------------------------------------------
+    # 규칙 / 구독
+    # --------------------------------------------------------
+    def get_rule(self, name):
+        return next((rule for rule in self.rules if rule.name == name), None)
+
+    def add_listener(self, callback):
+        """callback(alert) 등록 (경보 발생/해제마다 호출)"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def subscribe(self):
+        """SSE 구독용 큐 생성"""
+        q = queue.Queue(maxsize=ALERT_STREAM_QUEUE)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    # --------------------------------------------------------
+    # 평가
+    # --------------------------------------------------------
+    def process(self, snapshot):
+        """센서 스냅샷 1개 평가 (device_service 샘플 리스너), 발생한 경보 목록 반환"""
+        t = snapshot.sampled_at
+        alerts = []
+        with self._lock:
+            self.stats["samples"] += 1
+            for rule in self.rules:
+                value = getattr(snapshot, rule.field)
+                if value is None:
+                    continue
+                active = rule.name in self._active
+                now_active = rule.update(t, value, active)
+                if now_active == active:
+                    continue
+
+                if now_active:
+                    last = self._last_raised.get(rule.name)
+                    announce = last is None or t - last >= self.repeat_interval
+                    self._active[rule.name] = announce
+                    if not announce:
+                        self.stats["suppressed"] += 1
+                        continue
+                    self._last_raised[rule.name] = t
+                    alerts.append(self._make_alert_locked(rule, "raised", value, snapshot))
+                elif self._active.pop(rule.name):
+                    alerts.append(self._make_alert_locked(rule, "cleared", value, snapshot))
+
+        for alert in alerts:
+            self._publish(alert)
+        return alerts
+
+    def _make_alert_locked(self, rule, state, value, snapshot):
+        self._seq += 1
+        self.stats[state] += 1
+        alert = {
+            "id": self._seq,
+            "rule": rule.name,
+            "state": state,
+            "field": rule.field,
+            "value": value,
+            "keyword": rule.keyword,
+            "message": rule.describe(value) if state == "raised" else None,
+            "timestamp": snapshot.timestamp or datetime.now().isoformat(),
+        }
+        self._history.append(alert)
+        return alert
+
+    def _publish(self, alert):
+        for callback in list(self._listeners):
+            try:
+                callback(alert)
+            except Exception as e:
+                print(f"[ALERT] 경보 처리 중 오류 발생 ({getattr(callback, '__name__', callback)}): {e}")
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(alert)
+            except queue.Full:
+                # 느린 구독자: 가장 오래된 경보를 버리고 넣음
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    q.put_nowait(alert)
+                except queue.Full:
+                    pass
+
+    # --------------------------------------------------------
+    # 조회
+    # --------------------------------------------------------
+    def active(self):
+        with self._lock:
+            return sorted(self._active)
+
+    def recent(self, limit=None):
+        with self._lock:
+            alerts = list(self._history)
+        return alerts[-limit:] if limit else alerts
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["rules"] = len(self.rules)
+            stats["subscribers"] = len(self._subscribers)
+        return stats
+
+
+# ============================================================
+# 경보 출력 (LED / TTS)
+# ============================================================
+def show_alert_icon(alert):
+    if alert["state"] == "raised":
+        display_icon_by_keyword(alert["keyword"])
+
+
+def speak_alert(alert):
+    """미리 정한 문장 재생 (재생 완료를 기다리지 않음)"""
+    if alert["state"] != "raised":
+        return
+    settings = load_settings()
+    if not settings.get("ttsEnabled", True) or is_quiet_hours(settings):
+        return
+    stream = TtsStream(speed=settings.get("ttsSpeed", 1.0), pitch=settings.get("ttsPitch", 1.0))
+    stream.feed(alert["message"])
+    stream.close()
+
+
+def log_alert(alert):
+    if alert["state"] == "raised":
+        print(f"[ALERT] 🚨 {alert['rule']}: {alert['message']}")
+    else:
+        print(f"[ALERT] 해제: {alert['rule']} (현재 {alert['value']})")
+
+
+def on_settings_changed(new, old, changed):
+    """CO2 경보 임계값 설정 반영"""
+    if "co2AlertThreshold" in changed:
+        rule = alert_engine.get_rule("co2_high")
+        if rule is not None:
+            level = new["co2AlertThreshold"]
+            rule.set_level(level, level - ALERT_CO2_HYSTERESIS)
+            print(f"[ALERT] CO2 경보 임계값 변경: {level}ppm")
+
+
+# 앱 전체에서 공유하는 경보 엔진
+alert_engine = AlertEngine()
+_started = False
+
+
+def add_alert_listener(callback):
+    alert_engine.add_listener(callback)
+
+
+def start_alert_engine():
+    """기본 규칙을 등록하고 센서 샘플 구독 시작 (센서 샘플러보다 먼저 호출)"""
+    global _started
+
+    if _started:
+        return
+    _started = True
+
+    alert_engine.rules = default_rules()
+    alert_engine.add_listener(log_alert)
+    alert_engine.add_listener(show_alert_icon)
+    alert_engine.add_listener(speak_alert)
+    add_settings_listener(on_settings_changed)
+    add_sample_listener(alert_engine.process)
+    print(f"[ALERT] 센서 경보 엔진 시작 (규칙 {len(alert_engine.rules)}개)")
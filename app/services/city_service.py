@@ -0,0 +1,124 @@
+"""
+도시 목록 (cities.json)
+
+앱 시작 후 처음 사용할 때 한 번만 읽어서
+- id → 도시 dict
+- 영어/한국어 이름 정렬 인덱스 (bisect로 접두어 검색)
+- 응답용 JSON 본문과 ETag
+을 미리 만들어 둠
+"""
+import os
+import json
+import bisect
+import difflib
+import hashlib
+import threading
+
+CITIES_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "cities.json")
+CITY_SEARCH_LIMIT = 10
+
+
+def _normalize(name):
+    return " ".join(str(name).lower().split())
+
+
+class CityCatalogue:
+    def __init__(self, path=CITIES_FILE):
+        self.path = path
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._cities = []
+        self._by_id = {}
+        self._name_index = []       # (정규화된 이름, 도시 순번) 정렬 리스트 (영어 + 한국어)
+        self._names = {}            # 정규화된 이름 → [도시 순번] (유사 검색용)
+        self._body = b"[]"
+        self._etag = None
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    cities = json.load(f)
+            except Exception as e:
+                print("❌ ERROR loading cities.json:", e)
+                cities = []
+            self._build(cities)
+            self._loaded = True
+
+    def _build(self, cities):
+        self._cities = cities
+        self._by_id = {str(c["id"]): c for c in cities}
+
+        index = []
+        names = {}
+        for i, city in enumerate(cities):
+            for key in ("name", "name_ko"):
+                if city.get(key):
+                    name = _normalize(city[key])
+                    index.append((name, i))
+                    names.setdefault(name, []).append(i)
+        index.sort()
+        self._name_index = index
+        self._names = names
+
+        self._body = json.dumps(cities, ensure_ascii=False).encode("utf-8")
+        self._etag = hashlib.sha1(self._body).hexdigest()[:16]
+
+    # --------------------------------------------------------
+    # 조회
+    # --------------------------------------------------------
+    def get(self, city_id):
+        """id로 도시 조회 (없으면 None)"""
+        self._ensure_loaded()
+        return self._by_id.get(str(city_id))
+
+    def all(self):
+        self._ensure_loaded()
+        return list(self._cities)
+
+    def json_body(self):
+        """(응답 본문 bytes, ETag) - 요청마다 직렬화하지 않음"""
+        self._ensure_loaded()
+        return self._body, self._etag
+
+    def search(self, query, limit=CITY_SEARCH_LIMIT):
+        """
+        이름(영어/한국어)으로 검색
+        1) 접두어 일치 (정렬 인덱스 + bisect)
+        2) 결과가 부족하면 difflib 유사도 검색 (오타 허용)
+        """
+        self._ensure_loaded()
+        q = _normalize(query)
+        if not q or limit <= 0:
+            return []
+
+        seen = set()
+        results = []
+
+        def add(i):
+            if i not in seen:
+                seen.add(i)
+                results.append(self._cities[i])
+
+        start = bisect.bisect_left(self._name_index, (q,))
+        for name, i in self._name_index[start:]:
+            if not name.startswith(q) or len(results) >= limit:
+                break
+            add(i)
+
+        if len(results) < limit:
+            for name in difflib.get_close_matches(q, self._names.keys(), n=limit, cutoff=0.6):
+                for i in self._names[name]:
+                    if len(results) >= limit:
+                        break
+                    add(i)
+
+        return results
+
+
+# 앱 전체에서 공유하는 도시 목록
+city_catalogue = CityCatalogue()
@@ -0,0 +1,200 @@
+"""
+UART CO2 센서 (CM1106 계열) 연결 관리
+시리얼 포트를 한 번 열어 계속 재사용하고, 끊어지면 자동으로 다시 연결
+"""
+import os
+import time
+import threading
+
+try:
+    import serial
+    SERIAL_AVAILABLE = True
+except ImportError:
+    serial = None
+    SERIAL_AVAILABLE = False
+    print("Warning: pyserial library not available. CO2 will be reported as None.")
+
+# CO2 센서 UART 설정
+SERIAL_PORT = os.getenv("CO2_SERIAL_PORT", "/dev/serial0")
+BAUD_RATE = 9600
+# 9600bps에서 8바이트 응답은 약 8ms, 센서 처리 시간을 포함해도 수십 ms 이내
+CO2_READ_TIMEOUT = float(os.getenv("CO2_READ_TIMEOUT", 0.2))        # 초
+CO2_RECONNECT_INTERVAL = float(os.getenv("CO2_RECONNECT_INTERVAL", 5))  # 초
+
+# CO2 읽기 명령 (Hex: 11 01 01 ED)
+READ_CO2_COMMAND = bytes([0x11, 0x01, 0x01, 0xED])
+# 응답 프레임: 16 05 01 DF1 DF2 DF3 DF4 CS (8바이트)
+RESPONSE_HEADER = bytes([0x16, 0x05, 0x01])
+RESPONSE_LENGTH = 8
+
+
+def checksum(frame):
+    """CS = 256 - (앞쪽 바이트 합 % 256)"""
+    return (256 - sum(frame) % 256) % 256
+
+
+class Co2SensorConnection:
+    """
+    CO2 센서 시리얼 연결
+
+    - 포트는 최초 읽기 시 열고 이후 계속 유지
+    - 읽기/쓰기 오류가 나면 포트를 닫고, CO2_RECONNECT_INTERVAL 이후 다시 연결
+    - 응답이 헤더로 시작하지 않으면 헤더를 찾아 프레임을 재정렬 (resync)
+    - 체크섬이 맞지 않는 프레임은 버림
+    """
+
+    def __init__(self, port=SERIAL_PORT, baudrate=BAUD_RATE,
+                 timeout=CO2_READ_TIMEOUT, reconnect_interval=CO2_RECONNECT_INTERVAL):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.reconnect_interval = reconnect_interval
+
+        self._serial = None
+        self._lock = threading.Lock()
+        self._last_open_attempt = None
+        self._ever_opened = False
+
+        self.stats = {
+            "reads": 0,
+            "ok": 0,
+            "timeouts": 0,
+            "bad_frames": 0,
+            "resyncs": 0,
+            "reconnects": 0,
+            "errors": 0,
+            "last_latency_ms": None,
+        }
+        self._latency_total = 0.0
+
+    # --------------------------------------------------------
+    # 연결 관리
+    # --------------------------------------------------------
+    def _ensure_open(self):
+        """포트가 닫혀 있으면 연다. 재연결 간격 이내면 열지 않고 False 반환"""
+        if self._serial is not None and self._serial.is_open:
+            return True
+
+        now = time.monotonic()
+        if self._last_open_attempt is not None and now - self._last_open_attempt < self.reconnect_interval:
+            return False
+        self._last_open_attempt = now
+
+        try:
+            self._serial = serial.Serial(self.port, self.baudrate, timeout=self.timeout)
+            self._serial.reset_input_buffer()
+        except Exception as e:
+            self._serial = None
+            self.stats["errors"] += 1
+            print(f"[CO2] 시리얼 포트 열기 실패 ({self.port}): {e}")
+            return False
+
+        if self._ever_opened:
+            self.stats["reconnects"] += 1
+            print(f"[CO2] 시리얼 포트 재연결: {self.port}")
+        else:
+            print(f"[CO2] 시리얼 포트 연결: {self.port}")
+        self._ever_opened = True
+        return True
+
+    def _drop_connection(self):
+        if self._serial is not None:
+            try:
+                self._serial.close()
+            except Exception:
+                pass
+        self._serial = None
+
+    def close(self):
+        """포트 닫기"""
+        with self._lock:
+            self._drop_connection()
+
+    # --------------------------------------------------------
+    # 프레임 읽기
+    # --------------------------------------------------------
+    def _read_frame(self):
+        """
+        응답 프레임 1개를 읽는다
+        헤더 앞에 끼어든 바이트는 버리고 헤더부터 8바이트를 맞춘다
+        """
+        deadline = time.monotonic() + self.timeout
+        buf = self._serial.read(RESPONSE_LENGTH)
+        resynced = False
+
+        while True:
+            idx = buf.find(RESPONSE_HEADER)
+            if idx > 0 or (idx < 0 and len(buf) >= len(RESPONSE_HEADER)):
+                # 헤더가 맨 앞이 아님 → 앞쪽 쓰레기 바이트 제거
+                resynced = True
+                keep = idx if idx >= 0 else len(buf) - (len(RESPONSE_HEADER) - 1)
+                buf = buf[keep:]
+
+            if buf.startswith(RESPONSE_HEADER) and len(buf) >= RESPONSE_LENGTH:
+                if resynced:
+                    self.stats["resyncs"] += 1
+                return buf[:RESPONSE_LENGTH]
+
+            if time.monotonic() >= deadline:
+                return None
+
+            chunk = self._serial.read(RESPONSE_LENGTH - len(buf) if buf.startswith(RESPONSE_HEADER) else 1)
+            if not chunk:
+                return None
+            buf += chunk
+
+    def read_ppm(self):
+        """
+        CO2 농도(ppm) 읽기
+
+        Returns:
+            int | None: 실패(연결 불가/타임아웃/체크섬 오류) 시 None
+        """
+        with self._lock:
+            self.stats["reads"] += 1
+
+            if not self._ensure_open():
+                return None
+
+            started = time.monotonic()
+            try:
+                # 이전 요청의 늦은 응답이 남아 있으면 버림
+                self._serial.reset_input_buffer()
+                self._serial.write(READ_CO2_COMMAND)
+                frame = self._read_frame()
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[CO2] 시리얼 통신 오류, 연결을 닫습니다: {e}")
+                self._drop_connection()
+                return None
+
+            if frame is None:
+                self.stats["timeouts"] += 1
+                return None
+
+            if checksum(frame[:-1]) != frame[-1]:
+                self.stats["bad_frames"] += 1
+                print(f"[CO2] 체크섬 불일치: {frame.hex(' ')}")
+                return None
+
+            latency = time.monotonic() - started
+            self.stats["ok"] += 1
+            self.stats["last_latency_ms"] = round(latency * 1000, 1)
+            self._latency_total += latency
+
+            # CO2 농도 = DF1 * 256 + DF2
+            return frame[3] * 256 + frame[4]
+
+    def get_stats(self):
+        """읽기 통계 반환"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["connected"] = self._serial is not None and self._serial.is_open
+        stats["avg_latency_ms"] = round(self._latency_total / stats["ok"] * 1000, 1) if stats["ok"] else None
+        stats["port"] = self.port
+        stats["timeout_seconds"] = self.timeout
+        return stats
+
+
+# 앱 전체에서 공유하는 CO2 센서 연결
+co2_sensor = Co2SensorConnection()
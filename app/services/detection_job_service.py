@@ -0,0 +1,227 @@
+"""
+사람 감지 작업 큐 + 프로세스 풀
+
+- OpenCV 감지는 별도 워커 프로세스에서 실행 (Flask 프로세스의 GIL/CPU를 점유하지 않음)
+  프레임 캡처는 카메라를 가진 현재 프로세스에서 하고, 프레임만 워커로 넘김
+- HTTP 요청은 작업을 큐에 넣고 바로 작업 ID를 반환 (상태/결과는 별도 조회)
+- 큐가 가득 차면 JobQueueFull을 발생시켜 라우트에서 429로 응답 (back-pressure)
+"""
+import os
+import uuid
+import queue
+import atexit
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from app.services.person_detection_service import (
+    OPENCV_AVAILABLE, camera, detect_person_from_webcam,
+    _detect_person_in_frame, _detection_result, _update_latest_detection,
+)
+
+# 감지 워커 프로세스 수
+DETECTION_WORKERS = int(os.getenv("DETECTION_WORKERS", 1))
+# 워커 프로세스 시작 방식 (spawn: 스레드가 많은 Flask 프로세스를 fork 하지 않음)
+DETECTION_MP_START = os.getenv("DETECTION_MP_START", "spawn")
+# 워커 감지 최대 대기 시간 (초)
+DETECTION_TIMEOUT = float(os.getenv("DETECTION_TIMEOUT", 30))
+# 대기 가능한 작업 수 (넘으면 429)
+DETECTION_QUEUE_SIZE = int(os.getenv("DETECTION_QUEUE_SIZE", 4))
+# 작업을 처리하는 스레드 수 (감지 작업이 조언 작업 뒤에서 오래 기다리지 않도록 2개)
+DETECTION_JOB_THREADS = int(os.getenv("DETECTION_JOB_THREADS", 2))
+# 완료된 작업 기록 보관 개수
+DETECTION_JOB_HISTORY = int(os.getenv("DETECTION_JOB_HISTORY", 100))
+
+
+class JobQueueFull(Exception):
+    """대기 중인 작업이 너무 많음 (잠시 후 다시 시도)"""
+
+
+# --------------------------------------------------------
+# 프로세스 풀
+# --------------------------------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=DETECTION_WORKERS,
+                mp_context=multiprocessing.get_context(DETECTION_MP_START),
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+
+
+def shutdown_detection_pool():
+    _reset_pool()
+
+
+atexit.register(shutdown_detection_pool)
+
+
+def detect_person_offloaded():
+    """
+    웹캠 프레임을 캡처하고 감지는 워커 프로세스에서 실행 (결과 형식은 detect_person_from_webcam과 동일)
+    """
+    if not OPENCV_AVAILABLE:
+        # mock 데이터는 계산이 없으므로 그대로 사용
+        return detect_person_from_webcam()
+
+    frame, error = camera.read_frame()
+    if error:
+        print(f"[ERROR] {error}")
+        result = _detection_result(False, error)
+        _update_latest_detection(result)
+        return result
+
+    try:
+        detected = _get_pool().submit(_detect_person_in_frame, frame).result(timeout=DETECTION_TIMEOUT)
+        result = _detection_result(detected)
+    except FutureTimeout:
+        print(f"[DETECTION] 워커 감지 시간 초과 ({DETECTION_TIMEOUT}초)")
+        result = _detection_result(False, "감지 시간 초과")
+    except BrokenProcessPool:
+        # 워커가 비정상 종료되면 풀을 새로 만들고 이번에는 현재 프로세스에서 감지
+        print("[DETECTION] 워커 프로세스 오류, 풀을 재생성합니다.")
+        _reset_pool()
+        result = _detection_result(_detect_person_in_frame(frame))
+
+    _update_latest_detection(result)
+    return result
+
+
+# --------------------------------------------------------
+# 작업 큐
+# --------------------------------------------------------
+class Job:
+    def __init__(self, kind, func, args):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.func = func
+        self.args = args
+        self.status = "queued"          # queued → running → done / error
+        self.result = None
+        self.error = None
+        self.submitted_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self):
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == "done":
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+class JobQueue:
+    def __init__(self, max_pending=DETECTION_QUEUE_SIZE, threads=DETECTION_JOB_THREADS,
+                 history=DETECTION_JOB_HISTORY):
+        self.max_pending = max_pending
+        self.threads = threads
+        self.history = history
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._jobs = OrderedDict()      # id → Job (오래된 완료 작업부터 삭제)
+        self._lock = threading.Lock()
+        self._workers = []
+        self.stats = {"submitted": 0, "rejected": 0, "done": 0, "failed": 0}
+
+    def _ensure_workers(self):
+        """락을 잡은 상태에서 호출. 처음 작업이 들어올 때 처리 스레드 시작"""
+        if self._workers:
+            return
+        for i in range(self.threads):
+            worker = threading.Thread(target=self._worker_loop, name=f"detection-job-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, kind, func, *args):
+        """작업을 큐에 넣고 Job 반환 (큐가 가득 차면 JobQueueFull)"""
+        job = Job(kind, func, args)
+        with self._lock:
+            self._ensure_workers()
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self.stats["rejected"] += 1
+                raise JobQueueFull(f"대기 중인 작업이 {self.max_pending}개를 넘었습니다.")
+            self._jobs[job.id] = job
+            self.stats["submitted"] += 1
+            self._trim_locked()
+        return job
+
+    def _trim_locked(self):
+        """완료된 작업 기록이 보관 개수를 넘으면 오래된 것부터 삭제"""
+        excess = len(self._jobs) - self.history
+        if excess <= 0:
+            return
+        for job_id in [j.id for j in self._jobs.values() if j.status in ("done", "error")][:excess]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+    def _worker_loop(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                job.status = "running"
+                job.started_at = datetime.now().isoformat()
+            try:
+                result = job.func(*job.args)
+                with self._lock:
+                    job.result = result
+                    job.status = "done"
+                    self.stats["done"] += 1
+            except Exception as e:
+                print(f"[DETECTION] 작업 실패 ({job.kind}): {e}")
+                with self._lock:
+                    job.error = str(e)
+                    job.status = "error"
+                    self.stats["failed"] += 1
+            finally:
+                with self._lock:
+                    job.finished_at = datetime.now().isoformat()
+                self._queue.task_done()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["pending"] = self._queue.qsize()
+            stats["running"] = sum(1 for j in self._jobs.values() if j.status == "running")
+        stats["max_pending"] = self.max_pending
+        stats["workers"] = DETECTION_WORKERS
+        return stats
+
+
+# 앱 전체에서 공유하는 감지 작업 큐
+detection_jobs = JobQueue()
+
+
+def submit_detection_job():
+    """사람 감지 작업 제출"""
+    return detection_jobs.submit("detect", detect_person_offloaded)
@@ -1,4 +1,10 @@
+import os
+import json
+import time
+import tempfile
 import threading
+from collections import namedtuple
+from datetime import datetime
 
 try:
     from sense_hat import SenseHat
@@ -7,263 +13,376 @@ try:
 except (ImportError, Exception) as e:
     sense = None
     SENSEHAT_AVAILABLE = False
-    print(f"Warning: sense_hat library not available ({e}). Using mock data.")
+    print(f"Warning: sense_hat library not available ({e}). Temperature/humidity will be reported as None.")
 
-# LED 자동 끄기 타이머 관련
-LED_TIMEOUT_SECONDS = 30
-_led_timer = None
-_led_timer_lock = threading.Lock()
+# LED 표시 (렌더러 스레드 1개가 프레임 비교/애니메이션/자동 끄기를 처리)
+from app.services.led_service import (
+    LedRenderer, SenseHatBackend, HeadlessFramebuffer, ICONS, LOADING_FRAMES, LED_SPINNER_INTERVAL,
+)
+
+LED_TIMEOUT_SECONDS = float(os.getenv("LED_TIMEOUT_SECONDS", 30))
+# 로딩 스피너가 결과 없이 계속 돌지 않도록 하는 상한
+LED_LOADING_TIMEOUT = float(os.getenv("LED_LOADING_TIMEOUT", 60))
+
+led_renderer = LedRenderer(SenseHatBackend(sense) if SENSEHAT_AVAILABLE else HeadlessFramebuffer())
+
+# CO2 센서 UART 연결 (포트를 열어둔 채 재사용)
+from app.services.co2_sensor_service import SERIAL_AVAILABLE, co2_sensor
+
+# 센서 샘플러 설정
+# - 샘플러 스레드가 주기적으로 하드웨어를 읽고 스냅샷을 교체
+# - 요청 핸들러는 하드웨어에 접근하지 않고 스냅샷만 읽음
+SENSOR_SAMPLE_INTERVAL = float(os.getenv("SENSOR_SAMPLE_INTERVAL", 5))   # 초
+# 스냅샷이 이보다 오래되면 (샘플러 정지/지연) 요청 시 직접 읽음
+SENSOR_MAX_AGE = float(os.getenv("SENSOR_MAX_AGE", SENSOR_SAMPLE_INTERVAL * 3))
+# 개발용: 센서 값이 없을 때 API 응답에만 mock 값을 채움 (스냅샷/리스너/기록에는 항상 실제 값 또는 None)
+SENSOR_MOCK = os.getenv("SENSOR_MOCK", "0") == "1"
+
+# 워커 프로세스가 여러 개(gunicorn)일 때 리더 워커의 샘플러가 스냅샷을 게시하는 파일
+# 리더가 아닌 워커는 센서 하드웨어(UART/Sense HAT)를 열지 않고 이 파일만 읽음
+SENSOR_SNAPSHOT_FILE = os.getenv(
+    "SENSOR_SNAPSHOT_FILE",
+    os.path.join(tempfile.gettempdir(), "embedded-project-sensor.json")
+)
+
+# 최근 센서 데이터 스냅샷 (불변 객체, 통째로 교체하므로 읽을 때 락 불필요)
+SensorSnapshot = namedtuple(
+    "SensorSnapshot",
+    ["temperature", "humidity", "co2", "timestamp", "sampled_at"]  # sampled_at: time.monotonic()
+)
+_latest_snapshot = SensorSnapshot(None, None, None, None, None)
+
+# 하드웨어 읽기 직렬화 (샘플러와 강제 읽기가 동시에 센서를 건드리지 않도록)
+_sample_lock = threading.Lock()
+_sampler_thread = None
+_sampler_stop = threading.Event()
+
+# 새 샘플이 게시될 때마다 호출되는 콜백 (기록 버퍼 등)
+_sample_listeners = []
+
+# True: 리더가 아닌 워커 (리더가 게시한 스냅샷 파일만 읽음)
+_shared_reader = False
+_shared_cache = (None, None)   # (파일 mtime_ns, 스냅샷)
 
-try:
-    import serial
-    SERIAL_AVAILABLE = True
-except ImportError:
-    SERIAL_AVAILABLE = False
-    print("Warning: pyserial library not available. CO2 sensor will use mock data.")
-
-# CO2 센서 UART 설정
-SERIAL_PORT = '/dev/serial0'
-BAUD_RATE = 9600
-_serial_lock = threading.Lock()
-
-# 최근 센서 데이터를 저장 (내부적으로 사용)
-latest_sensor_data = {
-    "temperature": None,
-    "humidity": None,
-    "co2": None,
-    "timestamp": None
-}
 
-def read_sensor_data():
-    """Sense HAT에서 온도와 습도를 읽고, CO2 센서도 함께 읽어옴"""
-    from datetime import datetime
+class SensorUnavailable(Exception):
+    """리더 워커가 게시한 스냅샷이 아직 없음 (리더가 아닌 워커는 하드웨어를 직접 읽지 않음)"""
+
+
+def add_sample_listener(callback):
+    """새 스냅샷이 게시될 때 callback(snapshot) 호출"""
+    if callback not in _sample_listeners:
+        _sample_listeners.append(callback)
+
+
+def _notify_sample_listeners(snapshot):
+    for callback in list(_sample_listeners):
+        try:
+            callback(snapshot)
+        except Exception as e:
+            print(f"[SENSOR] 샘플 리스너 오류 ({getattr(callback, '__name__', callback)}): {e}")
+
+
+def _mock_values(data):
+    """개발 환경용 목(mock) 데이터: 비어 있는 센서 값만 채우고 채운 항목을 mock에 표시"""
     import random
 
-    # 1. Sense HAT 온도/습도 읽기
+    mock = {
+        "temperature": lambda: round(20 + random.uniform(-5, 5), 2),
+        "humidity": lambda: round(50 + random.uniform(-10, 10), 2),
+        "co2": lambda: random.randint(400, 1000),
+    }
+    filled = [field for field in mock if data.get(field) is None]
+    for field in filled:
+        data[field] = mock[field]()
+    if filled:
+        data["mock"] = filled
+    return data
+
+
+def _snapshot_to_dict(snapshot, source):
+    """스냅샷을 API 응답용 dict로 변환 (age_seconds: 측정 후 경과 시간, 읽기 실패한 값은 None)"""
+    age = None
+    if snapshot.sampled_at is not None:
+        age = round(time.monotonic() - snapshot.sampled_at, 2)
+
+    data = {
+        "temperature": snapshot.temperature,
+        "humidity": snapshot.humidity,
+        "co2": snapshot.co2,
+        "timestamp": snapshot.timestamp,
+        "age_seconds": age,
+        "source": source,
+    }
+    return _mock_values(data) if SENSOR_MOCK else data
+
+
+# ============================================================
+# 워커 간 스냅샷 공유 (리더 워커 → 나머지 워커)
+# ============================================================
+def _publish_shared_snapshot(_sample):
+    """
+    샘플 리스너 (리더): 다른 워커가 읽도록 스냅샷 파일을 원자적으로 교체
+    리스너 인자 대신 전체 스냅샷을 씀 (CO2만 다시 읽은 경우에도 온도/습도 유지)
+    """
+    tmp_path = f"{SENSOR_SNAPSHOT_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_latest_snapshot._asdict(), f)
+        os.replace(tmp_path, SENSOR_SNAPSHOT_FILE)
+    except OSError as e:
+        print(f"[SENSOR] 공유 스냅샷 저장 실패: {e}")
+
+
+def _read_shared_snapshot():
+    """리더 워커가 게시한 스냅샷 (파일이 바뀌었을 때만 다시 파싱, 없으면 None)"""
+    global _shared_cache
+
+    try:
+        mtime = os.stat(SENSOR_SNAPSHOT_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+    cached_mtime, snapshot = _shared_cache
+    if mtime != cached_mtime:
+        try:
+            with open(SENSOR_SNAPSHOT_FILE, encoding="utf-8") as f:
+                snapshot = SensorSnapshot(**json.load(f))
+        except (OSError, ValueError, TypeError) as e:
+            print(f"[SENSOR] 공유 스냅샷 읽기 실패: {e}")
+            return None
+        _shared_cache = (mtime, snapshot)
+
+    # sampled_at은 time.monotonic() (같은 부팅 안에서는 프로세스 간에도 같은 시계)
+    # 이전 부팅에서 남은 파일이면 현재 시각보다 미래 값이 되므로 버림
+    if snapshot.sampled_at is None or snapshot.sampled_at > time.monotonic():
+        return None
+    return snapshot
+
+
+def use_shared_snapshot():
+    """리더가 아닌 워커: 센서 하드웨어 대신 리더 워커가 게시한 스냅샷만 읽도록 전환"""
+    global _shared_reader
+    _shared_reader = True
+
+
+def _shared_snapshot_or_raise():
+    snapshot = _read_shared_snapshot()
+    if snapshot is None:
+        raise SensorUnavailable("리더 워커의 센서 스냅샷이 아직 없습니다.")
+    return snapshot
+
+
+def _read_temperature_humidity():
+    """Sense HAT에서 온도와 습도를 읽음 (실패 시 (None, None))"""
     if SENSEHAT_AVAILABLE:
         try:
-            temp = sense.get_temperature()
-            humidity = sense.get_humidity()
+            return sense.get_temperature(), sense.get_humidity()
         except Exception as e:
             print(f"[ERROR] Sense HAT 센서 읽기 실패: {e}")
-            print("[INFO] Mock 데이터를 사용합니다.")
-            temp = round(20 + random.uniform(-5, 5), 2)
-            humidity = round(50 + random.uniform(-10, 10), 2)
-    else:
-        # 개발 환경용 목(mock) 데이터
-        print("[INFO] Sense HAT이 연결되지 않았습니다. Mock 데이터를 사용합니다.")
-        temp = round(20 + random.uniform(-5, 5), 2)
-        humidity = round(50 + random.uniform(-10, 10), 2)
-
-    # 2. CO2 센서 읽기
-    co2_value = _read_co2_internal()
-
-    # 3. 내부적으로 최신 데이터 저장
-    latest_sensor_data["temperature"] = round(temp, 2)
-    latest_sensor_data["humidity"] = round(humidity, 2)
-    latest_sensor_data["co2"] = co2_value
-    latest_sensor_data["timestamp"] = datetime.now().isoformat()
-
-    return latest_sensor_data.copy()
+    return None, None
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+def _sample_sensors():
+    """하드웨어에서 온도/습도/CO2를 읽고 새 스냅샷을 게시"""
+    global _latest_snapshot
+
+    with _sample_lock:
+        temp, humidity = _read_temperature_humidity()
+        co2_value = _read_co2_internal()
+
+        snapshot = SensorSnapshot(
+            temperature=_round(temp),
+            humidity=_round(humidity),
+            co2=co2_value,
+            timestamp=datetime.now().isoformat(),
+            sampled_at=time.monotonic(),
+        )
+        _latest_snapshot = snapshot
+
+    _notify_sample_listeners(snapshot)
+    return snapshot
+
+
+def is_sensor_sampler_running():
+    return _sampler_thread is not None and _sampler_thread.is_alive()
+
+
+def read_sensor_data(fresh=False):
+    """
+    온도/습도/CO2 데이터 반환
+
+    Args:
+        fresh: True면 스냅샷을 무시하고 하드웨어에서 직접 읽음
+
+    샘플러가 동작 중이고 스냅샷이 SENSOR_MAX_AGE 이내면 하드웨어 접근 없이 스냅샷을 반환
+    리더가 아닌 워커는 fresh와 관계없이 리더의 스냅샷을 반환 (SENSOR_MAX_AGE를 넘으면 source="stale")
+
+    Raises:
+        SensorUnavailable: 리더가 아닌 워커인데 리더의 스냅샷이 아직 없을 때
+    """
+    if _shared_reader:
+        snapshot = _shared_snapshot_or_raise()
+        fresh_enough = time.monotonic() - snapshot.sampled_at <= SENSOR_MAX_AGE
+        return _snapshot_to_dict(snapshot, "shared" if fresh_enough else "stale")
+
+    snapshot = _latest_snapshot
+
+    if not fresh and is_sensor_sampler_running() and snapshot.sampled_at is not None:
+        if time.monotonic() - snapshot.sampled_at <= SENSOR_MAX_AGE:
+            return _snapshot_to_dict(snapshot, "sampler")
+
+    return _snapshot_to_dict(_sample_sensors(), "live")
+
 
 def get_latest_sensor_data():
     """저장된 최신 센서 데이터 반환"""
-    return latest_sensor_data.copy()
+    if _shared_reader:
+        return _snapshot_to_dict(_read_shared_snapshot() or _latest_snapshot, "shared")
+    return _snapshot_to_dict(_latest_snapshot, "sampler" if is_sensor_sampler_running() else "cache")
+
+
+def _sampler_loop(interval):
+    print(f"[SENSOR] 센서 샘플러 시작 ({interval}초 간격)")
+    while not _sampler_stop.is_set():
+        try:
+            _sample_sensors()
+        except Exception as e:
+            print(f"[SENSOR] 샘플링 중 오류 발생: {e}")
+        _sampler_stop.wait(interval)
+    print("[SENSOR] 센서 샘플러 종료")
+
+
+def start_sensor_sampler(interval=None):
+    """백그라운드 스레드에서 센서 샘플러 실행"""
+    global _sampler_thread
+
+    if is_sensor_sampler_running():
+        print("[WARNING] 센서 샘플러가 이미 실행 중입니다.")
+        return _sampler_thread
+
+    # 리더가 아닌 워커가 읽을 수 있도록 샘플마다 스냅샷 파일 갱신
+    add_sample_listener(_publish_shared_snapshot)
+
+    _sampler_stop.clear()
+    _sampler_thread = threading.Thread(
+        target=_sampler_loop,
+        args=(interval or SENSOR_SAMPLE_INTERVAL,),
+        name="sensor-sampler",
+        daemon=True,
+    )
+    _sampler_thread.start()
+    return _sampler_thread
+
+
+def stop_sensor_sampler():
+    """센서 샘플러 중지"""
+    global _sampler_thread
+    _sampler_stop.set()
+    if _sampler_thread is not None:
+        _sampler_thread.join(timeout=SENSOR_SAMPLE_INTERVAL + 2)
+        _sampler_thread = None
 
 def _read_co2_internal():
-    """내부용: CO2 센서 값만 읽어서 반환 (저장하지 않음)"""
-    import random
+    """내부용: CO2 센서 값만 읽어서 반환 (저장하지 않음, 실패 시 None)"""
+    if not SERIAL_AVAILABLE:
+        return None
+
+    co2_value = co2_sensor.read_ppm()
+    if co2_value is not None:
+        return co2_value
 
-    if SERIAL_AVAILABLE:
-        with _serial_lock:
-            try:
-                # 시리얼 포트 열기
-                ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
-
-                # CO2 읽기 명령 (Hex: 11 01 01 ED)
-                cmd = bytearray([0x11, 0x01, 0x01, 0xED])
-
-                # 명령 전송
-                ser.write(cmd)
-
-                # 응답 데이터 읽기 (8바이트)
-                response = ser.read(8)
-
-                if len(response) == 8:
-                    # CO2 농도 = DF1 * 256 + DF2
-                    co2_value = response[3] * 256 + response[4]
-                    print(f"현재 CO2 농도: {co2_value} ppm")
-                else:
-                    print("[WARNING] CO2 센서 응답 없음. Mock 데이터를 사용합니다.")
-                    co2_value = random.randint(400, 1000)
-
-                ser.close()
-                return co2_value
-
-            except Exception as e:
-                print(f"[ERROR] CO2 센서 읽기 실패: {e}")
-                print("[INFO] Mock 데이터를 사용합니다.")
-                return random.randint(400, 1000)
-    else:
-        # pyserial 없을 때 mock 데이터
-        print("[INFO] pyserial이 설치되지 않았습니다. Mock 데이터를 사용합니다.")
-        return random.randint(400, 1000)
+    print("[WARNING] CO2 센서 응답 없음.")
+    return None
+
+def get_co2_sensor_stats():
+    """CO2 센서 연결 통계 (재연결/불량 프레임/타임아웃 횟수, 지연 시간)"""
+    return co2_sensor.get_stats()
 
 def read_co2_sensor():
-    """UART를 통해 CO2 센서에서 데이터를 읽어옴 (API 엔드포인트용)"""
-    from datetime import datetime
+    """
+    UART를 통해 CO2 센서에서 데이터를 읽어옴 (API 엔드포인트용)
+    리더가 아닌 워커는 UART를 열지 않고 리더의 스냅샷 값을 반환
+
+    온도/습도는 이전 값을 유지한 채 CO2와 측정 시각만 갱신한 스냅샷을 게시하고,
+    샘플 리스너(기록/로그/경보)에는 이번에 실제로 읽은 CO2만 담아(온도/습도 None) 알림
+    """
+    global _latest_snapshot
+
+    if _shared_reader:
+        snapshot = _shared_snapshot_or_raise()
+        return {"co2": snapshot.co2, "timestamp": snapshot.timestamp}
 
     # CO2 센서 읽기
-    co2_value = _read_co2_internal()
+    with _sample_lock:
+        co2_value = _read_co2_internal()
+
+        # 온도/습도는 유지하고 CO2만 갱신한 스냅샷 게시
+        snapshot = _latest_snapshot._replace(
+            co2=co2_value,
+            timestamp=datetime.now().isoformat(),
+            sampled_at=time.monotonic(),
+        )
+        _latest_snapshot = snapshot
 
-    # 내부적으로 최신 데이터 저장
-    latest_sensor_data["co2"] = co2_value
-    latest_sensor_data["timestamp"] = datetime.now().isoformat()
+    # 다시 읽지 않은 온도/습도가 기록에 중복으로 쌓이지 않도록 비워서 전달
+    _notify_sample_listeners(snapshot._replace(temperature=None, humidity=None))
 
     return {
         "co2": co2_value,
-        "timestamp": latest_sensor_data["timestamp"]
+        "timestamp": snapshot.timestamp
     }
-    
-blue = (0, 150, 255)
-red = (255, 0, 0)
-nothing = (0,0,0)
 
-def umbrella():
+# LED 아이콘 (프레임은 led_service에서 미리 만들어 둠, 표시 시간 만료도 렌더러 스레드가 처리)
+KEYWORD_ICONS = {
+    "VENTILATION": "window",
+    "HEATING": "hot",   # 난방 (따뜻함)
+    "COOLING": "cold",  # 냉방 (시원함)
+    "UMBRELLA": "umbrella",
+    "COLD": "cold",
+    "HOT": "hot",
+}
+
+def _show_icon(name, timeout=None):
     if not SENSEHAT_AVAILABLE:
-        print("[MOCK] Displaying umbrella icon")
-        return
-    B = blue
-    O = nothing
-    img = [
-    O, O, O, B, B, O, O, O,
-    O, O, B, B, B, B, O, O,
-    O, B, B, B, B, B, B, O,
-    B, B, B, B, B, B, B, B,
-    O, O, O, O, B, O, O, O,
-    O, O, O, O, B, O, O, O,
-    O, O, B, O, B, O, O, O,
-    O, O, B, B, B, O, O, O
-    ]
-    sense.set_pixels(img)
+        print(f"[MOCK] Displaying {name} icon")
+    led_renderer.show(ICONS[name], timeout=timeout)
+
+def umbrella():
+    _show_icon("umbrella")
 
 def window():
-    if not SENSEHAT_AVAILABLE:
-        print("[MOCK] Displaying window icon")
-        return
-    B = blue
-    O = nothing
-    img = [
-    O, O, O, O, O, O, O, O,
-    O, B, B, B, O, B, B, B,
-    O, B, B, B, O, B, B, B,
-    O, B, B, B, O, B, B, B,
-    O, O, O, O, O, O, O, O,
-    O, B, B, B, O, B, B, B,
-    O, B, B, B, O, B, B, B,
-    O, B, B, B, O, B, B, B
-    ]
-    sense.set_pixels(img)
+    _show_icon("window")
 
 def cold():
-    if not SENSEHAT_AVAILABLE:
-        print("[MOCK] Displaying cold icon")
-        return
-    B = blue
-    O = nothing
-    img = [
-    O, B, O, O, B, O, O, B,
-    O, O, B, O, B, O, B, O,
-    O, O, O, B, B, B, O, O,
-    O, B, B, B, B, B, B, B,
-    O, O, O, B, B, B, O, O,
-    O, O, B, O, B, O, B, O,
-    O, B, O, O, B, O, O, B,
-    O, O, O, O, O, O, O, O
-    ]
-    sense.set_pixels(img)
+    _show_icon("cold")
 
 def hot():
-    if not SENSEHAT_AVAILABLE:
-        print("[MOCK] Displaying hot icon")
-        return
-    B = red
-    O = nothing
-    img = [
-    O, B, O, O, B, O, O, B,
-    O, O, B, O, B, O, B, O,
-    O, O, O, B, B, B, O, O,
-    O, B, B, B, B, B, B, B,
-    O, O, O, B, B, B, O, O,
-    O, O, B, O, B, O, B, O,
-    O, B, O, O, B, O, O, B,
-    O, O, O, O, O, O, O, O
-    ]
-    sense.set_pixels(img)
+    _show_icon("hot")
+
+def show_loading(timeout=LED_LOADING_TIMEOUT):
+    """처리 중임을 알리는 LED 표시 (노란 점이 테두리를 도는 스피너)"""
+    led_renderer.animate(LOADING_FRAMES, LED_SPINNER_INTERVAL, timeout=timeout)
 
 def clear_display():
     """LED 디스플레이를 끕니다."""
-    if SENSEHAT_AVAILABLE:
-        sense.clear()
-    else:
+    if not SENSEHAT_AVAILABLE:
         print("[MOCK] Clearing display")
-
-def _cancel_led_timer():
-    """기존 LED 타이머가 있으면 취소합니다."""
-    global _led_timer
-    with _led_timer_lock:
-        if _led_timer is not None:
-            _led_timer.cancel()
-            _led_timer = None
-
-def _start_led_timer():
-    """LED를 15초 후 자동으로 끄는 타이머를 시작합니다."""
-    global _led_timer
-    _cancel_led_timer()
-    with _led_timer_lock:
-        _led_timer = threading.Timer(LED_TIMEOUT_SECONDS, _auto_clear_display)
-        _led_timer.daemon = True
-        _led_timer.start()
-        print(f"[LED] 타이머 시작: {LED_TIMEOUT_SECONDS}초 후 자동 꺼짐")
-
-def _auto_clear_display():
-    """타이머에 의해 호출되어 LED를 끕니다."""
-    global _led_timer
-    with _led_timer_lock:
-        _led_timer = None
-    print("[LED] 타이머 만료: 디스플레이 끄기")
-    if SENSEHAT_AVAILABLE:
-        sense.clear()
-    else:
-        print("[MOCK] Auto-clearing display after timeout")
+    led_renderer.clear()
 
 def display_icon_by_keyword(keyword):
-    """GPT 키워드에 따라 SenseHAT에 아이콘을 표시하고 15초 후 자동으로 끕니다."""
+    """GPT 키워드에 따라 SenseHAT에 아이콘을 표시하고 LED_TIMEOUT_SECONDS 후 자동으로 끕니다."""
     if not SENSEHAT_AVAILABLE:
         print(f"[MOCK] Displaying icon for keyword: {keyword}")
-        # Mock 환경에서도 타이머 동작 테스트
-        if keyword not in ("NORMAL", None, ""):
-            _start_led_timer()
+
+    icon = KEYWORD_ICONS.get(keyword)
+    if icon is None:
+        led_renderer.clear()
         return
 
-    if keyword == "VENTILATION":
-        window()
-        _start_led_timer()
-    elif keyword == "HEATING":
-        hot()  # 난방 (따뜻함)
-        _start_led_timer()
-    elif keyword == "COOLING":
-        cold() # 냉방 (시원함)
-        _start_led_timer()
-    elif keyword == "UMBRELLA":
-        umbrella()
-        _start_led_timer()
-    elif keyword == "COLD":
-        cold()
-        _start_led_timer()
-    elif keyword == "HOT":
-        hot()
-        _start_led_timer()
-    else:
-        _cancel_led_timer()
-        clear_display()
+    led_renderer.show(ICONS[icon], timeout=LED_TIMEOUT_SECONDS)
+    print(f"[LED] {icon} 아이콘 표시: {LED_TIMEOUT_SECONDS:g}초 후 자동 꺼짐")
@@ -0,0 +1,150 @@
+"""
+GPT 조언 응답 캐시 + 동일 요청 합치기 (request coalescing)
+
+입력값을 구간 단위로 양자화한 키로 결과를 TTL 동안 재사용하고,
+같은 키로 동시에 들어온 요청(웹 UI / 조이스틱 / 스케줄러)은 OpenAI 호출 1회만 수행
+"""
+import os
+import copy
+import time
+import threading
+
+from app.services.settings_service import load_settings
+
+GPT_CACHE_TTL = int(os.getenv("GPT_CACHE_TTL", 900))          # 15분
+GPT_CACHE_MAX_ENTRIES = int(os.getenv("GPT_CACHE_MAX_ENTRIES", 128))
+
+
+def temperature_unit(weather_data):
+    """조언 입력의 온도 단위 (weather_data에 없으면 현재 설정)"""
+    unit = weather_data.get("temperatureUnit")
+    if unit is None:
+        unit = load_settings().get("temperatureUnit", "celsius")
+    return unit
+
+
+def quantize(value, step):
+    """value를 step 단위로 반올림 (None은 그대로)"""
+    if value is None:
+        return None
+    try:
+        return round(float(value) / step) * step
+    except (TypeError, ValueError):
+        return value
+
+
+class _InFlight:
+    """진행 중인 OpenAI 호출 (뒤따라온 요청은 event를 기다림)"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class AdviceCache:
+    def __init__(self, ttl=GPT_CACHE_TTL, max_entries=GPT_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}      # key → (result, created_at)
+        self._inflight = {}     # key → _InFlight
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+
+    def get_or_create(self, key, create, cacheable=lambda result: True):
+        """
+        캐시에 있으면 바로 반환, 없으면 create()를 호출해 저장
+
+        같은 key로 create()가 이미 실행 중이면 새로 호출하지 않고 그 결과를 기다림.
+        cacheable(result)가 False인 결과(파싱 실패 등)는 저장하지 않음
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self.stats["hits"] += 1
+                return copy.deepcopy(entry[0])
+
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                self.stats["misses"] += 1
+                inflight = _InFlight()
+                self._inflight[key] = inflight
+                leader = True
+
+        if not leader:
+            inflight.event.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            return copy.deepcopy(inflight.result)
+
+        try:
+            result = create()
+            inflight.result = result
+        except Exception as e:
+            inflight.error = e
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if inflight.error is None and cacheable(inflight.result):
+                    self._store(key, inflight.result)
+            inflight.event.set()
+
+        return copy.deepcopy(result)
+
+    def get(self, key):
+        """TTL 이내의 캐시 값 반환, 없으면 None (스트리밍 요청용)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                self.stats["hits"] += 1
+                return copy.deepcopy(entry[0])
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key, result):
+        """외부에서 완성한 결과 저장 (스트리밍 요청 완료 시)"""
+        with self._lock:
+            self._store(key, copy.deepcopy(result))
+
+    def _store(self, key, result):
+        """락을 잡은 상태에서 호출. 가득 차면 가장 오래된 항목 제거"""
+        self._entries.pop(key, None)
+        if len(self._entries) >= self.max_entries:
+            # dict는 삽입 순서를 유지하므로 첫 항목이 가장 오래된 항목
+            del self._entries[next(iter(self._entries))]
+        self._entries[key] = (result, time.monotonic())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+            stats["inflight"] = len(self._inflight)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_rate"] = round((stats["hits"] + stats["coalesced"]) / lookups, 3) if lookups else None
+        stats["ttl_seconds"] = self.ttl
+        return stats
+
+
+# 환경/복장 조언이 함께 사용하는 캐시 (키 첫 항목으로 구분)
+advice_cache = AdviceCache()
+
+
+def is_valid_advice(result):
+    """JSON 파싱에 성공한 정상 응답만 캐시 (폴백 응답은 "fallback": True)"""
+    return (
+        isinstance(result, dict)
+        and not result.get("fallback")
+        and bool(result.get("keyword"))
+        and bool(result.get("advice"))
+    )
@@ -2,11 +2,14 @@ import os
 from openai import OpenAI
 from dotenv import load_dotenv
 
+from app.services.gpt_cache_service import advice_cache, quantize, is_valid_advice, temperature_unit
+
 load_dotenv()
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-def generate_environment_text(weather_data):
+def build_environment_prompt(weather_data):
+    """환경 조언 프롬프트 생성 (일반/스트리밍 요청 공용)"""
     temperature = weather_data.get("temperature")
     humidity = weather_data.get("humidity")
     co2 = weather_data.get("co2")
@@ -41,6 +44,12 @@ CO2 농도: {co2_str}
   - NORMAL: 특별한 조치가 필요 없을 때
 - "advice": 3~5문장의 자연스러운 한국어 조언
 """
+    return prompt
+
+
+def _request_environment_advice(weather_data):
+    """OpenAI에 환경 조언 요청 (캐시 없이)"""
+    prompt = build_environment_prompt(weather_data)
 
     response = client.chat.completions.create(
         model="gpt-5-nano",
@@ -58,4 +67,31 @@ CO2 농도: {co2_str}
     except Exception as e:
         print(f"JSON parsing failed: {e}")
         # 폴백 처리
-        return {"keyword": "NORMAL", "advice": content if 'content' in locals() else "조언을 생성할 수 없습니다."}
+        return {"keyword": "NORMAL", "advice": content if 'content' in locals() else "조언을 생성할 수 없습니다.", "fallback": True}
+
+
+def environment_cache_key(weather_data):
+    """기온 1도, 습도 5%, CO2 100ppm 단위로 양자화한 캐시 키 (같은 숫자라도 °C/°F는 별도)"""
+    return (
+        "environment",
+        weather_data.get("location"),
+        temperature_unit(weather_data),
+        quantize(weather_data.get("temperature"), 1),
+        quantize(weather_data.get("humidity"), 5),
+        quantize(weather_data.get("co2"), 100),
+        weather_data.get("weather"),
+        weather_data.get("description"),
+    )
+
+
+def generate_environment_text(weather_data):
+    """
+    실내 환경 조언 생성
+    입력이 거의 같으면 캐시된 조언을 재사용하고, 동시에 들어온 같은 요청은 OpenAI 호출 1회로 합침
+    """
+    return advice_cache.get_or_create(
+        environment_cache_key(weather_data),
+        lambda: _request_environment_advice(weather_data),
+        cacheable=is_valid_advice,
+    )
+
@@ -2,11 +2,14 @@ import os
 from openai import OpenAI
 from dotenv import load_dotenv
 
+from app.services.gpt_cache_service import advice_cache, quantize, is_valid_advice, temperature_unit
+
 load_dotenv()
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-def generate_fashion_text(weather_data):
+def build_fashion_prompt(weather_data):
+    """복장 조언 프롬프트 생성 (일반/스트리밍 요청 공용)"""
     temperature = weather_data.get("temperature")
     weather = weather_data.get("weather")
     description = weather_data.get("description")
@@ -35,6 +38,12 @@ def generate_fashion_text(weather_data):
   - NORMAL: 평범한 날씨일 때
 - "advice": 3~5문장의 구체적인 한국어 옷차림 추천 (겉옷/상의/하의/소품 등)
 """
+    return prompt
+
+
+def _request_fashion_advice(weather_data):
+    """OpenAI에 복장 조언 요청 (캐시 없이)"""
+    prompt = build_fashion_prompt(weather_data)
 
     response = client.chat.completions.create(
         model="gpt-5-nano",
@@ -51,4 +60,29 @@ def generate_fashion_text(weather_data):
         return result
     except Exception as e:
         print(f"JSON parsing failed: {e}")
-        return {"keyword": "NORMAL", "advice": content if 'content' in locals() else "추천을 생성할 수 없습니다."}
+        return {"keyword": "NORMAL", "advice": content if 'content' in locals() else "추천을 생성할 수 없습니다.", "fallback": True}
+
+
+def fashion_cache_key(weather_data):
+    """기온 1도 단위로 양자화한 캐시 키 (복장 조언은 CO2/습도를 사용하지 않음, °C/°F는 별도)"""
+    return (
+        "fashion",
+        weather_data.get("location"),
+        temperature_unit(weather_data),
+        quantize(weather_data.get("temperature"), 1),
+        weather_data.get("weather"),
+        weather_data.get("description"),
+    )
+
+
+def generate_fashion_text(weather_data):
+    """
+    외출 복장 조언 생성
+    입력이 거의 같으면 캐시된 조언을 재사용하고, 동시에 들어온 같은 요청은 OpenAI 호출 1회로 합침
+    """
+    return advice_cache.get_or_create(
+        fashion_cache_key(weather_data),
+        lambda: _request_fashion_advice(weather_data),
+        cacheable=is_valid_advice,
+    )
+
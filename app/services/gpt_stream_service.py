@@ -0,0 +1,235 @@
+"""
+GPT 조언 스트리밍
+
+OpenAI 응답을 stream=True로 받아 JSON 안의 "advice" 문자열을 도착하는 대로 꺼내고,
+문장이 완성될 때마다 이벤트로 내보냄 (SSE 전송 / 문장 단위 TTS에 사용)
+"""
+import re
+import json
+
+from app.services.gpt_cache_service import advice_cache, is_valid_advice
+from app.services import gpt_environment_service, gpt_fashion_service
+from app.services.device_service import display_icon_by_keyword
+from app.services.tts_service import TtsStream, SentenceSplitter
+from app.utils.helper import sse_event
+
+_KEYWORD_PATTERN = re.compile(r'"keyword"\s*:\s*"([A-Za-z_]+)"')
+_ADVICE_START_PATTERN = re.compile(r'"advice"\s*:\s*"')
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class AdviceJsonExtractor:
+    """
+    스트리밍 중인 {"keyword": ..., "advice": "..."} JSON에서
+    keyword 값과 advice 문자열을 완성되기 전에 점진적으로 추출
+    """
+
+    def __init__(self):
+        self.raw = ""
+        self.keyword = None
+        self._pos = None        # advice 문자열 값에서 다음에 읽을 위치
+        self.advice_done = False
+
+    def feed(self, chunk):
+        """새 조각을 추가하고, 이번에 새로 디코딩된 advice 텍스트를 반환"""
+        self.raw += chunk
+
+        if self.keyword is None:
+            m = _KEYWORD_PATTERN.search(self.raw)
+            if m:
+                self.keyword = m.group(1)
+
+        if self.advice_done:
+            return ""
+
+        if self._pos is None:
+            m = _ADVICE_START_PATTERN.search(self.raw)
+            if not m:
+                return ""
+            self._pos = m.end()
+
+        out = []
+        raw = self.raw
+        i = self._pos
+        while i < len(raw):
+            ch = raw[i]
+            if ch == '"':
+                self.advice_done = True
+                i += 1
+                break
+            if ch != '\\':
+                out.append(ch)
+                i += 1
+                continue
+
+            # 이스케이프 시퀀스: 아직 다 도착하지 않았으면 다음 조각을 기다림
+            if i + 1 >= len(raw):
+                break
+            code = raw[i + 1]
+            if code == 'u':
+                if i + 6 > len(raw):
+                    break
+                try:
+                    out.append(chr(int(raw[i + 2:i + 6], 16)))
+                except ValueError:
+                    pass
+                i += 6
+            else:
+                out.append(_ESCAPES.get(code, code))
+                i += 2
+
+        self._pos = i
+        return "".join(out)
+
+
+# kind → (서비스 모듈, 프롬프트 생성, 캐시 키, 폴백 문구)
+_ADVICE_KINDS = {
+    "environment": (
+        gpt_environment_service,
+        gpt_environment_service.build_environment_prompt,
+        gpt_environment_service.environment_cache_key,
+        "조언을 생성할 수 없습니다.",
+    ),
+    "fashion": (
+        gpt_fashion_service,
+        gpt_fashion_service.build_fashion_prompt,
+        gpt_fashion_service.fashion_cache_key,
+        "추천을 생성할 수 없습니다.",
+    ),
+}
+
+
+def stream_advice(kind, weather_data, token=None):
+    """
+    조언을 스트리밍으로 생성
+
+    token(CancelToken)이 취소되면 OpenAI 스트림을 즉시 닫고 이벤트 없이 종료
+
+    Yields:
+        (event, data) 튜플
+        - ("keyword", str)   : keyword가 확정되는 즉시 (LED 표시 등)
+        - ("delta", str)     : 새로 도착한 advice 텍스트 조각
+        - ("sentence", str)  : 완성된 문장 (TTS 전달용)
+        - ("done", dict)     : {"keyword", "advice"} 최종 결과
+    """
+    service, build_prompt, cache_key, fallback_text = _ADVICE_KINDS[kind]
+    key = cache_key(weather_data)
+
+    # 캐시에 있으면 OpenAI 호출 없이 바로 문장 단위로 전달
+    cached = advice_cache.get(key)
+    if cached is not None:
+        yield "keyword", cached.get("keyword", "NORMAL")
+        advice = cached.get("advice", "")
+        yield "delta", advice
+        splitter = SentenceSplitter()
+        for sentence in splitter.feed(advice) + splitter.flush():
+            yield "sentence", sentence
+        yield "done", cached
+        return
+
+    stream = service.client.chat.completions.create(
+        model="gpt-5-nano",
+        messages=[
+            {"role": "user", "content": build_prompt(weather_data)}
+        ],
+        response_format={"type": "json_object"},
+        stream=True,
+    )
+
+    close = getattr(stream, "close", None)
+    if token is not None and close is not None:
+        # 다른 스레드에서 취소하면 응답 연결을 닫아 대기 중인 읽기를 바로 중단
+        token.on_cancel(close)
+
+    extractor = AdviceJsonExtractor()
+    splitter = SentenceSplitter()
+    keyword_sent = False
+
+    try:
+        for chunk in stream:
+            if token is not None and token.cancelled:
+                return
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if not content:
+                continue
+
+            text = extractor.feed(content)
+
+            if not keyword_sent and extractor.keyword:
+                keyword_sent = True
+                yield "keyword", extractor.keyword
+
+            if text:
+                yield "delta", text
+                for sentence in splitter.feed(text):
+                    yield "sentence", sentence
+    except Exception:
+        if token is not None and token.cancelled:
+            return
+        raise
+    finally:
+        # 소비자가 중간에 멈추면 OpenAI 연결도 닫음
+        if close is not None:
+            close()
+
+    if token is not None and token.cancelled:
+        return
+
+    for sentence in splitter.flush():
+        yield "sentence", sentence
+
+    try:
+        result = json.loads(extractor.raw.strip())
+    except Exception as e:
+        print(f"JSON parsing failed: {e}")
+        result = {"keyword": "NORMAL", "advice": extractor.raw.strip() or fallback_text, "fallback": True}
+
+    if not keyword_sent:
+        yield "keyword", result.get("keyword", "NORMAL")
+
+    if is_valid_advice(result):
+        advice_cache.put(key, result)
+
+    yield "done", result
+
+
+def stream_advice_sse(kind, weather_data, speak=False):
+    """
+    stream_advice 이벤트를 SSE 문자열로 변환
+    - keyword가 확정되면 바로 SenseHAT 아이콘 표시
+    - speak=True면 완성된 문장을 바로 라즈베리파이 스피커로 재생
+    """
+    tts = TtsStream() if speak else None
+    try:
+        for event, data in stream_advice(kind, weather_data):
+            if event == "keyword":
+                display_icon_by_keyword(data)
+                yield sse_event("keyword", {"keyword": data})
+            elif event == "delta":
+                yield sse_event("delta", {"text": data})
+            elif event == "sentence":
+                if tts is not None:
+                    tts.feed(data)
+                yield sse_event("sentence", {"text": data})
+            elif event == "done":
+                yield sse_event("done", {
+                    "text": data.get("advice", ""),
+                    "keyword": data.get("keyword", "NORMAL"),
+                })
+    except GeneratorExit:
+        # 클라이언트가 연결을 끊음 (새 요청/페이지 이동): 버려진 조언은 더 읽지 않음
+        if tts is not None:
+            tts.cancel()
+        raise
+    except Exception as e:
+        print(f"[GPT] 스트리밍 중 오류 발생: {e}")
+        if tts is not None:
+            tts.cancel()
+        yield sse_event("error", {"error": str(e)})
+    else:
+        # 끝까지 전달한 경우에만 남은 문장을 마저 재생
+        if tts is not None:
+            tts.close()
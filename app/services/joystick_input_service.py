@@ -0,0 +1,186 @@
+"""
+조이스틱 입력 계층 (이벤트 기반)
+
+입력 소스에서 이벤트가 올 때까지 블록하고 (폴링/sleep 없음), 등록된 핸들러로 바로 전달
+- 디바운스: 같은 방향의 누름이 JOYSTICK_DEBOUNCE 이내에 다시 오면 무시
+- 길게 누르기: 누른 채 JOYSTICK_LONG_PRESS 이상 유지 (커널 자동 반복 "held" 이벤트로 판단)
+- 클릭: 길게 누르기 전에 뗀 경우
+- 콤보: 여러 방향을 JOYSTICK_COMBO_WINDOW 이내에 순서대로 누름 (예: 왼쪽 → 오른쪽)
+
+입력 소스
+- SenseHatStickSource: SenseHAT 조이스틱 (stick.wait_for_event로 블록)
+- FakeInputSource: 기록한 이벤트 순서를 그대로 재생 (하드웨어 없이 동작 확인)
+"""
+import os
+import time
+import threading
+from collections import namedtuple, deque
+
+JOYSTICK_DEBOUNCE = float(os.getenv("JOYSTICK_DEBOUNCE", 0.15))
+JOYSTICK_LONG_PRESS = float(os.getenv("JOYSTICK_LONG_PRESS", 1.0))
+JOYSTICK_COMBO_WINDOW = float(os.getenv("JOYSTICK_COMBO_WINDOW", 0.8))
+
+# sense_hat.InputEvent와 같은 필드
+InputEvent = namedtuple("InputEvent", ["timestamp", "direction", "action"])
+
+GESTURES = ("press", "release", "click", "long_press")
+
+
+class SenseHatStickSource:
+    """SenseHAT 조이스틱 (evdev 장치를 select로 기다리므로 대기 중 CPU 사용 없음)"""
+
+    def __init__(self, stick):
+        self.stick = stick
+
+    def read(self):
+        return self.stick.wait_for_event(emptybuffer=False)
+
+
+class FakeInputSource:
+    """
+    이벤트 재생용 입력 소스
+
+    events: [(이전 이벤트 후 대기 초, direction, action), ...]
+    realtime=False면 대기하지 않고 타임스탬프만 증가시켜 즉시 재생
+    """
+
+    def __init__(self, events, realtime=False, start=None):
+        self.events = list(events)
+        self.realtime = realtime
+        self._clock = time.time() if start is None else start
+        self._index = 0
+
+    def read(self):
+        if self._index >= len(self.events):
+            return None
+        delay, direction, action = self.events[self._index]
+        self._index += 1
+        if self.realtime and delay > 0:
+            time.sleep(delay)
+            self._clock = time.time()
+        else:
+            self._clock += delay
+        return InputEvent(self._clock, direction, action)
+
+    def rewind(self):
+        self._index = 0
+
+
+class JoystickDispatcher:
+    def __init__(self, debounce=JOYSTICK_DEBOUNCE, long_press=JOYSTICK_LONG_PRESS,
+                 combo_window=JOYSTICK_COMBO_WINDOW):
+        self.debounce = debounce
+        self.long_press = long_press
+        self.combo_window = combo_window
+        self._handlers = {}             # (gesture, direction) → [handler]
+        self._combos = []               # (방향 튜플, handler)
+        self._down_at = {}              # direction → 누른 시각
+        self._long_fired = set()        # 길게 누르기가 이미 발생한 방향
+        self._last_press = {}           # direction → 마지막 누름 시각 (디바운스)
+        self._recent = deque(maxlen=8)  # (시각, direction) 최근 누름 (콤보)
+        self._stop = threading.Event()
+        self.stats = {"events": 0, "dispatched": 0, "debounced": 0, "last_latency_ms": None}
+
+    # --------------------------------------------------------
+    # 핸들러 등록
+    # --------------------------------------------------------
+    def on(self, gesture, direction, handler):
+        """
+        gesture: "press"(누르는 즉시) / "release" / "click"(짧게 눌렀다 뗌) / "long_press"
+        direction: "up" / "down" / "left" / "right" / "middle" / "*"(모든 방향)
+        handler(event)
+        """
+        if gesture not in GESTURES:
+            raise ValueError(f"알 수 없는 제스처: {gesture}")
+        self._handlers.setdefault((gesture, direction), []).append(handler)
+
+    def on_combo(self, directions, handler):
+        """directions 순서대로 combo_window 이내에 누르면 handler(event) 호출"""
+        self._combos.append((tuple(directions), handler))
+
+    # --------------------------------------------------------
+    # 이벤트 처리
+    # --------------------------------------------------------
+    def _emit(self, gesture, event):
+        handlers = self._handlers.get((gesture, event.direction), []) + self._handlers.get((gesture, "*"), [])
+        for handler in handlers:
+            self._call(handler, event)
+
+    def _call(self, handler, event):
+        try:
+            handler(event)
+        except Exception as e:
+            print(f"[JOYSTICK] 이벤트 처리 중 오류 발생: {e}")
+        self.stats["dispatched"] += 1
+
+    def dispatch(self, event):
+        """입력 이벤트 1개 처리"""
+        self.stats["events"] += 1
+        direction, now = event.direction, event.timestamp
+
+        if event.action == "pressed":
+            last = self._last_press.get(direction)
+            self._last_press[direction] = now
+            if last is not None and now - last < self.debounce:
+                self.stats["debounced"] += 1
+                return
+
+            self._down_at[direction] = now
+            self._long_fired.discard(direction)
+            self._emit("press", event)
+            self._check_combos(event)
+
+        elif event.action == "held":
+            down_at = self._down_at.get(direction)
+            if down_at is not None and direction not in self._long_fired and now - down_at >= self.long_press:
+                self._long_fired.add(direction)
+                self._emit("long_press", event)
+
+        elif event.action == "released":
+            down_at = self._down_at.pop(direction, None)
+            if down_at is None:
+                # 디바운스로 무시한 누름의 떼기
+                return
+            self._emit("release", event)
+            if direction not in self._long_fired:
+                self._emit("click", event)
+            self._long_fired.discard(direction)
+
+    def _check_combos(self, event):
+        self._recent.append((event.timestamp, event.direction))
+        for directions, handler in self._combos:
+            n = len(directions)
+            if len(self._recent) < n:
+                continue
+            tail = list(self._recent)[-n:]
+            if tuple(d for _, d in tail) == directions and tail[-1][0] - tail[0][0] <= self.combo_window:
+                self._recent.clear()
+                self._call(handler, event)
+                return
+
+    # --------------------------------------------------------
+    # 실행
+    # --------------------------------------------------------
+    def run(self, source):
+        """입력 소스가 끝날 때까지 (None 반환) 이벤트를 기다리며 처리"""
+        while not self._stop.is_set():
+            try:
+                event = source.read()
+            except Exception as e:
+                print(f"[JOYSTICK] 입력 장치 읽기 오류: {e}")
+                self._stop.wait(1)
+                continue
+            if event is None:
+                break
+
+            self.dispatch(event)
+            # 장치 이벤트 시각 → 핸들러 처리 완료까지
+            if isinstance(source, SenseHatStickSource):
+                self.stats["last_latency_ms"] = round((time.time() - event.timestamp) * 1000, 1)
+
+    def stop(self):
+        """다음 이벤트를 받은 뒤 종료 (장치 읽기는 블록 중이므로 즉시 끝나지 않음)"""
+        self._stop.set()
+
+    def get_stats(self):
+        return dict(self.stats)
@@ -0,0 +1,381 @@
+"""
+SenseHAT LED 렌더러 (더블 버퍼 + 프레임 비교 + 애니메이션 스케줄러)
+
+- Frame: 64픽셀 RGB와 프레임버퍼 형식(RGB565, 128바이트)을 생성 시 한 번만 계산
+- 아이콘/로딩 스피너 프레임은 import 시 미리 만들어 두고 재사용
+- 호출 측은 백 버퍼(다음에 보여줄 프레임)만 바꾸고 바로 반환
+  렌더러 스레드 1개가 프론트 버퍼(마지막으로 보낸 프레임)와 비교해 달라졌을 때만 장치에 씀
+- 애니메이션(로딩 스피너, 페이드아웃)도 같은 스레드에서 처리
+- 표시 시간 만료는 공용 타이머 휠에 등록 (표시마다 Timer 스레드 생성 없음, 다시 표시하면 이전 타이머 취소)
+
+백엔드
+- SenseHatBackend: /dev/fb 장치에 128바이트를 한 번에 기록 (불가능하면 sense.set_pixels)
+- HeadlessFramebuffer: 메모리에만 기록 (하드웨어 없는 개발 환경/동작 확인용)
+"""
+import os
+import time
+import struct
+import threading
+from collections import deque
+
+from app.services.timer_service import timer_wheel
+
+LED_FADE_SECONDS = float(os.getenv("LED_FADE_SECONDS", 0.6))
+LED_FADE_STEPS = int(os.getenv("LED_FADE_STEPS", 6))
+LED_SPINNER_INTERVAL = float(os.getenv("LED_SPINNER_INTERVAL", 0.08))   # 초/프레임
+
+BLUE = (0, 150, 255)
+RED = (255, 0, 0)
+YELLOW = (100, 100, 0)
+OFF = (0, 0, 0)
+
+
+def _rgb565(pixel):
+    r, g, b = pixel
+    return ((r >> 3) & 0x1F) << 11 | ((g >> 2) & 0x3F) << 5 | ((b >> 3) & 0x1F)
+
+
+class Frame:
+    """8x8 LED 한 화면 (불변, packed 바이트로 비교)"""
+    __slots__ = ("pixels", "packed")
+
+    def __init__(self, pixels):
+        pixels = tuple(tuple(int(c) for c in p) for p in pixels)
+        if len(pixels) != 64:
+            raise ValueError(f"LED 프레임은 64픽셀이어야 합니다: {len(pixels)}")
+        self.pixels = pixels
+        # SenseHAT 프레임버퍼와 같은 형식 (픽셀당 RGB565 16비트, 네이티브 바이트 순서)
+        self.packed = struct.pack("64H", *(_rgb565(p) for p in pixels))
+
+    @classmethod
+    def from_rows(cls, rows, palette):
+        """문자열 8줄로 프레임 생성 (palette: 문자 → RGB, 없는 문자는 꺼짐)"""
+        return cls([palette.get(ch, OFF) for row in rows for ch in row])
+
+    def scaled(self, factor):
+        """밝기를 factor(0~1)배 한 프레임"""
+        return Frame([tuple(int(c * factor) for c in p) for p in self.pixels])
+
+    def pixel(self, x, y):
+        return self.pixels[y * 8 + x]
+
+    def __eq__(self, other):
+        return isinstance(other, Frame) and self.packed == other.packed
+
+    def __hash__(self):
+        return hash(self.packed)
+
+
+BLANK = Frame([OFF] * 64)
+
+# ============================================================
+# 미리 만든 프레임
+# ============================================================
+_SNOWFLAKE = [
+    ".X..X..X",
+    "..X.X.X.",
+    "...XXX..",
+    ".XXXXXXX",
+    "...XXX..",
+    "..X.X.X.",
+    ".X..X..X",
+    "........",
+]
+
+ICONS = {
+    "umbrella": Frame.from_rows([
+        "...XX...",
+        "..XXXX..",
+        ".XXXXXX.",
+        "XXXXXXXX",
+        "....X...",
+        "....X...",
+        "..X.X...",
+        "..XXX...",
+    ], {"X": BLUE}),
+    "window": Frame.from_rows([
+        "........",
+        ".XXX.XXX",
+        ".XXX.XXX",
+        ".XXX.XXX",
+        "........",
+        ".XXX.XXX",
+        ".XXX.XXX",
+        ".XXX.XXX",
+    ], {"X": BLUE}),
+    "cold": Frame.from_rows(_SNOWFLAKE, {"X": BLUE}),
+    "hot": Frame.from_rows(_SNOWFLAKE, {"X": RED}),
+    "loading": Frame.from_rows([
+        "........",
+        "...XX...",
+        "...XX...",
+        "...XX...",
+        "...XX...",
+        "...XX...",
+        "........",
+        "........",
+    ], {"X": YELLOW}),
+}
+
+
+def _spinner_frames(color=YELLOW, tail=4):
+    """6x6 테두리를 도는 꼬리 달린 점 (꼬리는 점점 어두워짐)"""
+    ring = ([(x, 1) for x in range(1, 7)] + [(6, y) for y in range(2, 7)]
+            + [(x, 6) for x in range(5, 0, -1)] + [(1, y) for y in range(5, 1, -1)])
+    frames = []
+    for head in range(len(ring)):
+        pixels = [OFF] * 64
+        for i in range(tail):
+            x, y = ring[(head - i) % len(ring)]
+            factor = (tail - i) / tail
+            pixels[y * 8 + x] = tuple(int(c * factor) for c in color)
+        frames.append(Frame(pixels))
+    return tuple(frames)
+
+
+LOADING_FRAMES = _spinner_frames()
+
+
+def fade_frames(frame, steps=LED_FADE_STEPS):
+    """frame → 꺼짐까지 밝기를 줄여가는 프레임들 (마지막은 BLANK)"""
+    if frame == BLANK or steps <= 0:
+        return (BLANK,)
+    return tuple(frame.scaled(1 - i / steps) for i in range(1, steps)) + (BLANK,)
+
+
+# ============================================================
+# 백엔드
+# ============================================================
+class SenseHatBackend:
+    def __init__(self, sense):
+        self.sense = sense
+        self._fd = None
+        device = getattr(sense, "_fb_device", None)
+        # 회전이 없을 때만 프레임버퍼 메모리 배치가 Frame 순서와 같음
+        if device and getattr(sense, "_rotation", 0) == 0:
+            try:
+                self._fd = os.open(device, os.O_WRONLY)
+            except OSError as e:
+                print(f"[LED] 프레임버퍼 장치 열기 실패, set_pixels 사용: {e}")
+
+    def write(self, frame):
+        if self._fd is not None:
+            try:
+                os.pwrite(self._fd, frame.packed, 0)
+                return
+            except OSError as e:
+                print(f"[LED] 프레임버퍼 쓰기 실패, set_pixels 사용: {e}")
+                self.close()
+        self.sense.set_pixels(list(frame.pixels))
+
+    def close(self):
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+
+class HeadlessFramebuffer:
+    """하드웨어 없이 기록만 하는 백엔드 (frame: 현재 화면, history: 최근 기록한 프레임)"""
+
+    def __init__(self, history=64):
+        self.frame = BLANK
+        self.writes = 0
+        self.history = deque(maxlen=history)
+
+    def write(self, frame):
+        self.frame = frame
+        self.writes += 1
+        self.history.append(frame)
+
+    def close(self):
+        pass
+
+
+# ============================================================
+# 렌더러
+# ============================================================
+class _Animation:
+    __slots__ = ("frames", "interval", "loop", "index", "next_at")
+
+    def __init__(self, frames, interval, loop, now):
+        self.frames = tuple(frames)
+        self.interval = interval
+        self.loop = loop
+        self.index = 0
+        self.next_at = now + interval
+
+
+class LedRenderer:
+    def __init__(self, backend, timers=timer_wheel, fade_seconds=LED_FADE_SECONDS, fade_steps=LED_FADE_STEPS):
+        self.backend = backend
+        self.timers = timers
+        self.fade_seconds = fade_seconds
+        self.fade_steps = fade_steps
+        self._cond = threading.Condition()
+        self._front = BLANK       # 마지막으로 장치에 보낸 프레임
+        self._back = BLANK        # 다음에 보여줄 프레임
+        self._animation = None
+        self._timeout = None      # 표시 시간 만료 타이머
+        self._timeout_seq = 0     # 이미 만료 처리에 들어간 이전 타이머 무시용
+        self._thread = None
+        self._stopped = False
+        self.stats = {"requested": 0, "presented": 0, "skipped": 0, "timeouts": 0}
+
+    # --------------------------------------------------------
+    # 호출 측 API (백 버퍼만 바꾸고 바로 반환)
+    # --------------------------------------------------------
+    def show(self, frame, timeout=None):
+        """frame 표시, timeout초 후 페이드아웃 (None이면 계속 표시)"""
+        with self._cond:
+            self._animation = None
+            self._set_back_locked(frame)
+            self._set_timeout_locked(timeout)
+        self._wake()
+
+    def animate(self, frames, interval, loop=True, timeout=None):
+        """frames를 interval초 간격으로 표시 (loop=False면 마지막 프레임에서 멈춤)"""
+        frames = tuple(frames)
+        if not frames:
+            raise ValueError("애니메이션 프레임이 없습니다.")
+        with self._cond:
+            self._animation = _Animation(frames, interval, loop, time.monotonic())
+            self._set_back_locked(frames[0])
+            self._set_timeout_locked(timeout)
+        self._wake()
+
+    def clear(self, fade=False):
+        """디스플레이 끄기 (fade=True면 현재 화면에서 서서히)"""
+        with self._cond:
+            self._set_timeout_locked(None)
+            if fade:
+                self._start_fade_locked(time.monotonic())
+            else:
+                self._animation = None
+                self._set_back_locked(BLANK)
+        self._wake()
+
+    def flush(self, timeout=1.0):
+        """백 버퍼가 장치에 반영될 때까지 대기 (반영되면 True)"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._front != self._back:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._thread is None:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    @property
+    def current(self):
+        """마지막으로 장치에 보낸 프레임"""
+        return self._front
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats["animating"] = self._animation is not None
+            remaining = self._timeout.remaining() if self._timeout is not None else None
+            stats["timeout_in"] = round(remaining, 2) if remaining is not None else None
+        return stats
+
+    # --------------------------------------------------------
+    # 내부 상태 (self._cond 보유 중 호출)
+    # --------------------------------------------------------
+    def _set_back_locked(self, frame):
+        self.stats["requested"] += 1
+        if frame == self._back:
+            self.stats["skipped"] += 1
+        self._back = frame
+
+    def _set_timeout_locked(self, timeout):
+        if self._timeout is not None:
+            self._timeout.cancel()
+            self._timeout = None
+        self._timeout_seq += 1
+        if timeout:
+            self._timeout = self.timers.call_later(
+                timeout, self._on_timeout, self._timeout_seq, name="led-timeout", inline=True
+            )
+
+    def _on_timeout(self, seq):
+        with self._cond:
+            if seq != self._timeout_seq:
+                return
+            self._timeout = None
+            self.stats["timeouts"] += 1
+            print("[LED] 표시 시간 만료: 디스플레이 끄기")
+            self._start_fade_locked(time.monotonic())
+        self._wake()
+
+    def _start_fade_locked(self, now):
+        frames = fade_frames(self._back, self.fade_steps)
+        self._animation = _Animation(frames, self.fade_seconds / len(frames), False, now)
+        self._set_back_locked(frames[0])
+
+    def _tick_locked(self, now):
+        anim = self._animation
+        if anim is not None and now >= anim.next_at:
+            # 늦어진 만큼 프레임을 건너뜀 (밀린 프레임을 몰아서 보내지 않음)
+            steps = 1 + int((now - anim.next_at) // anim.interval)
+            index = anim.index + steps
+            if index >= len(anim.frames):
+                if anim.loop:
+                    index %= len(anim.frames)
+                else:
+                    index = len(anim.frames) - 1
+                    self._animation = None
+            anim.index = index
+            anim.next_at += steps * anim.interval
+            self._set_back_locked(anim.frames[index])
+
+    def _next_wakeup_locked(self, now):
+        if self._animation is None:
+            return None
+        return max(0.0, self._animation.next_at - now)
+
+    # --------------------------------------------------------
+    # 렌더러 스레드
+    # --------------------------------------------------------
+    def _wake(self):
+        with self._cond:
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._run, name="led-renderer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        return
+                    now = time.monotonic()
+                    self._tick_locked(now)
+                    if self._back != self._front:
+                        break
+                    self._cond.wait(self._next_wakeup_locked(now))
+                frame = self._back
+
+            # 장치 쓰기는 락 밖에서 (그 사이 호출 측은 백 버퍼를 계속 바꿀 수 있음)
+            try:
+                self.backend.write(frame)
+            except Exception as e:
+                print(f"[LED] 디스플레이 쓰기 오류: {e}")
+
+            with self._cond:
+                self._front = frame
+                self.stats["presented"] += 1
+                self._cond.notify_all()
+
+    def stop(self):
+        with self._cond:
+            self._set_timeout_locked(None)
+            self._stopped = True
+            self._cond.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=2)
+        self.backend.close()
@@ -0,0 +1,256 @@
+"""
+재실(occupancy) 추적 서비스
+
+낮은 주기로 웹캠 프레임을 샘플링하고, 작은 흑백 프레임의 차분으로 변화가 없는 프레임은 건너뛰며,
+움직임이 있을 때만 사람 감지기를 실행해 디바운스된 재실/부재 상태를 유지
+상태가 바뀌면 "enter" / "leave" 이벤트를 구독자(스케줄러 등)에게 전달
+
+CPU 사용량은 OCCUPANCY_CPU_BUDGET(코어 1개 대비 비율) 이하가 되도록 샘플링 간격을 자동으로 늘림
+"""
+import os
+import time
+import threading
+from datetime import datetime
+
+from app.services.person_detection_service import (
+    OPENCV_AVAILABLE, cv2, camera, DetectionConfig, MotionGate, PersonDetector, _update_latest_detection,
+)
+
+# 프레임 샘플링 간격 (초, 최소값)
+OCCUPANCY_SAMPLE_INTERVAL = float(os.getenv("OCCUPANCY_SAMPLE_INTERVAL", 2))
+# 코어 1개 대비 최대 CPU 사용 비율 (0.1 = 10%)
+OCCUPANCY_CPU_BUDGET = float(os.getenv("OCCUPANCY_CPU_BUDGET", 0.1))
+# 연속으로 이 횟수만큼 사람이 감지되면 재실로 전환
+OCCUPANCY_ENTER_DETECTIONS = int(os.getenv("OCCUPANCY_ENTER_DETECTIONS", 2))
+# 마지막 감지 후 이 시간이 지나면 부재로 전환 (초)
+OCCUPANCY_VACANT_TIMEOUT = float(os.getenv("OCCUPANCY_VACANT_TIMEOUT", 300))
+# 재실 중 움직임이 없어도 이 간격으로 감지기를 다시 실행 (가만히 앉아 있는 사람 확인)
+OCCUPANCY_RECHECK_INTERVAL = float(os.getenv("OCCUPANCY_RECHECK_INTERVAL", 60))
+# 차분 계산용 프레임 폭 (작을수록 싸고 잡음에 강함)
+OCCUPANCY_MOTION_WIDTH = int(os.getenv("OCCUPANCY_MOTION_WIDTH", 160))
+
+
+class OccupancyTracker:
+    def __init__(self,
+                 interval=OCCUPANCY_SAMPLE_INTERVAL,
+                 cpu_budget=OCCUPANCY_CPU_BUDGET,
+                 enter_detections=OCCUPANCY_ENTER_DETECTIONS,
+                 vacant_timeout=OCCUPANCY_VACANT_TIMEOUT,
+                 recheck_interval=OCCUPANCY_RECHECK_INTERVAL):
+        self.interval = interval
+        self.cpu_budget = cpu_budget
+        self.enter_detections = enter_detections
+        self.vacant_timeout = vacant_timeout
+        self.recheck_interval = recheck_interval
+
+        # 차분은 여기서 미리 하므로 감지기의 모션 게이트는 끔
+        self._detector = PersonDetector(DetectionConfig(motion_gate=False))
+        self._motion = MotionGate()
+        self._listeners = []
+
+        self._occupied = False
+        self._changed_at = None         # 마지막 상태 전환 시각 (ISO)
+        self._last_seen = None          # 마지막으로 사람이 감지된 시각 (monotonic)
+        self._last_detect = None        # 마지막 감지기 실행 시각 (monotonic)
+        self._consecutive_hits = 0
+        self._lock = threading.Lock()
+
+        self._thread = None
+        self._stop = threading.Event()
+        self._prev_keep_warm = None
+        self.stats = {"frames": 0, "skipped": 0, "detections": 0, "errors": 0,
+                      "cpu_seconds": 0.0, "last_sleep": None}
+
+    # --------------------------------------------------------
+    # 구독
+    # --------------------------------------------------------
+    def add_listener(self, callback):
+        """callback(event, state) 등록. event는 "enter" 또는 "leave" """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def _notify(self, event, state):
+        for callback in list(self._listeners):
+            try:
+                callback(event, state)
+            except Exception as e:
+                print(f"[OCCUPANCY] 이벤트 처리 중 오류 발생: {e}")
+
+    # --------------------------------------------------------
+    # 상태
+    # --------------------------------------------------------
+    @property
+    def occupied(self):
+        return self._occupied
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_state(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "occupied": self._occupied,
+                "changed_at": self._changed_at,
+                "last_seen_seconds_ago": round(now - self._last_seen, 1) if self._last_seen else None,
+                "running": self.is_running(),
+            }
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        frames = stats["frames"]
+        stats["skip_rate"] = round(stats["skipped"] / frames, 3) if frames else None
+        stats["cpu_budget"] = self.cpu_budget
+        stats["interval"] = self.interval
+        return stats
+
+    # --------------------------------------------------------
+    # 샘플링
+    # --------------------------------------------------------
+    def _motion_gray(self, frame):
+        height, width = frame.shape[:2]
+        if width > OCCUPANCY_MOTION_WIDTH:
+            frame = cv2.resize(frame, (OCCUPANCY_MOTION_WIDTH, int(height * OCCUPANCY_MOTION_WIDTH / width)),
+                               interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    def process_frame(self, frame, now=None):
+        """
+        프레임 1장 처리 (움직임 → 감지 → 상태 갱신)
+
+        Returns:
+            str or None: 상태가 바뀌면 "enter" / "leave"
+        """
+        now = time.monotonic() if now is None else now
+        moved = self._motion.changed(self._motion_gray(frame))
+
+        # 재실 전환 확인 중이면 다음 프레임에서 바로, 재실 중이면 가끔 움직임이 없어도 다시 확인
+        confirming = 0 < self._consecutive_hits < self.enter_detections
+        recheck_due = confirming or (
+            self._occupied
+            and (self._last_detect is None or now - self._last_detect >= self.recheck_interval)
+        )
+
+        detected = None
+        if moved or recheck_due:
+            detected = self._detector.detect(frame)
+            self._last_detect = now
+
+        with self._lock:
+            self.stats["frames"] += 1
+            if detected is None:
+                self.stats["skipped"] += 1
+            else:
+                self.stats["detections"] += 1
+            return self._update_state(detected, now)
+
+    def _update_state(self, detected, now):
+        """락을 잡은 상태에서 호출. 디바운스 후 상태가 바뀌면 이벤트 이름 반환"""
+        if detected:
+            self._consecutive_hits += 1
+            self._last_seen = now
+        elif detected is False:
+            self._consecutive_hits = 0
+
+        if not self._occupied and self._consecutive_hits >= self.enter_detections:
+            self._occupied = True
+            self._changed_at = datetime.now().isoformat()
+            return "enter"
+
+        if self._occupied and (self._last_seen is None or now - self._last_seen >= self.vacant_timeout):
+            self._occupied = False
+            self._consecutive_hits = 0
+            self._changed_at = datetime.now().isoformat()
+            return "leave"
+
+        return None
+
+    def _loop(self):
+        print(f"[OCCUPANCY] 재실 추적 시작 ({self.interval}초 간격, CPU 예산 {self.cpu_budget:.0%})")
+        while not self._stop.is_set():
+            cpu_started = time.thread_time()
+            event = None
+            try:
+                frame, error = camera.read_frame()
+                if error:
+                    with self._lock:
+                        self.stats["errors"] += 1
+                else:
+                    event = self.process_frame(frame)
+            except Exception as e:
+                with self._lock:
+                    self.stats["errors"] += 1
+                print(f"[OCCUPANCY] 프레임 처리 중 오류 발생: {e}")
+            busy = time.thread_time() - cpu_started
+
+            if event is not None:
+                state = self.get_state()
+                print(f"[OCCUPANCY] 상태 변경: {'재실' if event == 'enter' else '부재'}")
+                _update_latest_detection({
+                    "person_detected": state["occupied"],
+                    "message": "있다" if state["occupied"] else "없다",
+                    "timestamp": state["changed_at"],
+                })
+                self._notify(event, state)
+
+            # 사용한 CPU 시간이 예산 비율을 넘지 않도록 쉬는 시간 계산
+            sleep = self.interval
+            if self.cpu_budget > 0:
+                sleep = max(sleep, busy / self.cpu_budget - busy)
+            with self._lock:
+                self.stats["cpu_seconds"] = round(self.stats["cpu_seconds"] + busy, 3)
+                self.stats["last_sleep"] = round(sleep, 2)
+            self._stop.wait(sleep)
+        print("[OCCUPANCY] 재실 추적 종료")
+
+    def start(self):
+        """백그라운드 스레드에서 재실 추적 시작 (OpenCV가 없으면 False)"""
+        if not OPENCV_AVAILABLE:
+            print("[INFO] OpenCV가 설치되지 않아 재실 추적을 사용하지 않습니다.")
+            return False
+        if self.is_running():
+            print("[WARNING] 재실 추적이 이미 실행 중입니다.")
+            return True
+
+        # 짧은 간격으로 읽으므로 카메라를 열어둠 (열기/워밍업 비용 제거)
+        self._prev_keep_warm = camera.keep_warm
+        camera.keep_warm = True
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="occupancy-tracker", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+        if self._prev_keep_warm is not None:
+            camera.keep_warm = self._prev_keep_warm
+            self._prev_keep_warm = None
+            camera.release()
+
+
+# 앱 전체에서 공유하는 재실 추적기
+occupancy_tracker = OccupancyTracker()
+
+
+def add_occupancy_listener(callback):
+    """재실 상태 변경 구독 (callback(event, state))"""
+    occupancy_tracker.add_listener(callback)
+
+
+def start_occupancy_tracker():
+    return occupancy_tracker.start()
+
+
+def stop_occupancy_tracker():
+    occupancy_tracker.stop()
+
+
+def get_occupancy_state():
+    state = occupancy_tracker.get_state()
+    state["stats"] = occupancy_tracker.get_stats()
+    return state
@@ -1,8 +1,9 @@
 """
 웹캠을 사용한 사람 감지 서비스
 """
-import cv2
 import os
+import time
+import threading
 from datetime import datetime
 
 # OpenCV 사용 가능 여부
@@ -10,15 +11,343 @@ OPENCV_AVAILABLE = True
 try:
     import cv2
 except ImportError:
+    cv2 = None
     OPENCV_AVAILABLE = False
     print("Warning: opencv-python library not available. Person detection will use mock data.")
 
+# 웹캠 설정
+CAMERA_INDEX = int(os.getenv("CAMERA_INDEX", 0))
+# 카메라를 막 열었을 때 노출이 맞지 않은 프레임은 버림
+CAMERA_WARMUP_FRAMES = int(os.getenv("CAMERA_WARMUP_FRAMES", 5))
+# True면 감지 후에도 카메라를 열어둠 (잦은 감지 시 열기/워밍업 비용 제거)
+CAMERA_KEEP_WARM = os.getenv("CAMERA_KEEP_WARM", "false").lower() in ("1", "true", "yes")
+
 # 최근 감지 결과 저장
 latest_detection_result = {
     "person_detected": False,
     "timestamp": None
 }
 
+
+def _env_flag(name, default):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def _parse_roi(value):
+    """"x,y,w,h" (프레임 대비 0~1 비율) → 튜플, 비어 있으면 None"""
+    if not value:
+        return None
+    try:
+        x, y, w, h = (float(v) for v in value.split(","))
+    except ValueError:
+        print(f"[WARNING] DETECT_ROI 형식 오류: {value} (예: 0,0.2,1,0.8)")
+        return None
+    return (x, y, w, h)
+
+
+class DetectionConfig:
+    """
+    감지 파이프라인 설정 (기본값은 환경 변수)
+
+    - max_width      : 이 폭보다 크면 축소 후 감지 (0이면 원본)
+    - roi            : 감지할 영역 (x, y, w, h 비율), None이면 전체
+    - motion_gate    : 이전 프레임과 차이가 거의 없으면 이전 결과 재사용
+    - motion_ratio   : 변화 픽셀 비율이 이 값 미만이면 "변화 없음"
+    - motion_max_age : 재사용할 이전 결과의 최대 나이 (초), 지나면 변화가 없어도 다시 감지
+    - use_haar/use_hog, hog_win_stride, hog_scale, haar_scale_factor, haar_min_size
+    """
+
+    def __init__(self, **overrides):
+        self.max_width = int(os.getenv("DETECT_MAX_WIDTH", 400))
+        self.roi = _parse_roi(os.getenv("DETECT_ROI", ""))
+        self.motion_gate = _env_flag("DETECT_MOTION_GATE", "true")
+        self.motion_threshold = int(os.getenv("DETECT_MOTION_THRESHOLD", 25))     # 픽셀 밝기 차이
+        self.motion_ratio = float(os.getenv("DETECT_MOTION_RATIO", 0.01))         # 변화 픽셀 비율
+        self.motion_max_age = float(os.getenv("DETECT_MOTION_MAX_AGE", 300))       # 초
+        self.use_haar = _env_flag("DETECT_USE_HAAR", "true")
+        self.use_hog = _env_flag("DETECT_USE_HOG", "true")
+        self.haar_scale_factor = float(os.getenv("DETECT_HAAR_SCALE", 1.1))
+        self.haar_min_size = int(os.getenv("DETECT_HAAR_MIN_SIZE", 24))
+        self.hog_win_stride = int(os.getenv("DETECT_HOG_STRIDE", 8))
+        self.hog_scale = float(os.getenv("DETECT_HOG_SCALE", 1.1))
+
+        for key, value in overrides.items():
+            if not hasattr(self, key):
+                raise ValueError(f"알 수 없는 감지 설정: {key}")
+            setattr(self, key, value)
+
+    @classmethod
+    def legacy(cls):
+        """기존 방식 (원본 해상도, 전체 영역, winStride 4, scale 1.05) - 벤치마크 비교용"""
+        return cls(max_width=0, roi=None, motion_gate=False,
+                   haar_min_size=30, hog_win_stride=4, hog_scale=1.05)
+
+
+class MotionGate:
+    """
+    프레임 차분으로 장면 변화 여부 판단 (감지기보다 훨씬 싼 사전 검사)
+    흑백 프레임을 받아 이전 프레임 대비 변화 픽셀 비율이 ratio 이상이면 변화로 판단
+    """
+
+    def __init__(self, threshold=25, ratio=0.01):
+        self.threshold = threshold      # 픽셀 밝기 차이
+        self.ratio = ratio              # 변화 픽셀 비율
+        self._prev = None
+
+    def changed(self, gray):
+        """변화가 있으면 True (이전 프레임이 없거나 크기가 다르면 True)"""
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        prev, self._prev = self._prev, blurred
+        if prev is None or prev.shape != blurred.shape:
+            return True
+
+        diff = cv2.absdiff(prev, blurred)
+        _, mask = cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY)
+        return cv2.countNonZero(mask) / float(mask.size) >= self.ratio
+
+    def reset(self):
+        self._prev = None
+
+
+class PersonDetector:
+    """
+    사람 감지 파이프라인 (싼 단계부터 실행하고 결론이 나면 바로 종료)
+
+      1. prepare : 축소 + ROI 잘라내기 + 흑백 변환
+      2. motion  : 이전 프레임과 차이가 없으면 이전 결과 재사용 (motion_max_age 이내의 결과만)
+      3. haar    : Haar Cascade (감지되면 종료)
+      4. hog     : HOG (Haar에서 못 찾았을 때만)
+
+    분류기는 최초 사용 시 한 번만 로드하고 이후 재사용
+    """
+
+    def __init__(self, config=None):
+        self.config = config or DetectionConfig()
+        self._cascade = None
+        self._hog = None
+        self._loaded = False
+        self._motion = MotionGate(self.config.motion_threshold, self.config.motion_ratio)
+        self._last_result = None
+        self._last_result_at = None     # 이전 결과를 실제 감지로 얻은 시각 (monotonic)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """락을 잡은 상태에서 호출"""
+        if self._loaded:
+            return
+
+        # Haar Cascade 분류기 로드 (전신 감지)
+        cascade_path = cv2.data.haarcascades + 'haarcascade_fullbody.xml'
+
+        if not os.path.exists(cascade_path):
+            # 전신 감지가 없으면 상반신 감지 사용
+            cascade_path = cv2.data.haarcascades + 'haarcascade_upperbody.xml'
+
+        if os.path.exists(cascade_path):
+            self._cascade = cv2.CascadeClassifier(cascade_path)
+        else:
+            print("[WARNING] Haar Cascade 파일을 찾을 수 없습니다. HOG descriptor를 사용합니다.")
+
+        # HOG (Histogram of Oriented Gradients)
+        try:
+            self._hog = cv2.HOGDescriptor()
+            self._hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+        except Exception as e:
+            print(f"[WARNING] HOG 초기화 실패: {e}")
+            self._hog = None
+
+        self._loaded = True
+
+    def _prepare(self, frame):
+        """축소 → ROI → 흑백"""
+        cfg = self.config
+        height, width = frame.shape[:2]
+
+        if cfg.max_width and width > cfg.max_width:
+            ratio = cfg.max_width / width
+            frame = cv2.resize(frame, (cfg.max_width, int(height * ratio)), interpolation=cv2.INTER_AREA)
+            height, width = frame.shape[:2]
+
+        if cfg.roi:
+            x, y, w, h = cfg.roi
+            x0, y0 = int(x * width), int(y * height)
+            x1, y1 = min(width, x0 + int(w * width)), min(height, y0 + int(h * height))
+            if x1 > x0 and y1 > y0:
+                frame = frame[y0:y1, x0:x1]
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return frame, gray
+
+    def _detect_haar(self, gray):
+        size = self.config.haar_min_size
+        bodies = self._cascade.detectMultiScale(
+            gray,
+            scaleFactor=self.config.haar_scale_factor,
+            minNeighbors=3,
+            minSize=(size, size)
+        )
+        return len(bodies) > 0
+
+    def _detect_hog(self, frame):
+        stride = self.config.hog_win_stride
+        (humans, _) = self._hog.detectMultiScale(frame,
+                                                 winStride=(stride, stride),
+                                                 padding=(8, 8),
+                                                 scale=self.config.hog_scale)
+        return len(humans) > 0
+
+    def detect_with_timings(self, frame):
+        """
+        감지 + 단계별 소요 시간
+
+        Returns:
+            (person_detected, timings_ms, decided_by)
+            decided_by: "motion" / "haar" / "hog" / "none"
+        """
+        timings = {}
+
+        def timed(stage, fn, *args):
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                timings[stage] = round((time.perf_counter() - started) * 1000, 2)
+
+        with self._lock:
+            timed("load", self._load)
+            small, gray = timed("prepare", self._prepare, frame)
+
+            if self.config.motion_gate:
+                moved = timed("motion", self._motion.changed, gray)
+                # 변화가 조금씩 쌓이는 경우(천천히 들어오는 사람 등)를 놓치지 않도록 오래된 결과는 재사용하지 않음
+                fresh = (self._last_result_at is not None
+                         and time.monotonic() - self._last_result_at <= self.config.motion_max_age)
+                if not moved and self._last_result is not None and fresh:
+                    return self._last_result, timings, "motion"
+
+            detected = False
+            decided_by = "none"
+
+            if self.config.use_haar and self._cascade is not None:
+                if timed("haar", self._detect_haar, gray):
+                    detected, decided_by = True, "haar"
+
+            # Haar에서 못 찾았을 때만 HOG 실행
+            if not detected and self.config.use_hog and self._hog is not None:
+                try:
+                    if timed("hog", self._detect_hog, small):
+                        detected, decided_by = True, "hog"
+                except Exception as e:
+                    print(f"[WARNING] HOG 감지 실패: {e}")
+
+            self._last_result = detected
+            self._last_result_at = time.monotonic()
+            return detected, timings, decided_by
+
+    def detect(self, frame):
+        """
+        프레임에서 사람을 감지
+
+        Args:
+            frame: OpenCV 프레임
+
+        Returns:
+            bool: 사람이 감지되면 True, 아니면 False
+        """
+        return self.detect_with_timings(frame)[0]
+
+    def reset(self):
+        """모션 게이트 기준 프레임과 이전 결과 초기화"""
+        with self._lock:
+            self._motion.reset()
+            self._last_result = None
+            self._last_result_at = None
+
+
+class CameraManager:
+    """
+    웹캠 핸들 관리
+    - keep_warm=True : 한 번 연 카메라를 계속 사용 (버퍼에 쌓인 오래된 프레임은 버림)
+    - keep_warm=False: 열기 → 워밍업 프레임 버림 → 캡처 → 닫기
+    """
+
+    def __init__(self, index=CAMERA_INDEX, warmup_frames=CAMERA_WARMUP_FRAMES, keep_warm=CAMERA_KEEP_WARM):
+        self.index = index
+        self.warmup_frames = warmup_frames
+        self.keep_warm = keep_warm
+        self._cap = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        """락을 잡은 상태에서 호출. 실패하면 False"""
+        cap = cv2.VideoCapture(self.index)
+        if not cap.isOpened():
+            cap.release()
+            return False
+
+        # 드라이버 버퍼를 최소화해서 항상 최근 프레임을 받도록 함
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        for _ in range(self.warmup_frames):
+            cap.grab()
+
+        self._cap = cap
+        return True
+
+    def read_frame(self):
+        """
+        프레임 1장 캡처
+
+        Returns:
+            (frame, error): 성공 시 error는 None
+        """
+        with self._lock:
+            opened_now = self._cap is None
+            if opened_now and not self._open():
+                return None, "웹캠 접근 실패"
+
+            try:
+                if not opened_now:
+                    # 열어둔 카메라는 버퍼에 남은 이전 프레임을 버림
+                    self._cap.grab()
+                ret, frame = self._cap.read()
+            finally:
+                if not self.keep_warm:
+                    self._release_locked()
+
+            if not ret or frame is None:
+                # 장치가 분리되었을 수 있으므로 다음 번에 다시 열기
+                self._release_locked()
+                return None, "프레임 읽기 실패"
+
+            return frame, None
+
+    def _release_locked(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def release(self):
+        """카메라 닫기"""
+        with self._lock:
+            self._release_locked()
+
+
+# 앱 전체에서 공유하는 감지기 / 카메라
+person_detector = PersonDetector()
+camera = CameraManager()
+
+
+def _detection_result(person_detected, error=None):
+    result = {
+        "person_detected": person_detected,
+        "message": "있다" if person_detected else "없다",
+        "timestamp": datetime.now().isoformat()
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
 def detect_person_from_webcam():
     """
     웹캠으로 사진을 찍어 사람이 있는지 감지
@@ -35,71 +364,34 @@ def detect_person_from_webcam():
     if not OPENCV_AVAILABLE:
         # OpenCV가 없을 경우 mock 데이터
         print("[INFO] OpenCV가 설치되지 않았습니다. Mock 데이터를 사용합니다.")
-        person_detected = random.choice([True, False])
-        result = {
-            "person_detected": person_detected,
-            "message": "있다" if person_detected else "없다",
-            "timestamp": datetime.now().isoformat()
-        }
+        result = _detection_result(random.choice([True, False]))
         _update_latest_detection(result)
         return result
 
     try:
-        # 웹캠 열기
-        cap = cv2.VideoCapture(0)
-
-        if not cap.isOpened():
-            print("[ERROR] 웹캠을 열 수 없습니다.")
-            result = {
-                "person_detected": False,
-                "message": "없다",
-                "error": "웹캠 접근 실패",
-                "timestamp": datetime.now().isoformat()
-            }
-            _update_latest_detection(result)
-            return result
-
         # 프레임 읽기
-        ret, frame = cap.read()
-        cap.release()
-
-        if not ret or frame is None:
-            print("[ERROR] 프레임을 읽을 수 없습니다.")
-            result = {
-                "person_detected": False,
-                "message": "없다",
-                "error": "프레임 읽기 실패",
-                "timestamp": datetime.now().isoformat()
-            }
+        frame, error = camera.read_frame()
+
+        if error:
+            print(f"[ERROR] {error}")
+            result = _detection_result(False, error)
             _update_latest_detection(result)
             return result
 
         # 사람 감지
-        person_detected = _detect_person_in_frame(frame)
-
-        result = {
-            "person_detected": person_detected,
-            "message": "있다" if person_detected else "없다",
-            "timestamp": datetime.now().isoformat()
-        }
-
+        result = _detection_result(_detect_person_in_frame(frame))
         _update_latest_detection(result)
         return result
 
     except Exception as e:
         print(f"[ERROR] 사람 감지 중 오류 발생: {e}")
-        result = {
-            "person_detected": False,
-            "message": "없다",
-            "error": str(e),
-            "timestamp": datetime.now().isoformat()
-        }
+        result = _detection_result(False, str(e))
         _update_latest_detection(result)
         return result
 
 def _detect_person_in_frame(frame):
     """
-    프레임에서 사람을 감지
+    프레임에서 사람을 감지 (공유 감지기 사용)
 
     Args:
         frame: OpenCV 프레임
@@ -108,54 +400,7 @@ def _detect_person_in_frame(frame):
         bool: 사람이 감지되면 True, 아니면 False
     """
     try:
-        # Haar Cascade 분류기 로드 (전신 감지)
-        cascade_path = cv2.data.haarcascades + 'haarcascade_fullbody.xml'
-
-        if not os.path.exists(cascade_path):
-            # 전신 감지가 없으면 상반신 감지 사용
-            cascade_path = cv2.data.haarcascades + 'haarcascade_upperbody.xml'
-
-        if not os.path.exists(cascade_path):
-            print("[WARNING] Haar Cascade 파일을 찾을 수 없습니다. HOG descriptor를 사용합니다.")
-            # HOG (Histogram of Oriented Gradients) 사용
-            hog = cv2.HOGDescriptor()
-            hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
-
-            # 사람 감지
-            (humans, _) = hog.detectMultiScale(frame,
-                                               winStride=(4, 4),
-                                               padding=(8, 8),
-                                               scale=1.05)
-
-            return len(humans) > 0
-
-        # Haar Cascade로 감지
-        body_cascade = cv2.CascadeClassifier(cascade_path)
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-        # 사람 감지
-        bodies = body_cascade.detectMultiScale(
-            gray,
-            scaleFactor=1.1,
-            minNeighbors=3,
-            minSize=(30, 30)
-        )
-
-        # 추가로 HOG detector로도 체크 (더 정확한 감지)
-        if len(bodies) == 0:
-            try:
-                hog = cv2.HOGDescriptor()
-                hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
-                (humans, _) = hog.detectMultiScale(frame,
-                                                   winStride=(4, 4),
-                                                   padding=(8, 8),
-                                                   scale=1.05)
-                return len(humans) > 0
-            except Exception as e:
-                print(f"[WARNING] HOG 감지 실패: {e}")
-
-        return len(bodies) > 0
-
+        return person_detector.detect(frame)
     except Exception as e:
         print(f"[ERROR] 프레임 분석 중 오류: {e}")
         return False
@@ -0,0 +1,241 @@
+"""
+실내 센서 시계열 기록 (고정 크기 링 버퍼)
+샘플러가 읽은 온도/습도/CO2를 배열에 순환 저장하고 구간 조회/다운샘플링 제공
+"""
+import os
+import math
+import time
+import threading
+from array import array
+
+# 기본 24시간 분량 (5초 간격 기준 17280개, 샘플당 20바이트 → 약 340KB)
+SENSOR_HISTORY_CAPACITY = int(os.getenv("SENSOR_HISTORY_CAPACITY", 17280))
+# 한 번의 응답에 포함할 최대 포인트 수 (초과하면 자동으로 버킷 집계)
+SENSOR_HISTORY_MAX_POINTS = int(os.getenv("SENSOR_HISTORY_MAX_POINTS", 500))
+
+FIELDS = ("temperature", "humidity", "co2")
+_NAN = float("nan")
+
+
+def _to_float(value):
+    return _NAN if value is None else float(value)
+
+
+def _to_value(value):
+    return None if math.isnan(value) else round(value, 2)
+
+
+class SensorRingBuffer:
+    """
+    고정 메모리 링 버퍼
+
+    - 타임스탬프(double)와 각 센서값(float)을 별도 array에 저장 (dict 리스트 대신)
+    - 타임스탬프는 항상 단조 증가하도록 저장하므로 구간 시작/끝을 이진 탐색(O(log n))으로 찾음
+    - 값이 없으면 NaN으로 저장
+    """
+
+    def __init__(self, capacity=SENSOR_HISTORY_CAPACITY):
+        self.capacity = capacity
+        self._ts = array("d", bytes(8 * capacity))
+        self._values = {field: array("f", bytes(4 * capacity)) for field in FIELDS}
+        self._start = 0   # 가장 오래된 샘플의 물리 인덱스
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def _index(self, i):
+        """논리 인덱스(0 = 가장 오래된 샘플) → 물리 인덱스"""
+        return (self._start + i) % self.capacity
+
+    def append(self, ts, temperature, humidity, co2):
+        """샘플 추가 (가득 차면 가장 오래된 샘플을 덮어씀)"""
+        with self._lock:
+            if self._count:
+                # 시스템 시계가 뒤로 가더라도 정렬 상태 유지
+                ts = max(ts, self._ts[self._index(self._count - 1)])
+
+            if self._count < self.capacity:
+                pos = self._index(self._count)
+                self._count += 1
+            else:
+                pos = self._start
+                self._start = (self._start + 1) % self.capacity
+
+            self._ts[pos] = ts
+            self._values["temperature"][pos] = _to_float(temperature)
+            self._values["humidity"][pos] = _to_float(humidity)
+            self._values["co2"][pos] = _to_float(co2)
+
+    def _bisect_left(self, ts):
+        """ts 이상인 첫 논리 인덱스"""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ts[self._index(mid)] < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _bisect_right(self, ts):
+        """ts 초과인 첫 논리 인덱스"""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ts[self._index(mid)] <= ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def time_range(self):
+        """(가장 오래된 ts, 가장 최근 ts), 비어 있으면 (None, None)"""
+        with self._lock:
+            if not self._count:
+                return None, None
+            return self._ts[self._index(0)], self._ts[self._index(self._count - 1)]
+
+    def query(self, start, end, max_points=SENSOR_HISTORY_MAX_POINTS):
+        """
+        [start, end] 구간 조회
+
+        구간 내 샘플 수가 max_points 이하면 원본 포인트를,
+        초과하면 max_points개의 min/max/avg 버킷을 반환
+        """
+        with self._lock:
+            lo = self._bisect_left(start)
+            hi = self._bisect_right(end)
+            count = max(0, hi - lo)
+
+            if count <= max_points:
+                points = []
+                for i in range(lo, hi):
+                    pos = self._index(i)
+                    point = {"ts": self._ts[pos]}
+                    for field in FIELDS:
+                        point[field] = _to_value(self._values[field][pos])
+                    points.append(point)
+                return {"resolution": "raw", "count": count, "points": points}
+
+            return {
+                "resolution": "bucket",
+                "count": count,
+                "points": self._downsample(lo, hi, start, end, max_points),
+            }
+
+    def downsample(self, start, end, buckets):
+        """[start, end] 구간을 시간 기준 buckets개로 나눠 min/max/avg 집계"""
+        with self._lock:
+            lo = self._bisect_left(start)
+            hi = self._bisect_right(end)
+            return self._downsample(lo, hi, start, end, buckets)
+
+    def _downsample(self, lo, hi, start, end, buckets):
+        """락을 잡은 상태에서 호출. 빈 버킷은 생략"""
+        if hi <= lo or buckets <= 0:
+            return []
+
+        # 무한 구간이면 실제 데이터 범위로 버킷 폭 계산
+        start = max(start, self._ts[self._index(lo)])
+        end = min(end, self._ts[self._index(hi - 1)])
+        width = max((end - start) / buckets, 1e-9)
+
+        result = []
+        current = None
+        acc = None
+        for i in range(lo, hi):
+            pos = self._index(i)
+            bucket = min(int((self._ts[pos] - start) / width), buckets - 1)
+
+            if bucket != current:
+                if acc is not None:
+                    result.append(finish_bucket(start + current * width, acc))
+                current = bucket
+                acc = new_bucket()
+
+            acc["count"] += 1
+            for field in FIELDS:
+                value = self._values[field][pos]
+                if not math.isnan(value):
+                    add_to_bucket(acc[field], value, value, value, 1)
+
+        result.append(finish_bucket(start + current * width, acc))
+        return result
+
+    def get_stats(self):
+        oldest, newest = self.time_range()
+        memory = self._ts.itemsize * self.capacity + sum(
+            values.itemsize * self.capacity for values in self._values.values()
+        )
+        return {
+            "count": self._count,
+            "capacity": self.capacity,
+            "oldest": oldest,
+            "newest": newest,
+            "memory_bytes": memory,
+        }
+
+
+def new_bucket():
+    """버킷 누적기: 필드별 [min, max, sum, n]"""
+    acc = {"count": 0}
+    for field in FIELDS:
+        acc[field] = [math.inf, -math.inf, 0.0, 0]
+    return acc
+
+
+def add_to_bucket(a, low, high, avg, n):
+    """필드 누적기에 n개 샘플의 (min, max, avg)를 더함 (원본 샘플은 low = high = avg, n = 1)"""
+    if low < a[0]:
+        a[0] = low
+    if high > a[1]:
+        a[1] = high
+    a[2] += avg * n
+    a[3] += n
+
+
+def finish_bucket(bucket_start, acc):
+    point = {"ts": round(bucket_start, 3), "count": acc["count"]}
+    for field in FIELDS:
+        low, high, total, n = acc[field]
+        point[field] = {
+            "min": round(low, 2),
+            "max": round(high, 2),
+            "avg": round(total / n, 2),
+        } if n else None
+    return point
+
+
+# 앱 전체에서 공유하는 센서 기록 버퍼
+sensor_history = SensorRingBuffer()
+
+
+def record_sample(snapshot):
+    """device_service 샘플 리스너: 새 스냅샷을 링 버퍼에 추가"""
+    sensor_history.append(time.time(), snapshot.temperature, snapshot.humidity, snapshot.co2)
+
+
+def query_sensor_history(start=None, end=None, buckets=None, limit=None):
+    """
+    센서 기록 조회
+
+    Args:
+        start/end: epoch 초 (없으면 전체 구간)
+        buckets: 지정하면 해당 개수의 min/max/avg 버킷으로 집계
+        limit: 최대 포인트 수 (SENSOR_HISTORY_MAX_POINTS로 상한)
+    """
+    start = -math.inf if start is None else start
+    end = math.inf if end is None else end
+    max_points = min(limit or SENSOR_HISTORY_MAX_POINTS, SENSOR_HISTORY_MAX_POINTS)
+
+    if buckets:
+        points = sensor_history.downsample(start, end, min(buckets, max_points))
+        result = {"resolution": "bucket", "count": sum(p["count"] for p in points), "points": points}
+    else:
+        result = sensor_history.query(start, end, max_points)
+
+    result["start"] = None if math.isinf(start) else start
+    result["end"] = None if math.isinf(end) else end
+    return result
@@ -0,0 +1,434 @@
+"""
+센서 기록 영구 저장 (추가 전용 바이너리 로그)
+
+- raw/YYYYMMDD.bin   : 하루 단위 세그먼트, 고정 크기 레코드 (ts, 온도, 습도, CO2)
+- hourly/YYYYMMDD.bin: 보존 기간이 지난 원본을 시간 단위 min/max/avg로 압축한 세그먼트
+
+SD 카드 수명을 위해 레코드를 메모리에 모았다가 한 번에 쓰고 fsync도 묶어서 수행.
+조회는 세그먼트를 mmap으로 열어 이진 탐색 후 필요한 레코드만 읽음.
+"""
+import os
+import math
+import mmap
+import time
+import struct
+import atexit
+import threading
+from datetime import date, datetime
+from itertools import groupby
+
+from app.services.sensor_history_service import FIELDS, new_bucket, add_to_bucket, finish_bucket
+
+SENSOR_LOG_DIR = os.getenv("SENSOR_LOG_DIR", "sensor_log")
+# 메모리에 모아둔 레코드를 이 간격(초) 또는 개수마다 파일에 씀
+SENSOR_LOG_FLUSH_INTERVAL = float(os.getenv("SENSOR_LOG_FLUSH_INTERVAL", 60))
+SENSOR_LOG_FLUSH_RECORDS = int(os.getenv("SENSOR_LOG_FLUSH_RECORDS", 120))
+# fsync는 더 드물게 (정전 시 최대 이 시간만큼 유실 가능)
+SENSOR_LOG_FSYNC_INTERVAL = float(os.getenv("SENSOR_LOG_FSYNC_INTERVAL", 300))
+# 원본 세그먼트 보존 일수 (지나면 시간 단위 집계로 압축)
+SENSOR_LOG_RAW_DAYS = int(os.getenv("SENSOR_LOG_RAW_DAYS", 7))
+# 시간 단위 집계 보존 일수 (지나면 삭제)
+SENSOR_LOG_HOURLY_DAYS = int(os.getenv("SENSOR_LOG_HOURLY_DAYS", 365))
+# 파일 쓰기가 계속 실패할 때 메모리에 보관할 최대 레코드 수 (넘으면 오래된 것부터 버림)
+SENSOR_LOG_MAX_PENDING = int(os.getenv("SENSOR_LOG_MAX_PENDING", 17280))
+
+# 원본 레코드: ts(double) + 온도/습도/CO2(float) = 20바이트
+RAW_RECORD = struct.Struct("<dfff")
+# 집계 레코드: 시각(double) + 샘플 수(uint32) + 필드별 min/max/avg(float) = 48바이트
+HOURLY_RECORD = struct.Struct("<dI9f")
+
+_NAN = float("nan")
+
+
+def _day_of(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y%m%d")
+
+
+def _day_to_date(name):
+    return datetime.strptime(name, "%Y%m%d").date()
+
+
+def _to_float(value):
+    return _NAN if value is None else float(value)
+
+
+class _Segment:
+    """읽기 전용 mmap 세그먼트 (레코드 단위 이진 탐색)"""
+
+    def __init__(self, path, record, max_size=None):
+        self.record = record
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if max_size is not None:
+            # 조회 시작 시점 이후에 추가된 레코드는 무시 (메모리 버퍼와 중복 방지)
+            size = min(size, max_size)
+        # 쓰는 도중 종료되어 잘린 마지막 레코드는 무시
+        self.count = size // record.size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.count else None
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def ts_at(self, i):
+        return struct.unpack_from("<d", self._mm, i * self.record.size)[0]
+
+    def unpack(self, i):
+        return self.record.unpack_from(self._mm, i * self.record.size)
+
+    def bisect_left(self, ts):
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ts_at(mid) < ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def iter_range(self, start, end):
+        """[start, end] 구간의 레코드 튜플을 차례로 반환"""
+        i = self.bisect_left(start)
+        while i < self.count:
+            row = self.unpack(i)
+            if row[0] > end:
+                break
+            yield row
+            i += 1
+
+
+class SensorLog:
+    """
+    추가 전용 센서 로그
+
+    append()는 메모리 버퍼에만 추가하고, 일정 간격/개수마다 세그먼트 파일에 기록
+    - 타임스탬프는 마지막으로 기록한 값 이상으로 보정 (시계가 뒤로 가도 세그먼트 정렬 유지)
+    - 쓰기에 실패한 날짜의 레코드는 버퍼에 남겨 두었다가 다시 시도
+    """
+
+    def __init__(self, directory=SENSOR_LOG_DIR):
+        self.directory = directory
+        self.raw_dir = os.path.join(directory, "raw")
+        self.hourly_dir = os.path.join(directory, "hourly")
+
+        self._pending = []          # (ts, temp, hum, co2), ts 오름차순
+        self._lock = threading.Lock()
+        self._last_ts = None        # 마지막으로 추가한 레코드의 ts (처음 추가할 때 디스크에서 읽음)
+        self._last_flush = time.monotonic()
+        self._retry_at = 0.0        # 쓰기 실패 후 다음 시도 시각 (monotonic)
+        self._last_fsync = time.monotonic()
+        self._dirty_files = set()
+        self._last_day = None
+        self._compacting = False
+
+        self.stats = {"appended": 0, "flushes": 0, "fsyncs": 0, "bytes_written": 0, "compactions": 0,
+                      "clamped": 0, "write_errors": 0, "dropped": 0}
+
+    # --------------------------------------------------------
+    # 쓰기
+    # --------------------------------------------------------
+    def append(self, ts, temperature, humidity, co2):
+        day_changed = False
+        with self._lock:
+            if self._last_ts is None:
+                self._last_ts = self._read_last_ts()
+            if ts < self._last_ts:
+                # 시계가 뒤로 감 (NTP 보정 등): 이진 탐색이 깨지지 않도록 마지막 ts로 고정
+                ts = self._last_ts
+                self.stats["clamped"] += 1
+            self._last_ts = ts
+
+            self._pending.append((ts, _to_float(temperature), _to_float(humidity), _to_float(co2)))
+            self.stats["appended"] += 1
+
+            overflow = len(self._pending) - SENSOR_LOG_MAX_PENDING
+            if overflow > 0:
+                del self._pending[:overflow]
+                self.stats["dropped"] += overflow
+
+            day = _day_of(ts)
+            if self._last_day is not None and day != self._last_day:
+                day_changed = True
+            self._last_day = day
+
+            now = time.monotonic()
+            if now >= self._retry_at and (len(self._pending) >= SENSOR_LOG_FLUSH_RECORDS
+                                          or now - self._last_flush >= SENSOR_LOG_FLUSH_INTERVAL
+                                          or day_changed):
+                self._flush_locked()
+
+        # 날짜가 바뀌면 지난 세그먼트 압축/정리
+        if day_changed:
+            self.compact_in_background()
+
+    def flush(self, sync=False):
+        """버퍼를 파일에 쓰고, sync=True면 즉시 fsync"""
+        with self._lock:
+            self._flush_locked(force_sync=sync)
+
+    def _read_last_ts(self):
+        """가장 최근 원본 세그먼트의 마지막 ts (없으면 0)"""
+        names = self._segment_names(self.raw_dir)
+        if not names:
+            return 0.0
+        try:
+            with _Segment(os.path.join(self.raw_dir, f"{names[-1]}.bin"), RAW_RECORD) as segment:
+                return segment.ts_at(segment.count - 1) if segment.count else 0.0
+        except OSError as e:
+            print(f"[SENSOR_LOG] 마지막 레코드 읽기 실패: {e}")
+            return 0.0
+
+    def _write_day_locked(self, day, rows):
+        """하루치 레코드를 세그먼트 끝에 추가 (실패하면 쓰기 전 크기로 되돌리고 OSError)"""
+        path = os.path.join(self.raw_dir, f"{day}.bin")
+        data = b"".join(RAW_RECORD.pack(*row) for row in rows)
+        with open(path, "ab") as f:
+            size = f.tell()
+            try:
+                f.write(data)
+                f.flush()
+            except OSError:
+                # 일부만 쓰였으면 잘라내서 다시 시도할 때 중복/깨진 레코드가 생기지 않도록
+                try:
+                    f.truncate(size)
+                except OSError:
+                    pass
+                raise
+        self._dirty_files.add(path)
+        self.stats["bytes_written"] += len(data)
+
+    def _flush_locked(self, force_sync=False):
+        self._last_flush = time.monotonic()
+
+        if self._pending:
+            # 하루 단위 세그먼트로 나눠서 기록, 쓰기에 성공한 날짜의 레코드만 버퍼에서 제거
+            # (ts가 오름차순이므로 같은 날짜는 연속, 실패하면 그 뒤 날짜도 다음 시도로 미룸)
+            written = 0
+            try:
+                os.makedirs(self.raw_dir, exist_ok=True)
+                for day, rows in groupby(self._pending, key=lambda row: _day_of(row[0])):
+                    rows = list(rows)
+                    self._write_day_locked(day, rows)
+                    written += len(rows)
+            except OSError as e:
+                self.stats["write_errors"] += 1
+                self._retry_at = time.monotonic() + SENSOR_LOG_FLUSH_INTERVAL
+                print(f"[SENSOR_LOG] 로그 쓰기 실패, {len(self._pending) - written}개 레코드 보관 후 재시도: {e}")
+            else:
+                self._retry_at = 0.0
+                self.stats["flushes"] += 1
+            del self._pending[:written]
+
+        if self._dirty_files and (force_sync or time.monotonic() - self._last_fsync >= SENSOR_LOG_FSYNC_INTERVAL):
+            for path in self._dirty_files:
+                try:
+                    fd = os.open(path, os.O_RDONLY)
+                    try:
+                        os.fsync(fd)
+                    finally:
+                        os.close(fd)
+                except OSError as e:
+                    print(f"[SENSOR_LOG] fsync 실패 ({path}): {e}")
+            self._dirty_files.clear()
+            self._last_fsync = time.monotonic()
+            self.stats["fsyncs"] += 1
+
+    def close(self):
+        """종료 시 남은 레코드 저장"""
+        self.flush(sync=True)
+
+    # --------------------------------------------------------
+    # 압축 / 보존 기간 정리
+    # --------------------------------------------------------
+    def compact_in_background(self):
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+        threading.Thread(target=self.compact, name="sensor-log-compact", daemon=True).start()
+
+    def compact(self, today=None):
+        """
+        - SENSOR_LOG_RAW_DAYS가 지난 원본 세그먼트 → 시간 단위 집계로 변환 후 삭제
+        - SENSOR_LOG_HOURLY_DAYS가 지난 집계 세그먼트 → 삭제
+        """
+        today = today or date.today()
+        try:
+            for name in self._segment_names(self.raw_dir):
+                day = _day_to_date(name)
+                if (today - day).days < SENSOR_LOG_RAW_DAYS:
+                    continue
+                self._compact_day(name)
+
+            for name in self._segment_names(self.hourly_dir):
+                if (today - _day_to_date(name)).days >= SENSOR_LOG_HOURLY_DAYS:
+                    os.remove(os.path.join(self.hourly_dir, f"{name}.bin"))
+                    print(f"[SENSOR_LOG] 보존 기간 경과로 집계 세그먼트 삭제: {name}")
+        except Exception as e:
+            print(f"[SENSOR_LOG] 압축 중 오류: {e}")
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def _compact_day(self, name):
+        raw_path = os.path.join(self.raw_dir, f"{name}.bin")
+        data = bytearray()
+
+        with _Segment(raw_path, RAW_RECORD) as segment:
+            hour = None
+            acc = None
+            for i in range(segment.count):
+                row = segment.unpack(i)
+                row_hour = row[0] - row[0] % 3600
+                if row_hour != hour:
+                    if acc is not None:
+                        data.extend(_pack_hourly(hour, acc))
+                    hour = row_hour
+                    acc = new_bucket()
+                acc["count"] += 1
+                for field, value in zip(FIELDS, row[1:]):
+                    if not math.isnan(value):
+                        add_to_bucket(acc[field], value, value, value, 1)
+            if acc is not None:
+                data.extend(_pack_hourly(hour, acc))
+
+        os.makedirs(self.hourly_dir, exist_ok=True)
+        hourly_path = os.path.join(self.hourly_dir, f"{name}.bin")
+        tmp_path = hourly_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, hourly_path)
+
+        with self._lock:
+            os.remove(raw_path)
+            self._dirty_files.discard(raw_path)
+
+        self.stats["compactions"] += 1
+        print(f"[SENSOR_LOG] {name} 원본 → 시간 단위 집계 압축 ({len(data)} bytes)")
+
+    # --------------------------------------------------------
+    # 조회
+    # --------------------------------------------------------
+    @staticmethod
+    def _segment_names(directory):
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            name[:-4] for name in os.listdir(directory)
+            if name.endswith(".bin") and len(name) == 12
+        )
+
+    def query_buckets(self, start, end, buckets):
+        """
+        [start, end] 구간을 buckets개의 min/max/avg 버킷으로 집계
+        원본이 있는 날은 원본에서, 압축된 날은 시간 단위 집계에서 읽음
+        아직 파일에 쓰지 않은 레코드는 메모리 버퍼에서 읽음 (조회 때문에 flush하지 않음)
+        """
+        first_day = _day_of(start)
+        last_day = _day_of(end)
+
+        # 버퍼 복사와 원본 세그먼트 크기를 같은 시점에 잡아 둠 (그 뒤 flush된 레코드는 파일에서 읽지 않음)
+        with self._lock:
+            pending = [row for row in self._pending if start <= row[0] <= end]
+            raw_sizes = {}
+            for d in self._segment_names(self.raw_dir):
+                if first_day <= d <= last_day:
+                    try:
+                        raw_sizes[d] = os.path.getsize(os.path.join(self.raw_dir, f"{d}.bin"))
+                    except OSError:
+                        pass
+        raw_days = sorted(raw_sizes)
+        hourly_days = [d for d in self._segment_names(self.hourly_dir)
+                       if first_day <= d <= last_day and d not in raw_days]
+
+        width = max((end - start) / buckets, 1e-9)
+        accs = {}
+
+        def bucket_for(ts):
+            index = min(int((ts - start) / width), buckets - 1)
+            if index not in accs:
+                accs[index] = new_bucket()
+            return accs[index]
+
+        for day in hourly_days:
+            with _Segment(os.path.join(self.hourly_dir, f"{day}.bin"), HOURLY_RECORD) as segment:
+                if not segment.count:
+                    continue
+                # 구간 시작 직전에 시작한 시간 집계도 포함
+                for row in segment.iter_range(start - 3600, end):
+                    acc = bucket_for(max(row[0], start))
+                    acc["count"] += row[1]
+                    for i, field in enumerate(FIELDS):
+                        low, high, avg = row[2 + i * 3: 5 + i * 3]
+                        if not math.isnan(avg):
+                            add_to_bucket(acc[field], low, high, avg, row[1])
+
+        def add_raw(row):
+            acc = bucket_for(row[0])
+            acc["count"] += 1
+            for field, value in zip(FIELDS, row[1:]):
+                if not math.isnan(value):
+                    add_to_bucket(acc[field], value, value, value, 1)
+
+        for day in raw_days:
+            try:
+                segment = _Segment(os.path.join(self.raw_dir, f"{day}.bin"), RAW_RECORD, raw_sizes[day])
+            except FileNotFoundError:
+                continue   # 조회 도중 압축되어 삭제됨
+            with segment:
+                if not segment.count:
+                    continue
+                for row in segment.iter_range(start, end):
+                    add_raw(row)
+
+        for row in pending:
+            add_raw(row)
+
+        return [finish_bucket(start + index * width, accs[index]) for index in sorted(accs)]
+
+    def get_stats(self):
+        def dir_info(directory):
+            names = self._segment_names(directory)
+            size = sum(os.path.getsize(os.path.join(directory, f"{n}.bin")) for n in names)
+            return {"segments": len(names), "bytes": size,
+                    "oldest": names[0] if names else None, "newest": names[-1] if names else None}
+
+        with self._lock:
+            stats = dict(self.stats)
+            stats["pending"] = len(self._pending)
+        stats["raw"] = dir_info(self.raw_dir)
+        stats["hourly"] = dir_info(self.hourly_dir)
+        stats["directory"] = os.path.abspath(self.directory)
+        return stats
+
+
+def _pack_hourly(hour, acc):
+    values = []
+    for field in FIELDS:
+        low, high, total, n = acc[field]
+        values.extend((low, high, total / n) if n else (_NAN, _NAN, _NAN))
+    return HOURLY_RECORD.pack(hour, acc["count"], *values)
+
+
+# 앱 전체에서 공유하는 센서 로그
+sensor_log = SensorLog()
+atexit.register(sensor_log.close)
+
+
+def log_sample(snapshot):
+    """device_service 샘플 리스너: 새 스냅샷을 로그에 추가"""
+    sensor_log.append(time.time(), snapshot.temperature, snapshot.humidity, snapshot.co2)
+
+
+def start_sensor_log():
+    """시작 시 밀린 압축/정리 작업을 백그라운드로 실행"""
+    sensor_log.compact_in_background()
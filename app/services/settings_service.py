@@ -1,7 +1,22 @@
+"""
+설정 저장소
+
+settings.json을 메모리에 들고 있다가 파일이 바뀐 경우(mtime/inode/크기)에만 다시 읽음
+- 요청마다 파일을 열고 파싱하지 않음 (파일 변경 확인도 SETTINGS_RECHECK_INTERVAL마다 stat 1회)
+- 저장은 임시 파일 + rename으로 원자적으로 (동시에 POST가 와도 깨진 파일을 읽지 않음)
+- DEFAULT_SETTINGS 기준으로 키/타입/범위를 검증
+- 값이 바뀌면 구독자(날씨 캐시 등)에게 알림
+"""
 import json
 import os
+import re
+import time
+import threading
+from datetime import datetime
 
 SETTINGS_FILE = "settings.json"
+# 외부에서 파일을 직접 수정한 경우를 확인하는 간격 (초)
+SETTINGS_RECHECK_INTERVAL = float(os.getenv("SETTINGS_RECHECK_INTERVAL", 2))
 
 DEFAULT_SETTINGS = {
     "location": "1835848",
@@ -11,23 +26,278 @@ DEFAULT_SETTINGS = {
     "ttsEnabled": True,
     "ttsSpeed": 1.0,
     "ttsPitch": 1.0,
+    # 자동 조언 정책 (스케줄러)
+    "quietHoursEnabled": False,
+    "quietHoursStart": "22:00",
+    "quietHoursEnd": "07:00",
+    "adviceCooldownMinutes": 30,
+    "co2AlertThreshold": 1500,
 }
 
-def load_settings():
-    """settings.json 파일을 읽어서 반환"""
-    if not os.path.exists(SETTINGS_FILE):
-        save_settings(DEFAULT_SETTINGS)
-        return DEFAULT_SETTINGS
+# 허용 값 / 범위 (DEFAULT_SETTINGS에 있는 키만 저장 가능)
+SETTINGS_CHOICES = {
+    "temperatureUnit": ("celsius", "fahrenheit"),
+}
+SETTINGS_RANGES = {
+    "refreshInterval": (1, 3600),
+    "ttsSpeed": (0.25, 4.0),
+    "ttsPitch": (0.25, 4.0),
+    "adviceCooldownMinutes": (0, 1440),
+    "co2AlertThreshold": (600, 5000),
+}
+_TIME_OF_DAY = re.compile(r"^([01]\d|2[0-3]):[0-5]\d$")
+SETTINGS_PATTERNS = {
+    "quietHoursStart": (_TIME_OF_DAY, "HH:MM 형식이어야 합니다"),
+    "quietHoursEnd": (_TIME_OF_DAY, "HH:MM 형식이어야 합니다"),
+}
+
+
+class SettingsValidationError(ValueError):
+    """설정 값이 스키마에 맞지 않음 (errors: 키 → 사유)"""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(f"{key}: {reason}" for key, reason in errors.items()))
+        self.errors = errors
+
+
+def validate_settings(data: dict) -> dict:
+    """
+    DEFAULT_SETTINGS 기준으로 검증하고 정규화된 dict 반환
+
+    - 알 수 없는 키는 오류
+    - 타입은 기본값과 같아야 함 (숫자는 int/float 호환, location은 숫자도 문자열로 변환)
+
+    Raises:
+        SettingsValidationError
+    """
+    if not isinstance(data, dict):
+        raise SettingsValidationError({"_": "JSON 객체가 아닙니다"})
+
+    errors = {}
+    result = {}
+    for key, value in data.items():
+        if key not in DEFAULT_SETTINGS:
+            errors[key] = "알 수 없는 설정"
+            continue
+
+        default = DEFAULT_SETTINGS[key]
+        if isinstance(default, bool):
+            if not isinstance(value, bool):
+                errors[key] = "true/false 값이어야 합니다"
+                continue
+        elif isinstance(default, (int, float)):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                errors[key] = "숫자여야 합니다"
+                continue
+            value = type(default)(value) if isinstance(default, float) else value
+        elif isinstance(default, str):
+            if key == "location" and isinstance(value, int) and not isinstance(value, bool):
+                value = str(value)
+            if not isinstance(value, str) or not value:
+                errors[key] = "문자열이어야 합니다"
+                continue
+
+        if key in SETTINGS_CHOICES and value not in SETTINGS_CHOICES[key]:
+            errors[key] = f"{', '.join(SETTINGS_CHOICES[key])} 중 하나여야 합니다"
+            continue
+        if key in SETTINGS_PATTERNS and not SETTINGS_PATTERNS[key][0].match(value):
+            errors[key] = SETTINGS_PATTERNS[key][1]
+            continue
+        if key in SETTINGS_RANGES:
+            low, high = SETTINGS_RANGES[key]
+            if not low <= value <= high:
+                errors[key] = f"{low} ~ {high} 범위여야 합니다"
+                continue
+
+        result[key] = value
+
+    if errors:
+        raise SettingsValidationError(errors)
+    return result
+
+
+class SettingsStore:
+    def __init__(self, path=SETTINGS_FILE):
+        self.path = path
+        self._data = None
+        self._signature = None      # (mtime_ns, inode, size) - 마지막으로 읽거나 쓴 파일
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+        self._listeners = []
+        self.stats = {"reads": 0, "writes": 0, "reloads": 0}
+
+    # --------------------------------------------------------
+    # 구독
+    # --------------------------------------------------------
+    def add_listener(self, callback):
+        """callback(new_settings, old_settings, changed_keys) 등록"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def _notify(self, new, old):
+        changed = {key for key in new if old is None or old.get(key) != new.get(key)}
+        if not changed:
+            return
+        for callback in list(self._listeners):
+            try:
+                callback(dict(new), dict(old) if old else None, changed)
+            except Exception as e:
+                print(f"[SETTINGS] 변경 알림 처리 중 오류 발생: {e}")
+
+    # --------------------------------------------------------
+    # 파일
+    # --------------------------------------------------------
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+    def _read_file(self):
+        """파일을 읽어 기본값과 합침. 잘못된 값은 기본값으로 대체 (락을 잡은 상태에서 호출)"""
+        with open(self.path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        if not isinstance(raw, dict):
+            raise ValueError("settings.json이 JSON 객체가 아닙니다")
 
-    try:
-        with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        save_settings(DEFAULT_SETTINGS)
-        return DEFAULT_SETTINGS
+        data = dict(DEFAULT_SETTINGS)
+        for key, value in raw.items():
+            try:
+                data.update(validate_settings({key: value}))
+            except SettingsValidationError as e:
+                print(f"[SETTINGS] ⚠ 잘못된 설정 무시: {e}")
+        return data
+
+    def _write_file(self, data):
+        """임시 파일에 쓰고 rename (락을 잡은 상태에서 호출)"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp_path = os.path.join(directory, f".{os.path.basename(self.path)}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._signature = self._file_signature()
+        self.stats["writes"] += 1
+
+    def _refresh_locked(self):
+        """파일이 바뀌었으면 다시 읽음. 바뀌었으면 (new, old) 반환"""
+        now = time.monotonic()
+        if self._data is not None and now - self._checked_at < SETTINGS_RECHECK_INTERVAL:
+            return None
+        self._checked_at = now
+
+        signature = self._file_signature()
+        if self._data is not None and signature == self._signature:
+            return None
+
+        old = self._data
+        if signature is None:
+            # 파일이 없으면 기본값(또는 메모리의 마지막 값)으로 새로 만듦
+            self._data = dict(old or DEFAULT_SETTINGS)
+            self._write_file(self._data)
+        else:
+            try:
+                self._data = self._read_file()
+                self._signature = signature
+                self.stats["reloads"] += 1
+            except Exception as e:
+                print(f"[SETTINGS] ⚠ settings.json 읽기 실패: {e}")
+                if old is None:
+                    self._data = dict(DEFAULT_SETTINGS)
+                    self._write_file(self._data)
+                else:
+                    # 마지막 정상값 유지
+                    self._signature = signature
+
+        return (self._data, old) if old is not None and old != self._data else None
+
+    # --------------------------------------------------------
+    # 외부 인터페이스
+    # --------------------------------------------------------
+    def get(self) -> dict:
+        with self._lock:
+            changed = self._refresh_locked()
+            self.stats["reads"] += 1
+            data = dict(self._data)
+        if changed:
+            self._notify(*changed)
+        return data
+
+    def update(self, values: dict) -> dict:
+        """
+        일부 키만 바꿔서 저장 (검증 실패 시 SettingsValidationError, 파일은 그대로)
+
+        Returns:
+            저장된 전체 설정
+        """
+        values = validate_settings(values)
+        with self._lock:
+            self._refresh_locked()
+            old = self._data
+            new = dict(old)
+            new.update(values)
+            if new != old:
+                self._write_file(new)
+                self._data = new
+            result = dict(new)
+        if new != old:
+            self._notify(new, old)
+        return result
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["path"] = os.path.abspath(self.path)
+        return stats
+
+
+# 앱 전체에서 공유하는 설정 저장소
+settings_store = SettingsStore()
+
+
+def add_settings_listener(callback):
+    """설정 변경 구독 (callback(new, old, changed_keys))"""
+    settings_store.add_listener(callback)
+
+
+def load_settings():
+    """현재 설정 반환 (메모리, 파일이 바뀐 경우에만 다시 읽음)"""
+    return settings_store.get()
 
 
 def save_settings(data: dict):
-    """settings.json 파일에 저장"""
-    with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """
+    설정 저장 (전달한 키만 변경)
+
+    Raises:
+        SettingsValidationError: 스키마에 맞지 않는 값
+    """
+    return settings_store.update(data)
+
+
+def time_of_day_minutes(value):
+    """"HH:MM" → 자정부터의 분"""
+    hour, minute = value.split(":")
+    return int(hour) * 60 + int(minute)
+
+
+def in_time_window(start, end, when=None):
+    """when(기본 현재)이 start ~ end 분 범위 안인지 (자정을 넘는 범위 지원, 예: 22:00 ~ 07:00)"""
+    if start == end:
+        return False
+    when = when or datetime.now()
+    minute = when.hour * 60 + when.minute
+    if start < end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+
+def is_quiet_hours(settings=None, when=None):
+    """설정의 방해 금지 시간인지"""
+    settings = settings or load_settings()
+    if not settings.get("quietHoursEnabled"):
+        return False
+    return in_time_window(time_of_day_minutes(settings["quietHoursStart"]),
+                          time_of_day_minutes(settings["quietHoursEnd"]), when)
@@ -0,0 +1,285 @@
+"""
+공용 타이머 서비스 (계층형 타이머 휠, monotonic 시계)
+
+LED 표시 시간, TTS 재생 감시, 정기 작업처럼 "N초 후 / N초마다" 실행할 콜백을 한곳에서 관리
+- 휠 스레드 1개 + 콜백 실행 스레드 최대 TIMER_WORKERS개 (타이머마다 스레드를 만들지 않음)
+- 4단계 x 64칸 휠: 등록/취소 O(1), 틱(TIMER_TICK) 단위 정밀도, 최대 약 64^4 틱 앞까지 (그 이상은 나눠서 대기)
+- 가까운 타이머가 없으면 다음 칸 이동 시점까지 잠들어 있음 (빈 틱마다 깨어나지 않음)
+
+사용법:
+    timer = call_later(30, clear_display)           # 30초 후 1회
+    job = call_every(3600, scheduled_person_detection)  # 1시간마다
+    timer.cancel()
+
+inline=True: 휠 스레드에서 바로 실행 (상태만 바꾸는 아주 짧은 콜백용)
+주기 작업은 이전 실행이 끝나지 않았으면 이번 실행을 건너뜀 (중복 실행 없음)
+"""
+import os
+import time
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+TIMER_TICK = float(os.getenv("TIMER_TICK", 0.05))      # 초
+TIMER_WORKERS = int(os.getenv("TIMER_WORKERS", 4))
+
+WHEEL_BITS = 6
+WHEEL_SIZE = 1 << WHEEL_BITS
+WHEEL_MASK = WHEEL_SIZE - 1
+WHEEL_LEVELS = 4
+WHEEL_SPAN = 1 << (WHEEL_BITS * WHEEL_LEVELS)   # 휠 전체가 담을 수 있는 틱 수
+
+
+class Timer:
+    """등록된 콜백 핸들 (cancel()로 취소)"""
+    __slots__ = ("wheel", "callback", "args", "name", "interval", "inline",
+                 "expires", "_slot", "cancelled", "running", "runs")
+
+    def __init__(self, wheel, callback, args, name, interval, inline):
+        self.wheel = wheel
+        self.callback = callback
+        self.args = args
+        self.name = name or getattr(callback, "__name__", "timer")
+        self.interval = interval      # 주기 (틱), 1회용이면 None
+        self.inline = inline
+        self.expires = 0              # 실행 예정 틱
+        self._slot = None             # 들어 있는 휠 칸 (set)
+        self.cancelled = False
+        self.running = False
+        self.runs = 0
+
+    def cancel(self):
+        self.wheel._cancel(self)
+
+    @property
+    def active(self):
+        return not self.cancelled and self._slot is not None
+
+    def remaining(self):
+        """실행까지 남은 초 (취소/만료되었으면 None)"""
+        if not self.active:
+            return None
+        return max(0.0, self.wheel._tick_time(self.expires) - time.monotonic())
+
+    def __repr__(self):
+        return f"<Timer {self.name} active={self.active}>"
+
+
+class TimerWheel:
+    def __init__(self, tick=TIMER_TICK, workers=TIMER_WORKERS):
+        self.tick = tick
+        self.workers = workers
+        self._levels = [[set() for _ in range(WHEEL_SIZE)] for _ in range(WHEEL_LEVELS)]
+        self._origin = time.monotonic()
+        self._current = 0             # 다음에 처리할 틱
+        self._count = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._stopped = False
+        self.stats = {"scheduled": 0, "fired": 0, "cancelled": 0, "skipped": 0, "errors": 0}
+
+    # --------------------------------------------------------
+    # 등록 / 취소
+    # --------------------------------------------------------
+    def call_later(self, delay, callback, *args, name=None, inline=False):
+        """delay초 후 callback(*args) 1회 실행"""
+        timer = Timer(self, callback, args, name, None, inline)
+        self._schedule(timer, delay)
+        return timer
+
+    def call_every(self, interval, callback, *args, name=None, first_delay=None, inline=False):
+        """interval초마다 callback(*args) 실행 (첫 실행은 first_delay초 후, 기본 interval)"""
+        if interval <= 0:
+            raise ValueError(f"주기는 0보다 커야 합니다: {interval}")
+        timer = Timer(self, callback, args, name, max(1, round(interval / self.tick)), inline)
+        self._schedule(timer, interval if first_delay is None else first_delay)
+        return timer
+
+    def _schedule(self, timer, delay):
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("타이머 서비스가 종료되었습니다.")
+            # 올림: 지정한 시간보다 일찍 실행되지 않도록
+            elapsed = time.monotonic() - self._origin + max(0.0, delay)
+            timer.expires = max(self._current, -int(-elapsed // self.tick))
+            self._place_locked(timer)
+            self._count += 1
+            self.stats["scheduled"] += 1
+            self._ensure_thread_locked()
+            self._cond.notify()
+
+    def _cancel(self, timer):
+        with self._cond:
+            if timer.cancelled:
+                return
+            timer.cancelled = True
+            if timer._slot is not None:
+                timer._slot.discard(timer)
+                timer._slot = None
+                self._count -= 1
+            self.stats["cancelled"] += 1
+
+    def _place_locked(self, timer):
+        expires = timer.expires
+        delta = expires - self._current
+        if delta < 0:
+            slot = self._levels[0][self._current & WHEEL_MASK]
+        else:
+            if delta >= WHEEL_SPAN:
+                # 휠 범위 밖: 마지막 칸에 두었다가 그때 다시 배치
+                expires = self._current + WHEEL_SPAN - 1
+                delta = WHEEL_SPAN - 1
+            level = 0
+            while delta >= 1 << (WHEEL_BITS * (level + 1)):
+                level += 1
+            slot = self._levels[level][(expires >> (WHEEL_BITS * level)) & WHEEL_MASK]
+        slot.add(timer)
+        timer._slot = slot
+
+    def _tick_time(self, tick):
+        return self._origin + tick * self.tick
+
+    # --------------------------------------------------------
+    # 휠 진행
+    # --------------------------------------------------------
+    def _cascade_locked(self, level):
+        """상위 단계의 현재 칸을 비우고 다시 배치 (칸 번호 반환)"""
+        index = (self._current >> (WHEEL_BITS * level)) & WHEEL_MASK
+        slot = self._levels[level][index]
+        self._levels[level][index] = set()
+        for timer in slot:
+            self._place_locked(timer)
+        return index
+
+    def _advance_locked(self, due):
+        """틱 하나 진행, 만료된 타이머를 due에 추가"""
+        index = self._current & WHEEL_MASK
+        if index == 0:
+            level = 1
+            while level < WHEEL_LEVELS and self._cascade_locked(level) == 0:
+                level += 1
+
+        tick = self._current
+        self._current += 1
+        slot = self._levels[0][index]
+        if not slot:
+            return
+        self._levels[0][index] = set()
+        for timer in slot:
+            timer._slot = None
+            if timer.expires > tick:
+                # 휠 범위를 넘어 잘려 있던 타이머
+                self._place_locked(timer)
+                continue
+            if timer.interval:
+                # 다음 실행 예약 (밀린 실행은 몰아서 하지 않음)
+                timer.expires += timer.interval
+                if timer.expires <= tick:
+                    timer.expires = tick + timer.interval
+                self._place_locked(timer)
+            else:
+                self._count -= 1
+            due.append(timer)
+
+    def _sleep_ticks_locked(self):
+        """다음에 깨어날 때까지의 틱 수 (타이머가 없으면 None)"""
+        if self._count == 0:
+            return None
+        base = self._current
+        # 다음 칸 이동 전까지 1단계에서 가장 가까운 타이머
+        boundary = WHEEL_SIZE - (base & WHEEL_MASK)
+        level0 = self._levels[0]
+        for offset in range(boundary):
+            if level0[(base + offset) & WHEEL_MASK]:
+                return offset
+        return boundary
+
+    def _run(self):
+        while True:
+            due = []
+            with self._cond:
+                while not due:
+                    if self._stopped:
+                        return
+                    now_tick = int((time.monotonic() - self._origin) // self.tick)
+                    while self._current <= now_tick:
+                        self._advance_locked(due)
+                    if due:
+                        break
+                    ticks = self._sleep_ticks_locked()
+                    if ticks is None:
+                        self._cond.wait()
+                    else:
+                        self._cond.wait(max(0.0, self._tick_time(self._current + ticks) - time.monotonic()))
+
+            for timer in due:
+                self._dispatch(timer)
+
+    def _dispatch(self, timer):
+        if timer.cancelled:
+            return
+        if timer.running:
+            # 이전 실행이 아직 진행 중인 주기 작업
+            self.stats["skipped"] += 1
+            print(f"[TIMER] '{timer.name}' 이전 실행이 끝나지 않아 건너뜀")
+            return
+        timer.running = True
+        self.stats["fired"] += 1
+        if timer.inline:
+            self._invoke(timer)
+        else:
+            self._get_executor().submit(self._invoke, timer)
+
+    def _invoke(self, timer):
+        try:
+            timer.callback(*timer.args)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[TIMER] '{timer.name}' 실행 중 오류 발생: {e}")
+        finally:
+            timer.runs += 1
+            timer.running = False
+
+    # --------------------------------------------------------
+    # 스레드 관리
+    # --------------------------------------------------------
+    def _ensure_thread_locked(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="timer-wheel", daemon=True)
+            self._thread.start()
+
+    def _get_executor(self):
+        with self._cond:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="timer-worker")
+            return self._executor
+
+    def shutdown(self, wait=False):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats["pending"] = self._count
+            stats["tick_seconds"] = self.tick
+            stats["workers"] = self.workers
+        return stats
+
+
+# 앱 전체에서 공유하는 타이머 휠
+timer_wheel = TimerWheel()
+atexit.register(timer_wheel.shutdown)
+
+
+def call_later(delay, callback, *args, name=None, inline=False):
+    return timer_wheel.call_later(delay, callback, *args, name=name, inline=inline)
+
+
+def call_every(interval, callback, *args, name=None, first_delay=None, inline=False):
+    return timer_wheel.call_every(interval, callback, *args, name=name, first_delay=first_delay, inline=inline)
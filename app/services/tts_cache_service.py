@@ -0,0 +1,173 @@
+"""
+TTS 음성 캐시 (디스크, 내용 주소 기반)
+
+(text, lang)의 해시를 파일 이름으로 MP3를 저장하고,
+용량 한도를 넘으면 가장 오래 사용하지 않은 파일부터 삭제 (LRU)
+캐시에 있는 문장은 gTTS(네트워크) 없이 바로 재생되므로 오프라인에서도 동작
+속도/음높이는 재생할 때 적용하므로 키에 넣지 않음 (설정을 바꿔도 같은 MP3를 재사용)
+"""
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "tts_cache")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", 50 * 1024 * 1024))  # 50MB
+
+# 시작 시 미리 합성해 둘 고정 문구
+COMMON_PHRASES = [
+    "조언을 생성할 수 없습니다.",
+    "추천을 생성할 수 없습니다.",
+]
+
+
+def cache_key(text, lang):
+    raw = f"{lang}\0{text.strip()}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TtsAudioCache:
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index = None          # key → size (앞쪽이 가장 오래 사용하지 않은 항목)
+        self._total = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "bytes_saved": 0, "evictions": 0, "writes": 0}
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _load_index(self):
+        """최초 사용 시 디렉터리를 훑어 mtime 순으로 LRU 순서 복원 (락을 잡은 상태에서 호출)"""
+        if self._index is not None:
+            return
+        self._index = OrderedDict()
+        self._total = 0
+        if not os.path.isdir(self.directory):
+            return
+
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".mp3"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-4], st.st_size))
+
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total += size
+
+    def get(self, text, lang):
+        """캐시된 MP3 bytes 반환, 없으면 None"""
+        key = cache_key(text, lang)
+        with self._lock:
+            self._load_index()
+            if key not in self._index:
+                self.stats["misses"] += 1
+                return None
+
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                # 재시작 후에도 LRU 순서가 유지되도록 mtime 갱신
+                os.utime(path, None)
+            except OSError:
+                self._total -= self._index.pop(key)
+                self.stats["misses"] += 1
+                return None
+
+            self._index.move_to_end(key)
+            self.stats["hits"] += 1
+            self.stats["bytes_saved"] += len(data)
+            return data
+
+    def contains(self, text, lang):
+        key = cache_key(text, lang)
+        with self._lock:
+            self._load_index()
+            return key in self._index
+
+    def put(self, text, lang, data):
+        """MP3 저장 (임시 파일 + rename), 한도를 넘으면 오래된 항목 삭제"""
+        if not data or len(data) > self.max_bytes:
+            return
+        key = cache_key(text, lang)
+        path = self._path(key)
+
+        with self._lock:
+            self._load_index()
+            if key in self._index:
+                return
+
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"[TTS_CACHE] 저장 실패: {e}")
+                return
+
+            self._index[key] = len(data)
+            self._total += len(data)
+            self.stats["writes"] += 1
+
+            while self._total > self.max_bytes and self._index:
+                old_key, size = self._index.popitem(last=False)
+                self._total -= size
+                self.stats["evictions"] += 1
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+
+    def get_stats(self):
+        with self._lock:
+            self._load_index()
+            stats = dict(self.stats)
+            stats["entries"] = len(self._index)
+            stats["bytes"] = self._total
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else None
+        stats["max_bytes"] = self.max_bytes
+        stats["directory"] = os.path.abspath(self.directory)
+        return stats
+
+
+# 앱 전체에서 공유하는 TTS 캐시
+tts_cache = TtsAudioCache()
+
+
+def prewarm_tts_cache(phrases=None, lang="ko", synthesize=None):
+    """
+    자주 쓰는 문구를 백그라운드에서 미리 합성
+    synthesize: (text, lang) → MP3 bytes (tts_service에서 주입)
+    """
+    phrases = COMMON_PHRASES if phrases is None else phrases
+
+    def run():
+        started = time.monotonic()
+        created = 0
+        for phrase in phrases:
+            if tts_cache.contains(phrase, lang):
+                continue
+            try:
+                tts_cache.put(phrase, lang, synthesize(phrase, lang))
+                created += 1
+            except Exception as e:
+                # 오프라인 등으로 실패하면 다음 시작 때 다시 시도
+                print(f"[TTS_CACHE] 미리 합성 실패 ({phrase[:20]}...): {e}")
+                break
+        if created:
+            print(f"[TTS_CACHE] {created}개 문구 미리 합성 완료 ({time.monotonic() - started:.1f}초)")
+
+    thread = threading.Thread(target=run, name="tts-cache-prewarm", daemon=True)
+    thread.start()
+    return thread
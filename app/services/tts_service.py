@@ -1,151 +1,415 @@
 """
 TTS (Text-to-Speech) 서비스
 라즈베리파이 스피커로 음성 출력
+
+문장 단위 파이프라인:
+  문장 큐 → [합성 스레드: gTTS → MP3 bytes] → 오디오 큐 → [재생 스레드: 플레이어 stdin 파이프]
+문장 N이 재생되는 동안 문장 N+1을 합성하고, 발화 하나는 플레이어 프로세스 하나로 이어서 재생
+속도/음높이(ttsSpeed/ttsPitch)는 합성이 아니라 재생할 때 적용 (ffplay 오디오 필터, espeak 옵션)
 """
+import io
 import os
-import tempfile
+import re
+import queue
 import logging
+import threading
+import subprocess
 from typing import Optional
 
+from app.services.tts_cache_service import tts_cache, prewarm_tts_cache
+from app.services.settings_service import load_settings
+from app.services.timer_service import call_later
+
 logger = logging.getLogger(__name__)
 
-# 현재 재생 중인 프로세스 추적
-current_tts_process = None
+# 재생 대기 중인 합성 결과 최대 개수 (앞서 합성할 문장 수)
+TTS_PREFETCH = int(os.getenv("TTS_PREFETCH", 2))
+# 플레이어가 남은 오디오를 재생하며 종료되기를 기다리는 최대 시간
+TTS_PLAYBACK_TIMEOUT = int(os.getenv("TTS_PLAYBACK_TIMEOUT", 120))
+# gTTS가 만드는 MP3의 샘플레이트 (음높이를 바꿀 때 asetrate 기준)
+TTS_SAMPLE_RATE = int(os.getenv("TTS_SAMPLE_RATE", 24000))
+
+# stdin으로 MP3 스트림을 받는 플레이어 (우선순위 순)
+# ffplay: 블루투스 포함 모든 오디오 장치 지원, -loglevel panic: 오류 메시지 숨김
+PLAYERS = [
+    ['ffplay', '-nodisp', '-autoexit', '-loglevel', 'panic', '-i', 'pipe:0'],  # 최우선 (블루투스 지원)
+    ['mpg123', '-q', '-'],                                                    # 대체
+    ['cvlc', '--play-and-exit', '--quiet', '-'],                              # 대체2
+]
+
+# 문장 끝 기호 뒤에 공백이 와야 문장이 끝난 것으로 판단 ("3.5도" 같은 숫자 보호)
+_SENTENCE_END_PATTERN = re.compile(r'[.!?。]+["\')\]]*\s+')
+
+# 재생 중인 문장 스트림 (stop_tts에서 일괄 취소)
+_active_streams = set()
+
+# 한 번 실행에 성공한 플레이어 (매번 없는 플레이어부터 시도하지 않도록)
+_working_player = None
+
+
+class SentenceSplitter:
+    """텍스트 조각을 받아 완성된 문장 단위로 잘라냄"""
+
+    def __init__(self):
+        self._buffer = ""
+
+    def feed(self, text):
+        self._buffer += text
+        sentences = []
+        while True:
+            m = _SENTENCE_END_PATTERN.search(self._buffer)
+            if not m:
+                break
+            sentence = self._buffer[:m.end()].strip()
+            self._buffer = self._buffer[m.end():]
+            if sentence:
+                sentences.append(sentence)
+        return sentences
+
+    def flush(self):
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return [rest] if rest else []
+
+
+def split_sentences(text: str):
+    """전체 텍스트를 문장 리스트로 분리"""
+    splitter = SentenceSplitter()
+    return splitter.feed(text) + splitter.flush()
+
 
 def stop_tts() -> None:
     """
     현재 재생 중인 TTS 중단
     """
-    global current_tts_process
+    streams = list(_active_streams)
 
-    if current_tts_process and current_tts_process.poll() is None:
+    if streams:
         print(f"[TTS] 🛑 재생 중단 요청")
-        current_tts_process.kill()
-        current_tts_process.wait()
-        current_tts_process = None
+        for stream in streams:
+            stream.cancel()
         print(f"[TTS] ✅ 재생 중단 완료")
     else:
         print(f"[TTS] ℹ️  재생 중인 TTS 없음")
 
 
-def play_tts(text: str, lang: str = 'ko') -> None:
+def _player_env():
+    """PulseAudio 사용 강제"""
+    env = os.environ.copy()
+    env['SDL_AUDIODRIVER'] = 'pulseaudio'  # SDL(ffplay)에서 PulseAudio 사용
+    env['AUDIODEV'] = 'pulse'              # 오디오 장치를 pulse로
+    if 'PULSE_SERVER' not in env:
+        env['PULSE_SERVER'] = '/run/user/1000/pulse/native'  # PulseAudio 서버 주소
+    return env
+
+
+def _synthesize_uncached(text: str, lang: str) -> bytes:
+    """gTTS로 MP3 생성 (임시 파일 없이 메모리에서)"""
+    from gtts import gTTS
+
+    buf = io.BytesIO()
+    gTTS(text=text, lang=lang, slow=False).write_to_fp(buf)
+    return buf.getvalue()
+
+
+def _synthesize(text: str, lang: str) -> bytes:
+    """캐시에 있으면 gTTS 호출 없이 반환, 없으면 합성 후 캐시에 저장"""
+    data = tts_cache.get(text, lang)
+    if data is not None:
+        print(f"[TTS] 캐시 사용: {text[:50]}...")
+        return data
+
+    print(f"[TTS] gTTS로 음성 생성 중: {text[:50]}...")
+    data = _synthesize_uncached(text, lang)
+    tts_cache.put(text, lang, data)
+    return data
+
+
+def _atempo_filters(factor: float):
+    """atempo는 한 단계에 0.5~2.0배만 지원하므로 범위를 넘으면 여러 단계로 나눔"""
+    filters = []
+    while factor > 2.0:
+        filters.append("atempo=2.0")
+        factor /= 2.0
+    while factor < 0.5:
+        filters.append("atempo=0.5")
+        factor /= 0.5
+    filters.append(f"atempo={factor:.4f}")
+    return filters
+
+
+def _audio_filter(speed: float, pitch: float) -> str:
     """
-    텍스트를 음성으로 변환하여 라즈베리파이 스피커로 재생
+    ffplay -af 필터 문자열 (바꿀 것이 없으면 빈 문자열)
+    asetrate로 재생 속도를 바꿔 음높이를 올리고/내린 뒤, atempo로 속도만 speed에 맞게 되돌림
+    """
+    filters = []
+    if pitch != 1.0:
+        filters += [f"asetrate={round(TTS_SAMPLE_RATE * pitch)}", f"aresample={TTS_SAMPLE_RATE}"]
+    tempo = speed / pitch
+    if tempo != 1.0:
+        filters += _atempo_filters(tempo)
+    return ",".join(filters)
 
-    Args:
-        text: 변환할 텍스트
-        lang: 언어 코드 (기본값: 'ko')
 
-    Raises:
-        Exception: TTS 재생 실패 시
+def _player_command(player_cmd, speed: float, pitch: float):
+    """플레이어 명령에 속도/음높이 필터 추가 (ffplay만 지원)"""
+    audio_filter = _audio_filter(speed, pitch)
+    if not audio_filter:
+        return player_cmd
+    if player_cmd[0] != 'ffplay':
+        print(f"[TTS] {player_cmd[0]}은 속도/음높이 조절을 지원하지 않아 기본 속도로 재생합니다.")
+        return player_cmd
+    return player_cmd[:-2] + ['-af', audio_filter] + player_cmd[-2:]
+
+
+def prewarm_tts(phrases=None, lang: str = 'ko'):
+    """자주 쓰는 문구를 백그라운드에서 미리 합성해 캐시에 저장"""
+    return prewarm_tts_cache(phrases, lang, synthesize=_synthesize_uncached)
+
+
+class TtsStream:
     """
-    try:
-        # 방법 1: gTTS + 시스템 오디오 플레이어 (최우선, 음질 좋음)
+    문장 단위 TTS 파이프라인
+
+    feed()로 넘긴 문장을 합성 스레드가 미리 MP3로 만들고,
+    재생 스레드가 하나의 플레이어 프로세스 stdin에 이어서 써 넣음
+    gTTS/플레이어를 쓸 수 없는 문장은 espeak으로 재생
+    speed/pitch를 생략하면 설정(ttsSpeed/ttsPitch)을 따름
+    """
+
+    def __init__(self, lang: str = 'ko', speed: Optional[float] = None, pitch: Optional[float] = None):
+        settings = load_settings() if speed is None or pitch is None else None
+        self.lang = lang
+        self.speed = float(settings.get("ttsSpeed", 1.0) if speed is None else speed)
+        self.pitch = float(settings.get("ttsPitch", 1.0) if pitch is None else pitch)
+        self.played = 0         # 재생에 성공한 문장 수
+        self._sentences = queue.Queue()
+        self._audio = queue.Queue(maxsize=TTS_PREFETCH)
+        self._cancelled = threading.Event()
+        self._process = None
+        self._process_lock = threading.Lock()
+
+        _active_streams.add(self)
+        self._synth_thread = threading.Thread(target=self._synth_loop, name="tts-synth", daemon=True)
+        self._player_thread = threading.Thread(target=self._player_loop, name="tts-player", daemon=True)
+        self._synth_thread.start()
+        self._player_thread.start()
+
+    # --------------------------------------------------------
+    # 외부 인터페이스
+    # --------------------------------------------------------
+    def feed(self, sentence: str) -> None:
+        """재생할 문장 추가"""
+        if sentence and not self._cancelled.is_set():
+            self._sentences.put(sentence)
+
+    def close(self) -> None:
+        """더 이상 문장이 없음 (남은 문장은 끝까지 재생)"""
+        self._sentences.put(None)
+
+    def cancel(self) -> None:
+        """남은 문장을 버리고 재생 중인 플레이어를 즉시 종료"""
+        self._cancelled.set()
+        self._sentences.put(None)
+        with self._process_lock:
+            if self._process is not None and self._process.poll() is None:
+                self._process.kill()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """모든 문장 재생이 끝날 때까지 대기"""
+        self._player_thread.join(timeout)
+
+    # --------------------------------------------------------
+    # 합성 스레드
+    # --------------------------------------------------------
+    def _synth_loop(self) -> None:
+        while True:
+            sentence = self._sentences.get()
+            if sentence is None or self._cancelled.is_set():
+                break
+
+            try:
+                item = ("mp3", _synthesize(sentence, self.lang), sentence)
+            except ImportError:
+                print(f"[TTS] ❌ gTTS가 설치되지 않음. espeak 시도...")
+                item = ("text", None, sentence)
+            except Exception as e:
+                print(f"[TTS] ❌ gTTS 실행 중 오류: {e}, espeak 시도...")
+                item = ("text", None, sentence)
+
+            if not self._put_audio(item):
+                break
+
+        self._put_audio(None)
+
+    def _put_audio(self, item) -> bool:
+        """오디오 큐가 비기를 기다리며 넣기 (취소되면 False)"""
+        while not self._cancelled.is_set():
+            try:
+                self._audio.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    # --------------------------------------------------------
+    # 재생 스레드
+    # --------------------------------------------------------
+    def _player_loop(self) -> None:
         try:
-            from gtts import gTTS
-            import subprocess
-
-            # 임시 파일 생성
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as fp:
-                temp_file = fp.name
-
-            # TTS 생성
-            print(f"[TTS] gTTS로 음성 생성 중: {text[:50]}...")
-            tts = gTTS(text=text, lang=lang, slow=False)
-            tts.save(temp_file)
-            print(f"[TTS] MP3 파일 생성 완료: {temp_file}")
-
-            # 시스템 명령어로 재생
-            # ffplay: 블루투스 포함 모든 오디오 장치 지원, 오류 메시지 최소화
-            # -loglevel panic: 오류 메시지 숨김
-            players = [
-                ['ffplay', '-nodisp', '-autoexit', '-loglevel', 'panic', temp_file],  # 최우선 (블루투스 지원)
-                ['mpg123', '-q', temp_file],  # 대체
-                ['cvlc', '--play-and-exit', '--quiet', temp_file],  # 대체2
-            ]
-
-            played = False
-            global current_tts_process
-
-            for player_cmd in players:
+            while not self._cancelled.is_set():
                 try:
-                    print(f"[TTS] 재생 시도: {' '.join(player_cmd)}")
-
-                    # 환경 변수 설정: PulseAudio 사용 강제
-                    env = os.environ.copy()
-                    env['SDL_AUDIODRIVER'] = 'pulseaudio'  # SDL(ffplay)에서 PulseAudio 사용
-                    env['AUDIODEV'] = 'pulse'              # 오디오 장치를 pulse로
-                    if 'PULSE_SERVER' not in env:
-                        env['PULSE_SERVER'] = '/run/user/1000/pulse/native'  # PulseAudio 서버 주소
-
-                    # 타임아웃: 텍스트 길이에 따라 동적 조정 (최소 120초로 증가)
-                    timeout_seconds = max(120, len(text) // 10)  # 텍스트 10자당 1초, 최소 120초
-
-                    # Popen 사용 (중단 가능하도록)
-                    current_tts_process = subprocess.Popen(
-                        player_cmd,
-                        stderr=subprocess.PIPE,
-                        stdout=subprocess.PIPE,
-                        env=env
-                    )
-
-                    # 재생 완료까지 대기
-                    try:
-                        current_tts_process.wait(timeout=timeout_seconds)
-                        played = True
-                        print(f"[TTS] ✅ 재생 완료 ({player_cmd[0]}): {text[:50]}...")
-                    except subprocess.TimeoutExpired:
-                        print(f"[TTS] ❌ {player_cmd[0]} 타임아웃")
-                        current_tts_process.kill()
-                        current_tts_process = None
-                        continue
-
-                    current_tts_process = None
-                    break
-                except FileNotFoundError as e:
-                    print(f"[TTS] ❌ {player_cmd[0]} 찾을 수 없음")
+                    item = self._audio.get(timeout=0.1)
+                except queue.Empty:
                     continue
-                except subprocess.CalledProcessError as e:
-                    print(f"[TTS] ❌ {player_cmd[0]} 실행 오류: returncode={e.returncode}")
-                    if e.stderr:
-                        print(f"[TTS] stderr: {e.stderr.decode()}")
-                    continue
-                except subprocess.TimeoutExpired as e:
-                    print(f"[TTS] ❌ {player_cmd[0]} 타임아웃")
+                if item is None:
+                    break
+
+                kind, audio, sentence = item
+                if kind == "mp3" and self._write_mp3(audio):
+                    self.played += 1
                     continue
 
-            # 정리
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+                # 플레이어가 없거나 합성 실패 → 앞선 오디오를 끝까지 재생한 뒤 espeak
+                self._finish_player()
+                if self._speak_espeak(sentence):
+                    self.played += 1
+        finally:
+            self._finish_player()
+            _active_streams.discard(self)
+            if self.played and not self._cancelled.is_set():
+                print(f"[TTS] ✅ 재생 완료 ({self.played}문장)")
 
-            if played:
-                return
-            else:
-                print(f"[TTS] ❌ 오디오 플레이어를 찾을 수 없음 (ffplay, mpg123, cvlc). espeak 시도...")
+    def _start_player(self):
+        """MP3를 stdin으로 받는 플레이어 프로세스 시작"""
+        global _working_player
 
-        except ImportError:
-            print(f"[TTS] ❌ gTTS가 설치되지 않음. espeak 시도...")
-        except Exception as e:
-            print(f"[TTS] ❌ gTTS 실행 중 오류: {e}, espeak 시도...")
+        candidates = [_working_player] if _working_player else PLAYERS
+        for player_cmd in candidates:
+            try:
+                process = subprocess.Popen(
+                    _player_command(player_cmd, self.speed, self.pitch),
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    env=_player_env()
+                )
+            except FileNotFoundError:
+                print(f"[TTS] ❌ {player_cmd[0]} 찾을 수 없음")
+                continue
 
-        # 방법 2: espeak 사용 (오프라인, 폴백)
-        try:
-            import subprocess
+            print(f"[TTS] 재생 시작: {player_cmd[0]}")
+            _working_player = player_cmd
+            return process
 
-            # espeak 명령어로 직접 재생
-            voice = 'ko' if lang == 'ko' else 'en'
-            print(f"[TTS] espeak으로 재생 시도...")
-            subprocess.run(['espeak', '-v', voice, '-s', '150', text], check=True)
+        print(f"[TTS] ❌ 오디오 플레이어를 찾을 수 없음 (ffplay, mpg123, cvlc). espeak 시도...")
+        return None
+
+    def _write_mp3(self, audio: bytes) -> bool:
+        with self._process_lock:
+            if self._cancelled.is_set():
+                return False
+            if self._process is None:
+                self._process = self._start_player()
+            process = self._process
+
+        if process is None:
+            return False
 
-            print(f"[TTS] ✅ TTS 재생 완료 (espeak): {text[:50]}...")
+        try:
+            process.stdin.write(audio)
+            process.stdin.flush()
+            return True
+        except (BrokenPipeError, OSError) as e:
+            if not self._cancelled.is_set():
+                print(f"[TTS] ❌ 플레이어 파이프 오류: {e}")
+            with self._process_lock:
+                self._process = None
+            return False
+
+    def _finish_player(self) -> None:
+        """stdin을 닫고 남은 오디오 재생이 끝날 때까지 대기"""
+        with self._process_lock:
+            process = self._process
+        if process is None:
             return
 
-        except (FileNotFoundError, subprocess.CalledProcessError) as e:
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+
+        # 대기 중에도 cancel()이 self._process를 kill 할 수 있도록 대기 후에 비움
+        _wait_process(process, "플레이어")
+
+        with self._process_lock:
+            if self._process is process:
+                self._process = None
+
+    def _speak_espeak(self, sentence: str) -> bool:
+        """espeak으로 재생 (오프라인, 폴백)"""
+        voice = 'ko' if self.lang == 'ko' else 'en'
+        try:
+            print(f"[TTS] espeak으로 재생 시도...")
+            with self._process_lock:
+                if self._cancelled.is_set():
+                    return False
+                # -s: 분당 단어 수 (기본 150), -p: 음높이 0~99 (기본 50)
+                self._process = subprocess.Popen([
+                    'espeak', '-v', voice,
+                    '-s', str(round(150 * self.speed)),
+                    '-p', str(min(99, max(0, round(50 * self.pitch)))),
+                    sentence,
+                ])
+                process = self._process
+            _wait_process(process, "espeak")
+            with self._process_lock:
+                self._process = None
+            return process.returncode == 0
+        except FileNotFoundError as e:
             print(f"[TTS] ❌ espeak 실행 실패: {e}")
+            return False
+
+
+def _kill_on_timeout(process, label):
+    if process.poll() is None:
+        print(f"[TTS] ❌ {label} 타임아웃")
+        process.kill()
 
-        # 모든 방법 실패
-        raise Exception("TTS 재생 실패: gTTS는 설치되었지만 오디오 플레이어(mpg123, ffplay, cvlc)가 없습니다. 'sudo apt-get install mpg123' 실행하세요.")
 
-    except Exception as e:
-        print(f"[TTS] ❌ TTS 재생 오류: {str(e)}")
-        raise
+def _wait_process(process, label, timeout=TTS_PLAYBACK_TIMEOUT):
+    """프로세스 종료 대기 (timeout초가 지나면 공용 타이머 휠이 kill, 대기 스레드를 따로 만들지 않음)"""
+    watchdog = call_later(timeout, _kill_on_timeout, process, label, name="tts-watchdog", inline=True)
+    try:
+        return process.wait()
+    finally:
+        watchdog.cancel()
+
+
+def play_tts(text: str, lang: str = 'ko') -> None:
+    """
+    텍스트를 음성으로 변환하여 라즈베리파이 스피커로 재생 (재생이 끝날 때까지 대기)
+
+    Args:
+        text: 변환할 텍스트
+        lang: 언어 코드 (기본값: 'ko')
+
+    Raises:
+        Exception: TTS 재생 실패 시
+    """
+    stream = TtsStream(lang)
+    for sentence in split_sentences(text):
+        stream.feed(sentence)
+    stream.close()
+    stream.wait()
+
+    if stream.played == 0 and not stream.cancelled and text.strip():
+        # 모든 방법 실패
+        message = "TTS 재생 실패: 오디오 플레이어(mpg123, ffplay, cvlc)와 espeak을 사용할 수 없습니다. 'sudo apt-get install mpg123' 실행하세요."
+        print(f"[TTS] ❌ TTS 재생 오류: {message}")
+        raise Exception(message)
@@ -1,9 +1,15 @@
 import os
-import json
+import time
+import random
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from dotenv import load_dotenv
 
 from app.services.settings_service import load_settings
+from app.services.city_service import city_catalogue
 from app.services.device_service import read_sensor_data   # CO₂ + 실내 센서 데이터
 
 load_dotenv()
@@ -11,23 +17,43 @@ load_dotenv()
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 BASE_URL = "https://api.openweathermap.org/data/2.5/weather"
 
-
-# ------------------------------------------------------------
-# 1) cities.json 로드
-# ------------------------------------------------------------
-def load_city_map():
-    CITIES_FILE = os.path.join(os.path.dirname(__file__), "../data/cities.json")
-    try:
-        with open(CITIES_FILE, "r", encoding="utf-8") as f:
-            cities = json.load(f)
-        return {str(c["id"]): c for c in cities}
-    except Exception as e:
-        print("❌ ERROR loading cities.json:", e)
-        return {}
+# OpenWeather 캐시 설정
+# - TTL 이내: 메모리 값 그대로 사용 (fresh)
+# - TTL ~ STALE_TTL: 오래된 값을 즉시 반환하고 백그라운드에서 1회만 갱신 (stale-while-revalidate)
+# - STALE_TTL 초과: 동기적으로 다시 요청
+WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", 600))            # 10분
+WEATHER_CACHE_STALE_TTL = int(os.getenv("WEATHER_CACHE_STALE_TTL", 3600))  # 1시간
+
+# OpenWeather HTTP 설정
+OPENWEATHER_CONNECT_TIMEOUT = float(os.getenv("OPENWEATHER_CONNECT_TIMEOUT", 3))
+OPENWEATHER_READ_TIMEOUT = float(os.getenv("OPENWEATHER_READ_TIMEOUT", 5))
+OPENWEATHER_RETRIES = int(os.getenv("OPENWEATHER_RETRIES", 2))
+OPENWEATHER_POOL_SIZE = int(os.getenv("OPENWEATHER_POOL_SIZE", 4))
+# 연속 실패가 이 횟수에 도달하면 일정 시간 요청을 보내지 않고 바로 실패 처리 (circuit breaker)
+OPENWEATHER_BREAKER_THRESHOLD = int(os.getenv("OPENWEATHER_BREAKER_THRESHOLD", 3))
+OPENWEATHER_BREAKER_RESET = float(os.getenv("OPENWEATHER_BREAKER_RESET", 60))
+
+# 날씨/센서 동시 조회 시 소스별 최대 대기 시간 (초)
+# 넘으면 해당 소스만 대체값을 쓰고 나머지 결과로 응답 (늦게 끝난 날씨 요청은 캐시를 채움)
+WEATHER_FETCH_DEADLINE = float(os.getenv("WEATHER_FETCH_DEADLINE", 6))
+SENSOR_READ_DEADLINE = float(os.getenv("SENSOR_READ_DEADLINE", 1.5))
+# 요청 1건의 재시도 시간 예산 (초): 첫 시도부터 이 시간 안에 다시 연결할 수 없으면 재시도하지 않음
+# 기본값은 WEATHER_FETCH_DEADLINE (재시도가 동시 조회 대기 시간을 넘겨 워커를 붙잡지 않도록)
+OPENWEATHER_RETRY_BUDGET = float(os.getenv("OPENWEATHER_RETRY_BUDGET", WEATHER_FETCH_DEADLINE))
+
+# OpenWeather 실패 + 마지막 정상값도 없을 때 사용하는 더미 데이터
+FALLBACK_WEATHER = {
+    "temperature": 20,
+    "humidity": 50,
+    "pressure": 1018,
+    "weather": "맑음",
+    "description": "맑은 하늘",
+    "location": "기본 위치"
+}
 
 
 # ------------------------------------------------------------
-# 2) 영어 → 한국어 변환
+# 1) 영어 → 한국어 변환
 # ------------------------------------------------------------
 WEATHER_KO = {
     "Clear": "맑음",
@@ -52,11 +78,127 @@ def translate_description(desc_en: str):
 
 
 # ------------------------------------------------------------
-# 3) OpenWeather API (기온/습도/압력/날씨/설명/지역)
+# 2) OpenWeather HTTP 세션 (keep-alive + 재시도 + circuit breaker)
 # ------------------------------------------------------------
-def fetch_openweather(city_id: str, unit: str):
-    CITY_MAP = load_city_map()
+# 현재 스레드에서 진행 중인 OpenWeather 요청의 시작 시각 (재시도 시간 예산 계산용)
+_request_clock = threading.local()
+
+
+class _JitteredRetry(Retry):
+    """
+    재시도 대기 시간을 0 ~ 지수 백오프 값 사이에서 무작위로 선택 (full jitter)
+    횟수가 남아 있어도 (경과 시간 + 최대 대기 시간 + 연결 시간 제한)이 OPENWEATHER_RETRY_BUDGET을 넘으면 재시도하지 않음
+    """
+
+    def get_backoff_time(self):
+        return random.uniform(0, super().get_backoff_time())
+
+    def is_exhausted(self):
+        if super().is_exhausted():
+            return True
+        started = getattr(_request_clock, "started", None)
+        if started is None:
+            return False
+        worst_case = time.monotonic() - started + super().get_backoff_time() + OPENWEATHER_CONNECT_TIMEOUT
+        return worst_case > OPENWEATHER_RETRY_BUDGET
+
+
+def _create_session():
+    """연결을 재사용하는 세션 (매 요청마다 DNS 조회 + TCP/TLS 핸드셰이크를 하지 않음)"""
+    retry = _JitteredRetry(
+        total=OPENWEATHER_RETRIES,
+        connect=OPENWEATHER_RETRIES,
+        read=OPENWEATHER_RETRIES,
+        status=OPENWEATHER_RETRIES,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        backoff_factor=0.5,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=OPENWEATHER_POOL_SIZE,
+        max_retries=retry,
+        pool_block=False,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
+
+_session = _create_session()
+
+
+class CircuitBreaker:
+    """
+    연속 실패가 threshold에 도달하면 reset_timeout 동안 요청을 막고 (open),
+    그 뒤 요청 1개만 시험 삼아 통과시켜 (half_open) 성공하면 다시 정상 (closed)
+    """
+
+    def __init__(self, threshold=OPENWEATHER_BREAKER_THRESHOLD, reset_timeout=OPENWEATHER_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+        self.stats = {"rejected": 0, "opened": 0}
+
+    def allow(self):
+        with self._lock:
+            if self._state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self.stats["rejected"] += 1
+                    return False
+                self._state = "half_open"
+                self._trial_running = False
+
+            if self._state == "half_open":
+                if self._trial_running:
+                    self.stats["rejected"] += 1
+                    return False
+                self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == "half_open" or self._failures >= self.threshold:
+                if self._state != "open":
+                    self.stats["opened"] += 1
+                    print(f"⚠ OpenWeather 연속 실패 {self._failures}회 → {self.reset_timeout:.0f}초 동안 요청 차단")
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["state"] = self._state
+            stats["consecutive_failures"] = self._failures
+            if self._state == "open":
+                stats["retry_in_seconds"] = round(
+                    max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1
+                )
+        return stats
+
+
+_breaker = CircuitBreaker()
+
+
+# ------------------------------------------------------------
+# 3) OpenWeather API (기온/습도/압력/날씨/설명/지역)
+# ------------------------------------------------------------
+def _fetch_openweather_uncached(city_id: str, unit: str):
+    """OpenWeather API를 직접 호출 (캐시 없이)"""
     params = {
         "id": city_id,
         "appid": OPENWEATHER_API_KEY,
@@ -64,68 +206,309 @@ def fetch_openweather(city_id: str, unit: str):
         "lang": "en",
     }
 
+    if not _breaker.allow():
+        return {"error": True, "detail": "OpenWeather 요청 실패: 연속 실패로 일시 차단됨"}
+
+    _request_clock.started = time.monotonic()
+    try:
+        res = _session.get(
+            BASE_URL,
+            params=params,
+            timeout=(OPENWEATHER_CONNECT_TIMEOUT, OPENWEATHER_READ_TIMEOUT),
+        )
+    except Exception as e:
+        _breaker.record_failure()
+        return {"error": True, "detail": f"OpenWeather 요청 실패: {e}"}
+    finally:
+        _request_clock.started = None
+
+    if res.status_code >= 500:
+        _breaker.record_failure()
+    else:
+        # 4xx(잘못된 API 키/도시 ID)는 서버 장애가 아니므로 차단하지 않음
+        _breaker.record_success()
+
     try:
-        res = requests.get(BASE_URL, params=params, timeout=5)
         res.raise_for_status()
     except Exception as e:
         return {"error": True, "detail": f"OpenWeather 요청 실패: {e}"}
 
-    raw = res.json()
+    try:
+        raw = res.json()
 
-    main_weather_en = raw["weather"][0]["main"]
-    desc_en = raw["weather"][0]["description"]
+        main_weather_en = raw["weather"][0]["main"]
+        desc_en = raw["weather"][0]["description"]
 
-    city_obj = CITY_MAP.get(str(city_id))
-    city_name_ko = city_obj["name_ko"] if city_obj else raw["name"]
+        city_obj = city_catalogue.get(city_id)
+        city_name_ko = city_obj["name_ko"] if city_obj else raw["name"]
 
-    return {
-        "temperature": raw["main"]["temp"],
-        "humidity": raw["main"]["humidity"],
-        "pressure": raw["main"]["pressure"],
-        "weather": WEATHER_KO.get(main_weather_en, main_weather_en),
-        "description": translate_description(desc_en),
-        "location": city_name_ko,
-    }
+        return {
+            "temperature": raw["main"]["temp"],
+            "humidity": raw["main"]["humidity"],
+            "pressure": raw["main"]["pressure"],
+            "weather": WEATHER_KO.get(main_weather_en, main_weather_en),
+            "description": translate_description(desc_en),
+            "location": city_name_ko,
+        }
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        # JSON이 아니거나 필드가 빠진 응답
+        return {"error": True, "detail": f"OpenWeather 응답 형식 오류: {e!r}"}
 
 
 # ------------------------------------------------------------
-# 4) React 대시보드 전용: 날씨(API) + 센서 CO₂
+# 3-1) OpenWeather 캐시 (city_id, unit 별)
 # ------------------------------------------------------------
-def get_current_weather(city_id: str, unit: str):
-    """대시보드용 날씨 데이터"""
+# key: (city_id, unit) → {"data": dict, "fetched_at": monotonic, "refreshing": bool}
+_weather_cache = {}
+_weather_cache_lock = threading.Lock()
+_weather_cache_stats = {
+    "hits": 0,          # TTL 이내 캐시 응답
+    "stale_hits": 0,    # 오래된 값 응답 + 백그라운드 갱신
+    "misses": 0,        # 캐시 없음 → 동기 요청
+    "refreshes": 0,     # 백그라운드 갱신 성공
+    "errors": 0,        # OpenWeather 요청 실패
+    "fallbacks": 0,     # 실패 시 마지막 정상값 사용
+}
 
-    weather = fetch_openweather(city_id, unit)
 
-    if "error" in weather:
-        return weather
+def _store_weather(key, data):
+    """정상 응답을 캐시에 저장"""
+    with _weather_cache_lock:
+        _weather_cache[key] = {
+            "data": data,
+            "fetched_at": time.monotonic(),
+            "refreshing": False,
+        }
+
+
+def _refresh_weather_in_background(key):
+    """stale 항목을 백그라운드에서 갱신 (항목당 동시에 1개만 실행)"""
+    city_id, unit = key
+    try:
+        data = _fetch_openweather_uncached(city_id, unit)
+    except Exception as e:
+        data = {"error": True, "detail": f"OpenWeather 갱신 중 오류: {e}"}
 
-    # CO₂만 센서에서 가져오기
     try:
-        sensor = read_sensor_data()
-        co2 = sensor.get("co2")
+        if "error" in data:
+            print(f"⚠ OpenWeather 백그라운드 갱신 실패 → 기존 값 유지: {data['detail']}")
+            with _weather_cache_lock:
+                _weather_cache_stats["errors"] += 1
+            return
+
+        _store_weather(key, data)
+        with _weather_cache_lock:
+            _weather_cache_stats["refreshes"] += 1
+    finally:
+        # 성공/실패와 관계없이 다음 stale 요청이 다시 갱신할 수 있도록
+        with _weather_cache_lock:
+            entry = _weather_cache.get(key)
+            if entry is not None:
+                entry["refreshing"] = False
 
-        if co2 is None:
-            raise Exception("센서 CO₂ None")
 
-        print("🌡 CO₂ 센서값 사용:", co2)
-        weather["co2"] = co2
+def fetch_openweather(city_id: str, unit: str):
+    """
+    캐시를 거쳐 OpenWeather 데이터를 반환
+    - 요청 실패 시 마지막 정상값으로 대체, 정상값이 없으면 error dict 반환
+    """
+    key = (str(city_id), unit)
+    now = time.monotonic()
+
+    with _weather_cache_lock:
+        entry = _weather_cache.get(key)
+        age = now - entry["fetched_at"] if entry else None
+
+        if entry and age < WEATHER_CACHE_TTL:
+            _weather_cache_stats["hits"] += 1
+            return dict(entry["data"])
+
+        if entry and age < WEATHER_CACHE_STALE_TTL:
+            _weather_cache_stats["stale_hits"] += 1
+            if not entry["refreshing"]:
+                entry["refreshing"] = True
+                threading.Thread(
+                    target=_refresh_weather_in_background, args=(key,), daemon=True
+                ).start()
+            return dict(entry["data"])
+
+        _weather_cache_stats["misses"] += 1
+
+    data = _fetch_openweather_uncached(city_id, unit)
+
+    if "error" in data:
+        with _weather_cache_lock:
+            _weather_cache_stats["errors"] += 1
+            entry = _weather_cache.get(key)
+            if entry is not None:
+                # STALE_TTL이 지났더라도 더미 데이터보다는 마지막 정상값이 낫다
+                _weather_cache_stats["fallbacks"] += 1
+                print("⚠ OpenWeather 실패 → 마지막 정상값 사용")
+                return dict(entry["data"])
+        return data
+
+    _store_weather(key, data)
+    return dict(data)
+
+
+def get_weather_cache_stats():
+    """캐시 적중률 및 항목별 나이(초) 반환"""
+    now = time.monotonic()
+    with _weather_cache_lock:
+        stats = dict(_weather_cache_stats)
+        entries = [
+            {
+                "city_id": city_id,
+                "unit": unit,
+                "age_seconds": round(now - entry["fetched_at"], 1),
+                "refreshing": entry["refreshing"],
+            }
+            for (city_id, unit), entry in _weather_cache.items()
+        ]
+
+    lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+    stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 3) if lookups else None
+    stats["ttl_seconds"] = WEATHER_CACHE_TTL
+    stats["stale_ttl_seconds"] = WEATHER_CACHE_STALE_TTL
+    stats["entries"] = entries
+    stats["circuit"] = _breaker.get_stats()
+    return stats
+
+
+def _peek_cached_weather(city_id: str, unit: str):
+    """요청 없이 마지막 정상값만 확인 (없으면 None)"""
+    with _weather_cache_lock:
+        entry = _weather_cache.get((str(city_id), unit))
+        return dict(entry["data"]) if entry else None
+
+
+def on_settings_changed(new, old, changed):
+    """위치/단위가 바뀌면 새 설정의 날씨를 백그라운드에서 미리 받아둠 (다음 대시보드 요청이 캐시 적중)"""
+    if not {"location", "temperatureUnit"} & changed:
+        return
+    city_id = new.get("location")
+    unit = new.get("temperatureUnit", "celsius")
+    print(f"[WEATHER] 설정 변경 → 날씨 미리 가져오기 ({city_id}, {unit})")
+    _fanout_pool.submit(fetch_openweather, city_id, unit)
+
+
+def clear_weather_cache():
+    """캐시 비우기 (통계는 유지)"""
+    with _weather_cache_lock:
+        _weather_cache.clear()
 
-    except Exception as e:
-        print("⚠ CO₂ 센서 실패 → mock 사용:", e)
-        import random
-        weather["co2"] = random.randint(400, 1200)
 
+# ------------------------------------------------------------
+# 4) 날씨(API) + 센서 동시 조회
+# ------------------------------------------------------------
+# 날씨 요청과 센서 읽기는 서로 독립적이므로 동시에 실행 (응답 시간 = 합이 아니라 최댓값)
+# 느린 OpenWeather 요청이 스레드를 모두 차지해도 센서 읽기가 밀리지 않도록 실행기를 분리
+_fanout_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="weather-fanout")
+_local_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sensor-fanout")
+
+
+def _timed_call(func, *args):
+    started = time.perf_counter()
+    value = func(*args)
+    return value, round((time.perf_counter() - started) * 1000, 1)
+
+
+def _gather_sources(sources):
+    """
+    sources: {이름: (함수, 인자 튜플, 최대 대기 시간, 실행기)}
+    모두 동시에 실행하고 소스별 최대 대기 시간까지만 기다림
+
+    Returns:
+        (results, meta): results[이름]은 실패/시간 초과 시 None,
+                         meta[이름] = {"status": "ok" | "timeout" | "error", "ms": 소요 시간}
+    """
+    started = time.perf_counter()
+    futures = {
+        name: (pool.submit(_timed_call, func, *args), deadline)
+        for name, (func, args, deadline, pool) in sources.items()
+    }
+
+    results, meta = {}, {}
+    for name, (future, deadline) in futures.items():
+        remaining = deadline - (time.perf_counter() - started)
+        try:
+            results[name], ms = future.result(timeout=max(0.0, remaining))
+            meta[name] = {"status": "ok", "ms": ms}
+        except FutureTimeout:
+            results[name] = None
+            meta[name] = {"status": "timeout", "ms": round(deadline * 1000, 1)}
+        except Exception as e:
+            results[name] = None
+            meta[name] = {
+                "status": "error",
+                "ms": round((time.perf_counter() - started) * 1000, 1),
+                "error": str(e),
+            }
+
+    meta["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return results, meta
+
+
+def _fetch_weather_and_sensor(city_id: str, unit: str):
+    """날씨와 센서를 동시에 조회 → (weather dict 또는 None, sensor dict 또는 None, meta)"""
+    results, meta = _gather_sources({
+        "weather": (fetch_openweather, (city_id, unit), WEATHER_FETCH_DEADLINE, _fanout_pool),
+        "sensor": (read_sensor_data, (), SENSOR_READ_DEADLINE, _local_pool),
+    })
+
+    weather = results["weather"]
+    if weather is None:
+        # 시간 초과: 요청은 백그라운드에서 계속 진행되고, 지금은 마지막 정상값 사용
+        weather = _peek_cached_weather(city_id, unit)
+        if weather is not None:
+            meta["weather"]["status"] = "stale"
+    elif "error" in weather:
+        meta["weather"]["status"] = "error"
+        meta["weather"]["error"] = weather["detail"]
+
+    return weather, results["sensor"], meta
+
+
+def _sensor_co2(sensor):
+    """센서 CO₂ 값, 실패 시 mock"""
+    co2 = sensor.get("co2") if sensor else None
+    if co2 is None:
+        print("⚠ 센서 CO₂ 실패 → mock 사용")
+        return random.randint(400, 1200)
+    print("🌡 센서 CO₂ 사용:", co2)
+    return co2
+
+
+# ------------------------------------------------------------
+# 5) React 대시보드 전용: 날씨(API) + 센서 CO₂
+# ------------------------------------------------------------
+def get_current_weather(city_id: str, unit: str):
+    """대시보드용 날씨 데이터"""
+
+    weather, sensor, meta = _fetch_weather_and_sensor(city_id, unit)
+
+    # 실패해도 소스별 상태/소요 시간은 함께 반환
+    if weather is None:
+        return {"error": True, "detail": "OpenWeather 응답 시간 초과", "temperatureUnit": unit, "meta": meta}
+    if "error" in weather:
+        return dict(weather, temperatureUnit=unit, meta=meta)
+
+    # CO₂만 센서에서 가져오기
+    weather["co2"] = _sensor_co2(sensor)
+    weather["temperatureUnit"] = unit
+    weather["meta"] = meta
     return weather
 
 
 # ------------------------------------------------------------
-# 5) get_weather_data() → React dashboard에서 사용
+# 6) get_weather_data() → React dashboard에서 사용
 # ------------------------------------------------------------
 def get_weather_data():
     """
     대시보드용 최종 데이터 생성 함수
     - 날씨 정보 → 무조건 OpenWeather API
     - CO₂ → 센서 우선, 실패 시 mock
+    - 두 소스는 동시에 조회하고, 소스별 상태/소요 시간은 "meta"에 기록
     """
 
     # 1) settings 불러오기
@@ -133,36 +516,18 @@ def get_weather_data():
     city_id = settings.get("location", "1835848")  # default: Seoul
     unit = settings.get("temperatureUnit", "celsius")
 
-    # 2) OpenWeather 데이터 가져오기
-    weather = fetch_openweather(city_id, unit)
+    # 2) OpenWeather + 센서 동시 조회
+    weather, sensor, meta = _fetch_weather_and_sensor(city_id, unit)
 
-    # OpenWeather 실패 시 fallback
-    if "error" in weather:
-        print("⚠ OpenWeather 실패 → fallback 더미 데이터 사용")
-
-        weather = {
-            "temperature": 20,
-            "humidity": 50,
-            "pressure": 1018,
-            "weather": "맑음",
-            "description": "맑은 하늘",
-            "location": "기본 위치"
-        }
+    # OpenWeather 실패 + 마지막 정상값도 없을 때만 더미 데이터 사용
+    if weather is None or "error" in weather:
+        print("⚠ OpenWeather 실패 (캐시 없음) → fallback 더미 데이터 사용")
+        weather = dict(FALLBACK_WEATHER)
+        meta["weather"]["status"] = "fallback"
 
     # 3) CO₂만 센서에서 가져오기
-    try:
-        sensor = read_sensor_data()
-        co2 = sensor.get("co2")
-
-        if co2 is None:
-            raise Exception("CO₂ None")
-
-        print("🌡 센서 CO₂ 사용:", co2)
-        weather["co2"] = co2
-
-    except Exception as e:
-        print("⚠ 센서 CO₂ 실패 → mock 사용:", e)
-        import random
-        weather["co2"] = random.randint(400, 1200)
+    weather["co2"] = _sensor_co2(sensor)
+    weather["temperatureUnit"] = unit
+    weather["meta"] = meta
 
     return weather
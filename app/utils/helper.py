@@ -1,2 +1,7 @@
 def ok(data=None):
     return {'status': 'ok', 'data': data}
+
+def sse_event(event, data):
+    """Server-Sent Events 메시지 한 개를 문자열로 변환"""
+    import json
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
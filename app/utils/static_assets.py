@@ -0,0 +1,145 @@
+"""
+빌드된 React 앱(static/dist) 정적 파일 서빙
+
+서버 시작 시 dist 디렉터리를 한 번 훑어 파일 목록/ETag/압축본을 준비하고,
+요청마다 os.path.exists를 호출하지 않고 메모리 인덱스로 찾음
+
+- 압축본: 빌드 결과에 .br/.gz가 있으면 사용, 없으면 시작 시 .gz 생성 (brotli 모듈이 있으면 .br도)
+- 해시가 붙은 파일(assets/index-a1b2c3d4.js): 1년 + immutable 캐시
+- index.html 등 해시 없는 파일: ETag + no-cache (바뀌었을 때만 다시 받음)
+"""
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+
+from flask import request, send_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 이 크기 미만은 압축 이득이 작아 원본 그대로 전송
+STATIC_COMPRESS_MIN_BYTES = int(os.getenv("STATIC_COMPRESS_MIN_BYTES", 1024))
+COMPRESSIBLE_EXTENSIONS = (".html", ".js", ".mjs", ".css", ".json", ".svg", ".txt", ".map", ".xml", ".ico", ".wasm")
+
+# Vite 빌드 결과의 해시 파일명 (예: assets/index-BdE3x9Qa.js)
+_HASHED_NAME = re.compile(r"[-.][A-Za-z0-9_-]{8,}\.[a-z0-9]+$")
+
+CACHE_IMMUTABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDATE = "no-cache"
+
+# Accept-Encoding 우선순위 (앞쪽 우선)
+_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+class StaticAsset:
+    def __init__(self, rel_path, path, immutable):
+        self.rel_path = rel_path
+        self.path = path
+        self.immutable = immutable
+        self.mimetype = mimetypes.guess_type(rel_path)[0] or "application/octet-stream"
+        with open(path, "rb") as f:
+            data = f.read()
+        self.size = len(data)
+        self.etag = hashlib.sha1(data).hexdigest()[:16]
+        self.variants = {}          # "br" / "gzip" → 압축본 경로
+        self._data = data           # 압축본 생성 후 해제
+
+    def prepare_variants(self):
+        """미리 빌드된 압축본을 찾고, 없으면 생성"""
+        compressible = (
+            self.rel_path.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+            and self.size >= STATIC_COMPRESS_MIN_BYTES
+        )
+        for encoding, suffix in _ENCODINGS:
+            variant = self.path + suffix
+            if os.path.exists(variant) and os.path.getmtime(variant) >= os.path.getmtime(self.path):
+                self.variants[encoding] = variant
+                continue
+            if not compressible:
+                continue
+            if encoding == "br" and brotli is None:
+                continue
+            try:
+                if encoding == "br":
+                    compressed = brotli.compress(self._data, quality=11)
+                else:
+                    compressed = gzip.compress(self._data, compresslevel=9, mtime=0)
+                # 압축해도 작아지지 않으면 원본 사용
+                if len(compressed) >= self.size:
+                    continue
+                tmp_path = f"{variant}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(compressed)
+                os.replace(tmp_path, variant)
+                self.variants[encoding] = variant
+            except OSError as e:
+                print(f"[STATIC] 압축본 생성 실패 ({self.rel_path}): {e}")
+        self._data = None
+
+
+class StaticAssetIndex:
+    def __init__(self, root):
+        self.root = root
+        self.assets = {}
+
+    def build(self):
+        """dist 디렉터리를 훑어 인덱스 생성 (서버 시작 시 1회)"""
+        assets = {}
+        if os.path.isdir(self.root):
+            for dirpath, _, filenames in os.walk(self.root):
+                for name in filenames:
+                    if name.endswith((".gz", ".br", ".tmp")):
+                        continue
+                    path = os.path.join(dirpath, name)
+                    rel_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+                    immutable = rel_path.startswith("assets/") and bool(_HASHED_NAME.search(name))
+                    try:
+                        asset = StaticAsset(rel_path, path, immutable)
+                        asset.prepare_variants()
+                    except OSError as e:
+                        print(f"[STATIC] 파일 인덱싱 실패 ({rel_path}): {e}")
+                        continue
+                    assets[rel_path] = asset
+        self.assets = assets
+        if assets:
+            compressed = sum(1 for a in assets.values() if a.variants)
+            print(f"[STATIC] 정적 파일 {len(assets)}개 인덱싱 (압축본 {compressed}개)")
+        return self
+
+    def get(self, rel_path):
+        return self.assets.get(rel_path)
+
+    @property
+    def has_index_html(self):
+        return "index.html" in self.assets
+
+    def serve(self, rel_path):
+        """인덱스에 있는 파일 응답 (Accept-Encoding에 맞는 압축본 + 캐시 헤더)"""
+        asset = self.assets[rel_path]
+
+        path, encoding = asset.path, None
+        if asset.variants:
+            accepted = request.accept_encodings
+            for name, _ in _ENCODINGS:
+                if name in asset.variants and accepted[name] > 0:
+                    path, encoding = asset.variants[name], name
+                    break
+
+        response = send_file(
+            path,
+            mimetype=asset.mimetype,
+            download_name=os.path.basename(asset.rel_path),
+            etag=f"{asset.etag}-{encoding}" if encoding else asset.etag,
+            conditional=True,
+            max_age=None,
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if asset.variants:
+            response.vary.add("Accept-Encoding")
+        response.headers["Cache-Control"] = CACHE_IMMUTABLE if asset.immutable else CACHE_REVALIDATE
+        return response
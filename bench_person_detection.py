@@ -0,0 +1,112 @@
+"""
+사람 감지 파이프라인 벤치마크
+
+샘플 이미지(또는 폴더)를 기존 방식(원본 해상도, HOG winStride 4)과
+튜닝된 파이프라인(축소/ROI/모션 게이트/Haar → HOG)으로 각각 감지하고
+단계별 평균 소요 시간을 출력
+
+사용법:
+    python bench_person_detection.py samples/ [--repeat 5]
+    python bench_person_detection.py a.jpg b.jpg
+"""
+import os
+import sys
+import time
+import argparse
+
+try:
+    import cv2
+except ImportError:
+    print("[ERROR] OpenCV가 설치되지 않았습니다. (pip install opencv-python)")
+    sys.exit(1)
+
+from app.services.person_detection_service import DetectionConfig, PersonDetector
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def collect_images(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    files.append(os.path.join(path, name))
+        else:
+            files.append(path)
+
+    images = []
+    for path in files:
+        frame = cv2.imread(path)
+        if frame is None:
+            print(f"[WARNING] 이미지를 읽을 수 없습니다: {path}")
+            continue
+        images.append((path, frame))
+    return images
+
+
+def run(label, detector, images, repeat):
+    stage_totals = {}
+    decided = {}
+    detected_count = 0
+    total_ms = 0.0
+    runs = 0
+
+    # 첫 호출의 분류기 로드 시간은 따로 측정
+    load_started = time.perf_counter()
+    detector.detect_with_timings(images[0][1])
+    load_ms = (time.perf_counter() - load_started) * 1000
+    detector.reset()
+
+    for _ in range(repeat):
+        for _, frame in images:
+            started = time.perf_counter()
+            detected, timings, decided_by = detector.detect_with_timings(frame)
+            total_ms += (time.perf_counter() - started) * 1000
+            runs += 1
+
+            detected_count += int(detected)
+            decided[decided_by] = decided.get(decided_by, 0) + 1
+            for stage, ms in timings.items():
+                if stage == "load":
+                    continue
+                count, total = stage_totals.get(stage, (0, 0.0))
+                stage_totals[stage] = (count + 1, total + ms)
+
+    print(f"\n=== {label} ===")
+    print(f"  첫 호출 (분류기 로드 포함): {load_ms:8.1f} ms")
+    print(f"  프레임당 평균           : {total_ms / runs:8.1f} ms  ({runs}회)")
+    for stage in ("prepare", "motion", "haar", "hog"):
+        if stage in stage_totals:
+            count, total = stage_totals[stage]
+            print(f"    {stage:8} 평균 {total / count:8.1f} ms  (실행 {count}회)")
+    print(f"  감지됨: {detected_count}/{runs}  |  결정 단계: {decided}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="사람 감지 파이프라인 단계별 지연 시간 측정")
+    parser.add_argument("paths", nargs="+", help="이미지 파일 또는 폴더")
+    parser.add_argument("--repeat", type=int, default=3, help="이미지별 반복 횟수")
+    args = parser.parse_args()
+
+    images = collect_images(args.paths)
+    if not images:
+        print("[ERROR] 측정할 이미지가 없습니다.")
+        sys.exit(1)
+
+    print(f"--- 사람 감지 벤치마크: 이미지 {len(images)}장 x {args.repeat}회 ---")
+
+    run("기존 방식 (원본 해상도, winStride 4, scale 1.05)",
+        PersonDetector(DetectionConfig.legacy()), images, args.repeat)
+
+    # 서로 다른 샘플 이미지는 모션 게이트를 통과하므로 게이트 효과는 별도로 측정
+    run("튜닝 (축소 + ROI + Haar 조기 종료 → HOG)",
+        PersonDetector(DetectionConfig(motion_gate=False)), images, args.repeat)
+
+    gated = PersonDetector(DetectionConfig(motion_gate=True))
+    run("튜닝 + 모션 게이트 (같은 프레임 반복 = 정지 장면)",
+        gated, [images[0]] * len(images), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Settings, RefreshCw, FlaskConical } from 'lucide-react';
 import { Button } from './components/ui/button';
 import WeatherCard from './components/WeatherCard';
@@ -20,8 +20,11 @@ interface WeatherData {
 
 interface RecommendationData {
   text: string;
+  streaming?: boolean; // true: 스트리밍 중 (받은 만큼만 표시)
 }
 
+type AdviceKind = "fashion" | "environment";
+
 interface UserSettings {
   location: string;
   temperatureUnit: string;
@@ -99,21 +102,54 @@ export default function App() {
     }
   };
 
+  // ---------------------------
+  // GPT 조언 스트리밍 (SSE)
+  // - delta 이벤트가 올 때마다 지금까지 받은 글자를 바로 표시
+  // - 같은 종류의 이전 스트림은 닫음 (날씨가 바뀌어 다시 요청한 경우)
+  // ---------------------------
+  const streamsRef = useRef<Partial<Record<AdviceKind, EventSource>>>({});
+
+  const streamRecommendation = (
+    kind: AdviceKind,
+    onUpdate: (data: RecommendationData) => void,
+  ) =>
+    new Promise<void>((resolve, reject) => {
+      streamsRef.current[kind]?.close();
+
+      const source = new EventSource(`/api/gpt/${kind}/stream`);
+      streamsRef.current[kind] = source;
+      let text = "";
+
+      source.addEventListener("delta", (e) => {
+        text += JSON.parse((e as MessageEvent).data).text;
+        onUpdate({ text, streaming: true });
+      });
+
+      source.addEventListener("done", (e) => {
+        source.close();
+        onUpdate({ text: JSON.parse((e as MessageEvent).data).text, streaming: false });
+        resolve();
+      });
+
+      // 서버가 보낸 error 이벤트 또는 연결 끊김 (자동 재연결하지 않음)
+      source.addEventListener("error", (e) => {
+        source.close();
+        const data = (e as MessageEvent).data;
+        reject(new Error(data ? JSON.parse(data).error : "스트림 연결이 끊어졌습니다."));
+      });
+    });
+
   // ---------------------------
   // 2) 패션 추천
   // ---------------------------
-  const fetchFashionRecommendation = async (weather: WeatherData) => {
+  const fetchFashionRecommendation = async () => {
     setIsFashionLoading(true);
 
     try {
-      const res = await fetch("/api/gpt/fashion", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify(weather),
+      await streamRecommendation("fashion", (data) => {
+        setFashionRecommendation(data);
+        setIsFashionLoading(false);
       });
-
-      const json = await res.json();
-      setFashionRecommendation(json);
     } catch (err) {
       console.error("패션 추천 불러오기 실패:", err);
 
@@ -128,18 +164,14 @@ export default function App() {
   // ---------------------------
   // 3) 환경 조언
   // ---------------------------
-  const fetchEnvironmentRecommendation = async (weather: WeatherData) => {
+  const fetchEnvironmentRecommendation = async () => {
     setIsEnvironmentLoading(true);
 
     try {
-      const res = await fetch("/api/gpt/environment", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify(weather),
+      await streamRecommendation("environment", (data) => {
+        setEnvironmentRecommendation(data);
+        setIsEnvironmentLoading(false);
       });
-
-      const json = await res.json();
-      setEnvironmentRecommendation(json);
     } catch (err) {
       console.error("환경 조언 불러오기 실패:", err);
 
@@ -156,6 +188,11 @@ export default function App() {
   // ---------------------------
   useEffect(() => {
     loadSettings();
+
+    // 언마운트 시 열려 있는 스트림 닫기
+    return () => {
+      Object.values(streamsRef.current).forEach((source) => source?.close());
+    };
   }, []);
 
   // ---------------------------
@@ -172,8 +209,8 @@ export default function App() {
   // ---------------------------
   useEffect(() => {
     if (weatherData) {
-      fetchFashionRecommendation(weatherData);
-      fetchEnvironmentRecommendation(weatherData);
+      fetchFashionRecommendation();
+      fetchEnvironmentRecommendation();
     }
   }, [weatherData]);
 
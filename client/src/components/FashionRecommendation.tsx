@@ -6,6 +6,7 @@ import { Skeleton } from './ui/skeleton';
 
 interface FashionRecommendationData {
   text: string;
+  streaming?: boolean;
 }
 
 interface FashionRecommendationProps {
@@ -26,8 +27,18 @@ export default function FashionRecommendation({ recommendation, isLoading }: Fas
   useEffect(() => {
     if (!recommendation) return;
 
-    setDisplayedText('');
-    setCurrentIndex(0);
+    // 스트리밍 중: 받은 글자를 그대로 표시
+    if (recommendation.streaming) {
+      setDisplayedText(recommendation.text);
+      setCurrentIndex(recommendation.text.length);
+      setIsTypingComplete(false);
+      return;
+    }
+
+    // 스트리밍으로 이미 표시한 부분은 다시 타이핑하지 않음
+    const start = recommendation.text.startsWith(displayedText) ? displayedText.length : 0;
+    setDisplayedText(recommendation.text.slice(0, start));
+    setCurrentIndex(start);
     setIsTypingComplete(false);
 
     const typingInterval = setInterval(() => {
@@ -0,0 +1,50 @@
+"""
+프로덕션 서버 설정 (gunicorn, Linux/라즈베리파이)
+
+실행:
+    gunicorn -c gunicorn.conf.py run:app
+    (또는 python run.py --prod)
+
+- 워커/스레드 수는 환경 변수 WEB_WORKERS / WEB_THREADS로 설정
+- 스케줄러/조이스틱/센서 샘플러 등 하드웨어를 쓰는 백그라운드 서비스는
+  파일 잠금으로 선출된 리더 워커 1개에서만 시작
+
+리더가 아닌 워커는 센서 하드웨어를 열지 않고 리더 워커가 게시한 센서 스냅샷 파일
+(SENSOR_SNAPSHOT_FILE)만 읽음
+
+주의: 센서 기록/재실 상태/작업 상태는 프로세스 메모리에 있으므로
+WEB_WORKERS > 1 이면 리더가 아닌 워커에서는 해당 API 결과가 비어 있을 수 있음
+(라즈베리파이에서는 워커 1개 + 스레드 여러 개를 권장)
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5050)}"
+
+# gthread: 워커 프로세스마다 스레드 풀 (SSE 스트리밍 요청이 워커 전체를 막지 않음)
+worker_class = "gthread"
+workers = int(os.getenv("WEB_WORKERS", 1))
+threads = int(os.getenv("WEB_THREADS", 8))
+
+# GPT/TTS 스트리밍 응답은 수십 초 걸릴 수 있음
+timeout = int(os.getenv("WEB_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+
+# 워커마다 앱을 따로 import (백그라운드 스레드를 마스터에서 fork 하지 않음)
+preload_app = False
+
+accesslog = os.getenv("WEB_ACCESS_LOG", None)
+errorlog = "-"
+loglevel = os.getenv("WEB_LOG_LEVEL", "info")
+
+
+def post_worker_init(worker):
+    """워커 준비 완료 후 리더로 선출되면 백그라운드 서비스 시작, 아니면 리더의 센서 스냅샷을 읽도록 전환"""
+    from app import acquire_background_leadership, start_background_services
+    from app.services.device_service import use_shared_snapshot
+
+    if acquire_background_leadership():
+        worker.log.info("백그라운드 서비스 리더 워커 (pid %s)", worker.pid)
+        start_background_services()
+    else:
+        use_shared_snapshot()
@@ -0,0 +1,108 @@
+"""
+간단한 HTTP 부하 테스트 (개발 서버 vs gunicorn 비교용)
+
+사용법:
+    # 1) 개발 서버
+    python run.py
+    python loadtest.py --url http://localhost:5050 --concurrency 16 --requests 2000
+
+    # 2) 프로덕션 서버
+    python run.py --prod        # 또는 gunicorn -c gunicorn.conf.py run:app
+    python loadtest.py --url http://localhost:5050 --concurrency 16 --requests 2000
+
+같은 조건으로 두 번 실행해 처리량(req/s)과 지연 시간 분포를 비교
+OpenAI/TTS를 호출하는 엔드포인트는 비용이 들기 때문에 기본 대상에서 제외
+"""
+import sys
+import time
+import argparse
+import threading
+from collections import defaultdict
+
+try:
+    import requests
+except ImportError:
+    print("[ERROR] requests 라이브러리가 필요합니다. (pip install requests)")
+    sys.exit(1)
+
+DEFAULT_PATHS = [
+    "/api/weather/dashboard",
+    "/api/device/sensor/latest",
+    "/api/settings",
+    "/api/cities/",
+]
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(base_url, paths, total, concurrency, timeout):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        # 스레드마다 세션 1개 (keep-alive 연결 재사용)
+        session = requests.Session()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            path = paths[i % len(paths)]
+            started = time.perf_counter()
+            try:
+                res = session.get(base_url + path, timeout=timeout)
+                ok = res.status_code < 500
+            except requests.RequestException:
+                ok = False
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if ok:
+                    latencies[path].append(elapsed)
+                else:
+                    errors[path] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duration = time.perf_counter() - started
+
+    print(f"\n=== {base_url}  (요청 {total}개, 동시 {concurrency}) ===")
+    print(f"  총 소요 시간: {duration:.2f} s   처리량: {total / duration:.1f} req/s")
+    print(f"  {'경로':32} {'성공':>6} {'실패':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+    all_latencies = []
+    for path in paths:
+        values = sorted(latencies[path])
+        all_latencies.extend(values)
+        print(f"  {path:32} {len(values):6d} {errors[path]:5d} "
+              f"{percentile(values, 50):8.1f} {percentile(values, 95):8.1f} "
+              f"{percentile(values, 99):8.1f} {(values[-1] if values else 0):8.1f}")
+    all_latencies.sort()
+    print(f"  {'전체':32} {len(all_latencies):6d} {sum(errors.values()):5d} "
+          f"{percentile(all_latencies, 50):8.1f} {percentile(all_latencies, 95):8.1f} "
+          f"{percentile(all_latencies, 99):8.1f} {(all_latencies[-1] if all_latencies else 0):8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API 서버 부하 테스트")
+    parser.add_argument("--url", default="http://localhost:5050", help="서버 주소")
+    parser.add_argument("--requests", type=int, default=1000, help="총 요청 수")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시 요청 수")
+    parser.add_argument("--timeout", type=float, default=30, help="요청 타임아웃 (초)")
+    parser.add_argument("--path", action="append", help="대상 경로 (여러 번 지정 가능)")
+    args = parser.parse_args()
+
+    run(args.url.rstrip("/"), args.path or DEFAULT_PATHS, args.requests, args.concurrency, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,23 @@
-from app import create_app
 import os
+import sys
+
+
+def run_gunicorn():
+    """프로덕션: gunicorn (워커/스레드 수는 gunicorn.conf.py / WEB_WORKERS, WEB_THREADS)"""
+    config = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+    try:
+        os.execvp('gunicorn', ['gunicorn', '-c', config, 'run:app'])
+    except FileNotFoundError:
+        print("❌ gunicorn이 설치되지 않았습니다: pip install gunicorn")
+        sys.exit(1)
+
+
+# --prod: 앱을 만들기 전에 gunicorn으로 프로세스를 교체
+# (이 프로세스에서 센서/LED 등 하드웨어를 초기화하지 않음, 워커가 run:app을 다시 import)
+if __name__ == '__main__' and '--prod' in sys.argv:
+    run_gunicorn()
+
+from app import create_app
 
 app = create_app()
 
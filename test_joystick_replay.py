@@ -0,0 +1,84 @@
+"""
+조이스틱 디스패처 재생 테스트 (하드웨어 없이 실행)
+
+FakeInputSource로 기록한 이벤트를 JoystickDispatcher에 재생하고
+디바운스 / 클릭 / 길게 누르기 / 콤보 처리 결과를 확인
+
+실행: python test_joystick_replay.py
+"""
+from app.services.joystick_input_service import JoystickDispatcher, FakeInputSource
+
+
+def replay(events, setup):
+    """events를 재생하고 (제스처, 방향) 호출 기록 반환"""
+    dispatcher = JoystickDispatcher(debounce=0.15, long_press=1.0, combo_window=0.8)
+    calls = []
+    setup(dispatcher, calls)
+    dispatcher.run(FakeInputSource(events, start=1000.0))
+    return dispatcher, calls
+
+
+def record(calls, gesture):
+    return lambda event: calls.append((gesture, event.direction))
+
+
+def test_click():
+    _, calls = replay(
+        [(0, "up", "pressed"), (0.1, "up", "released")],
+        lambda d, calls: [d.on(g, "*", record(calls, g)) for g in ("press", "release", "click", "long_press")],
+    )
+    assert calls == [("press", "up"), ("release", "up"), ("click", "up")], calls
+
+
+def test_debounce():
+    # 0.05초 뒤 다시 들어온 누름(접점 떨림)은 무시, 0.5초 뒤의 누름은 새 클릭
+    dispatcher, calls = replay(
+        [
+            (0, "middle", "pressed"), (0.02, "middle", "released"),
+            (0.05, "middle", "pressed"), (0.02, "middle", "released"),
+            (0.5, "middle", "pressed"), (0.05, "middle", "released"),
+        ],
+        lambda d, calls: d.on("click", "middle", record(calls, "click")),
+    )
+    assert calls == [("click", "middle"), ("click", "middle")], calls
+    assert dispatcher.get_stats()["debounced"] == 1
+
+
+def test_long_press():
+    # held 이벤트가 long_press(1초)를 넘긴 뒤 한 번만 발생하고, 뗄 때 click은 없음
+    _, calls = replay(
+        [
+            (0, "down", "pressed"),
+            (0.5, "down", "held"), (0.6, "down", "held"), (0.2, "down", "held"),
+            (0.1, "down", "released"),
+        ],
+        lambda d, calls: [d.on(g, "down", record(calls, g)) for g in ("long_press", "click", "release")],
+    )
+    assert calls == [("long_press", "down"), ("release", "down")], calls
+
+
+def test_combo():
+    def setup(d, calls):
+        d.on_combo(["left", "right"], record(calls, "combo"))
+
+    # 시간 안에 왼쪽 → 오른쪽
+    _, calls = replay(
+        [(0, "left", "pressed"), (0.1, "left", "released"), (0.3, "right", "pressed"), (0.1, "right", "released")],
+        setup,
+    )
+    assert calls == [("combo", "right")], calls
+
+    # combo_window(0.8초)를 넘기면 콤보 아님
+    _, calls = replay(
+        [(0, "left", "pressed"), (0.1, "left", "released"), (1.0, "right", "pressed"), (0.1, "right", "released")],
+        setup,
+    )
+    assert calls == [], calls
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"[OK] {name}")
+    print("모든 조이스틱 재생 테스트 통과")
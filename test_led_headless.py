@@ -0,0 +1,52 @@
+"""
+LED 렌더러 프레임 비교 테스트 (하드웨어 없이 실행)
+
+HeadlessFramebuffer에 렌더링하고, 화면이 바뀌지 않는 요청은 장치에 다시 쓰지 않는지 확인
+
+실행: python test_led_headless.py
+"""
+from app.services.led_service import LedRenderer, HeadlessFramebuffer, ICONS, BLANK
+
+
+def make_renderer():
+    backend = HeadlessFramebuffer()
+    return LedRenderer(backend, fade_seconds=0.05, fade_steps=2), backend
+
+
+def test_same_frame_written_once():
+    renderer, backend = make_renderer()
+    try:
+        renderer.show(ICONS["umbrella"])
+        assert renderer.flush()
+        renderer.show(ICONS["umbrella"])
+        assert renderer.flush()
+
+        assert backend.writes == 1, backend.writes
+        assert backend.frame == ICONS["umbrella"]
+        stats = renderer.get_stats()
+        assert stats["presented"] == 1 and stats["skipped"] == 1, stats
+    finally:
+        renderer.stop()
+
+
+def test_changed_frame_written():
+    renderer, backend = make_renderer()
+    try:
+        renderer.show(ICONS["umbrella"])
+        assert renderer.flush()
+        renderer.show(ICONS["window"])
+        assert renderer.flush()
+        renderer.clear()
+        assert renderer.flush()
+
+        assert list(backend.history) == [ICONS["umbrella"], ICONS["window"], BLANK], backend.writes
+    finally:
+        renderer.stop()
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"[OK] {name}")
+    print("모든 LED 렌더러 테스트 통과")